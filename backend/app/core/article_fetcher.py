@@ -0,0 +1,268 @@
+"""
+Polite article downloads and a disk-backed cache of extracted text.
+
+* :class:`HostLimiter` caps concurrent requests per host and spaces them by
+  a crawl delay (the larger of ``ARTICLE_CRAWL_DELAY_S`` and the host's
+  ``robots.txt`` ``Crawl-delay``, capped at ``ARTICLE_MAX_CRAWL_DELAY_S``).
+* ``robots.txt`` is fetched once per host and cached for ``ROBOTS_TTL_S``.
+* :class:`ArticleCache` stores extracted text in SQLite keyed by URL, with
+  a TTL, LRU eviction beyond ``ARTICLE_CACHE_MAX_ENTRIES`` and short-lived
+  negative entries for URLs that failed or are disallowed.
+"""
+
+import importlib
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from app.core.config import get_settings
+from app.core.metrics import ARTICLE_FETCH_SKIPS
+
+logger = logging.getLogger(__name__)
+
+# Loaded on the first download (see _http) to keep app startup fast.
+requests = None
+
+_settings = get_settings()
+PER_HOST_CONCURRENCY = _settings.article_fetch_per_host
+CRAWL_DELAY_S = _settings.article_crawl_delay_s
+MAX_CRAWL_DELAY_S = _settings.article_max_crawl_delay_s
+RESPECT_ROBOTS = _settings.article_respect_robots
+ROBOTS_TTL_S = _settings.robots_ttl_s
+
+ARTICLE_CACHE_PATH = _settings.article_cache_path
+ARTICLE_CACHE_TTL_S = _settings.article_cache_ttl_s
+ARTICLE_NEGATIVE_TTL_S = _settings.article_negative_ttl_s
+ARTICLE_CACHE_MAX_ENTRIES = _settings.article_cache_max_entries
+
+
+def _http():
+    global requests
+    if requests is None:
+        requests = importlib.import_module("requests")
+    return requests
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class HostLimiter:
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = self._semaphores[host] = threading.BoundedSemaphore(
+                    self.max_concurrency
+                )
+            return sem
+
+    @contextmanager
+    def slot(self, host: str, delay: float) -> Iterator[None]:
+        """Hold one of the host's slots, waiting out its crawl delay first."""
+        sem = self._semaphore(host)
+        sem.acquire()
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_slot.get(host, 0.0))
+                # Reserve the start time now so concurrent callers queue up.
+                self._next_slot[host] = start + delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            sem.release()
+
+
+class RobotsCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Optional[RobotFileParser]]] = {}
+
+    def _load(self, host: str, user_agent: str, timeout: float) -> Optional[RobotFileParser]:
+        parser = RobotFileParser(f"{host}/robots.txt")
+        try:
+            resp = _http().get(
+                f"{host}/robots.txt",
+                timeout=timeout,
+                headers={"User-Agent": user_agent},
+            )
+        except Exception:
+            logger.debug("robots.txt unavailable for %s; allowing", host)
+            return None
+        if resp.status_code in (401, 403):
+            parser.disallow_all = True
+        elif resp.status_code >= 400:
+            return None
+        else:
+            parser.parse(resp.text.splitlines())
+        return parser
+
+    def get(self, host: str, user_agent: str, timeout: float) -> Optional[RobotFileParser]:
+        with self._lock:
+            cached = self._entries.get(host)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        parser = self._load(host, user_agent, timeout)
+        with self._lock:
+            self._entries[host] = (time.monotonic(), parser)
+        return parser
+
+
+class ArticleCache:
+    """SQLite cache of extracted article text; ``None`` text marks a failure."""
+
+    def __init__(self, path: str, ttl: float, negative_ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        # Check the size often enough that the cache never overshoots by much.
+        self._evict_every = max(1, min(100, max_entries // 10))
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "url TEXT PRIMARY KEY, text TEXT, fetched_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS articles_accessed ON articles (accessed_at)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(hit, text)``; a hit with ``None`` text is a cached failure."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT text, fetched_at FROM articles WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        text, fetched_at = row
+        ttl = self.ttl if text is not None else self.negative_ttl
+        now = time.time()
+        if now - fetched_at > ttl:
+            conn.execute("DELETE FROM articles WHERE url = ?", (url,))
+            return False, None
+        conn.execute("UPDATE articles SET accessed_at = ? WHERE url = ?", (now, url))
+        return True, text
+
+    def put(self, url: str, text: Optional[str]) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO articles (url, text, fetched_at, accessed_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET text = excluded.text, "
+            "fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at",
+            (url, text, now, now),
+        )
+        self._writes += 1
+        if self._writes % self._evict_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop least-recently-used rows beyond ``max_entries``."""
+        conn = self._connect()
+        (count,) = conn.execute("SELECT COUNT(*) FROM articles").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        # Evict a little extra so we are not back here on the next write.
+        excess += self.max_entries // 10
+        conn.execute(
+            "DELETE FROM articles WHERE url IN ("
+            "SELECT url FROM articles ORDER BY accessed_at LIMIT ?)",
+            (excess,),
+        )
+        logger.info("Evicted %d cached article(s)", excess)
+        return excess
+
+
+_limiter = HostLimiter(PER_HOST_CONCURRENCY)
+_robots = RobotsCache(ROBOTS_TTL_S)
+_cache: Optional[ArticleCache] = None
+_cache_lock = threading.Lock()
+_cache_initialised = False
+
+
+def get_cache() -> Optional[ArticleCache]:
+    global _cache, _cache_initialised
+    with _cache_lock:
+        if not _cache_initialised:
+            _cache_initialised = True
+            if ARTICLE_CACHE_PATH:
+                try:
+                    _cache = ArticleCache(
+                        ARTICLE_CACHE_PATH,
+                        ARTICLE_CACHE_TTL_S,
+                        ARTICLE_NEGATIVE_TTL_S,
+                        ARTICLE_CACHE_MAX_ENTRIES,
+                    )
+                except Exception:
+                    logger.warning(
+                        "Article cache unavailable at %s; continuing without it",
+                        ARTICLE_CACHE_PATH,
+                        exc_info=True,
+                    )
+        return _cache
+
+
+def set_cache(cache: Optional[ArticleCache]) -> None:
+    """Replace the process-wide cache (``None`` disables caching)."""
+    global _cache, _cache_initialised
+    with _cache_lock:
+        _cache = cache
+        _cache_initialised = True
+
+
+def polite_get(url: str, timeout: float, user_agent: str) -> Optional[str]:
+    """
+    Download ``url`` honouring robots.txt and per-host limits.
+
+    Returns the response body, or ``None`` if robots.txt disallows the URL.
+    Network and HTTP errors propagate to the caller.
+    """
+    host = _host(url)
+    delay = CRAWL_DELAY_S
+    if RESPECT_ROBOTS:
+        robots = _robots.get(host, user_agent, timeout)
+        if robots is not None:
+            if not robots.can_fetch(user_agent, url):
+                ARTICLE_FETCH_SKIPS.inc(reason="robots")
+                logger.debug("robots.txt disallows %s", url)
+                return None
+            delay = max(delay, float(robots.crawl_delay(user_agent) or 0))
+    delay = min(delay, MAX_CRAWL_DELAY_S)
+
+    with _limiter.slot(host, delay):
+        response = _http().get(
+            url,
+            timeout=timeout,
+            headers={"User-Agent": user_agent},
+        )
+    response.raise_for_status()
+    return response.text
@@ -0,0 +1,432 @@
+"""
+Bulk source import (OPML or a list) and resumable, parallel backfill.
+
+:func:`import_sources` adds sources in batches of ``IMPORT_BATCH_SIZE`` and
+creates a backfill job for them. :func:`run_job` ingests the job's sources
+with ``BACKFILL_WORKERS`` threads and checkpoints its progress per source
+(``pending`` -> ``running`` -> ``done`` / ``failed``) in a SQLite file at
+``BACKFILL_DB``. There is no default path: checkpoints in a temp directory
+would vanish with the container, so backfill is unavailable until
+``BACKFILL_DB`` points at durable storage.
+
+A source that is ``done`` is never fetched again. Rows are stored every
+``BACKFILL_BATCH_SIZE`` entries; ``entries_done`` counts them for progress
+reports. Backfills read the whole feed instead of stopping at the first
+known entries, and on resume the entries already stored are skipped by the
+usual URL dedup, so nothing is downloaded or summarised twice.
+
+Every source that is not ``done`` is unfinished: ``pending``, ``running``
+(interrupted) and ``failed`` ones are tried again, up to
+``BACKFILL_MAX_ATTEMPTS`` attempts each. Jobs resume through ``POST
+/sources/backfill/{job_id}/resume`` and, unless
+``BACKFILL_RESUME_ON_START`` is false, when the app starts. Per-source
+ingest leases (:mod:`app.core.coordination`) keep workers from backfilling
+the same feed at once; a source whose lease was held elsewhere is tried
+again once it is released, up to ``BACKFILL_DEFER_RETRIES`` times per run.
+
+From the command line::
+
+    python -m app.core.backfill feeds.opml
+    python -m app.core.backfill --resume <job_id>
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core import coordination, tracing
+from app.core.config import get_settings
+from app.core.ingestion import poll_feed
+from app.core.response_cache import invalidate_sources
+from app.core.source_adapters import detect_type
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+BACKFILL_DB = _settings.backfill_db
+BACKFILL_WORKERS = _settings.backfill_workers
+BACKFILL_BATCH_SIZE = _settings.backfill_batch_size
+BACKFILL_MAX_ATTEMPTS = _settings.backfill_max_attempts
+BACKFILL_DEFER_RETRIES = _settings.backfill_defer_retries
+BACKFILL_RESUME_ON_START = _settings.backfill_resume_on_start
+IMPORT_BATCH_SIZE = _settings.import_batch_size
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def parse_opml(document: str) -> List[Dict]:
+    """Feed outlines (``xmlUrl``) of an OPML document, nested folders included."""
+    try:
+        root = ET.fromstring(document)
+    except ET.ParseError as exc:
+        raise ValueError(f"Invalid OPML: {exc}") from exc
+    feeds = []
+    for outline in root.iter("outline"):
+        url = (outline.get("xmlUrl") or "").strip()
+        if not url:
+            continue
+        name = outline.get("title") or outline.get("text") or url
+        feeds.append({"name": name.strip(), "url": url, "type": detect_type(url)})
+    return feeds
+
+
+def _normalise(feeds: Iterable[Dict]) -> Tuple[List[Dict], List[str]]:
+    """Drop duplicate URLs and reject anything that is not http(s)."""
+    rows, invalid, seen = [], [], set()
+    for feed in feeds:
+        url = str(feed.get("url") or "").strip()
+        if not url.lower().startswith(("http://", "https://")):
+            invalid.append(url)
+            continue
+        if url in seen:
+            continue
+        seen.add(url)
+        rows.append(
+            {
+                "name": feed.get("name") or url,
+                "url": url,
+                "type": feed.get("type") or detect_type(url),
+            }
+        )
+    return rows, invalid
+
+
+class CheckpointStore:
+    """Backfill jobs and their per-source progress."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS backfill_jobs (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS backfill_sources (
+                job_id TEXT NOT NULL,
+                source_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                status TEXT NOT NULL,
+                entries_done INTEGER NOT NULL DEFAULT 0,
+                last_url TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, source_id)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_job(self, sources: List[Dict]) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO backfill_jobs (id, created_at, updated_at) VALUES (?, ?, ?)",
+                (job_id, now, now),
+            )
+            conn.executemany(
+                "INSERT INTO backfill_sources (job_id, source_id, source, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (job_id, source["id"], json.dumps(source, default=str), PENDING, now)
+                    for source in sources
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def unfinished(self, job_id: str, max_attempts: int = BACKFILL_MAX_ATTEMPTS) -> List[Dict]:
+        """
+        Sources still to do: not ``done`` and tried fewer than ``max_attempts``
+        times. ``running`` ones were interrupted; ``failed`` ones are retried.
+        """
+        cur = self._connect().execute(
+            "SELECT source FROM backfill_sources "
+            "WHERE job_id = ? AND status != ? AND attempts < ? ORDER BY source_id",
+            (job_id, DONE, max_attempts),
+        )
+        return [json.loads(source) for (source,) in cur]
+
+    def unfinished_jobs(self, max_attempts: int = BACKFILL_MAX_ATTEMPTS) -> List[str]:
+        """Jobs with at least one source :meth:`unfinished` would return."""
+        cur = self._connect().execute(
+            "SELECT DISTINCT job_id FROM backfill_sources WHERE status != ? AND attempts < ?",
+            (DONE, max_attempts),
+        )
+        return [job_id for (job_id,) in cur]
+
+    def _update(self, job_id: str, source_id: int, sql: str, params: Tuple) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            f"UPDATE backfill_sources SET {sql}, updated_at = ? WHERE job_id = ? AND source_id = ?",
+            (*params, now, job_id, source_id),
+        )
+        conn.execute("UPDATE backfill_jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+
+    def start(self, job_id: str, source_id: int) -> None:
+        self._update(
+            job_id, source_id, "status = ?, attempts = attempts + 1, error = NULL", (RUNNING,)
+        )
+
+    def record_entries(self, job_id: str, source_id: int, count: int) -> None:
+        self._update(job_id, source_id, "entries_done = entries_done + ?", (count,))
+
+    def finish(self, job_id: str, source_id: int) -> None:
+        self._update(job_id, source_id, "status = ?", (DONE,))
+
+    def fail(self, job_id: str, source_id: int, error: str) -> None:
+        self._update(job_id, source_id, "status = ?, error = ?", (FAILED, error[:500]))
+
+    def release(self, job_id: str, source_id: int) -> None:
+        """Back to ``pending`` (another worker held the source); not an attempt."""
+        self._update(job_id, source_id, "status = ?", (PENDING,))
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT created_at, updated_at FROM backfill_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        sources = [
+            {
+                "source_id": source_id,
+                "url": json.loads(source)["url"],
+                "status": status,
+                "entries_done": entries_done,
+                "attempts": attempts,
+                "error": error,
+            }
+            for source_id, source, status, entries_done, attempts, error in conn.execute(
+                "SELECT source_id, source, status, entries_done, attempts, error "
+                "FROM backfill_sources WHERE job_id = ? ORDER BY source_id",
+                (job_id,),
+            )
+        ]
+        counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED)}
+        for source in sources:
+            counts[source["status"]] += 1
+        return {
+            "job_id": job_id,
+            "created_at": row[0],
+            "updated_at": row[1],
+            "running": job_id in _active_jobs,
+            "sources": counts,
+            "entries_done": sum(source["entries_done"] for source in sources),
+            "progress": sources,
+        }
+
+
+_checkpoints: Optional[CheckpointStore] = None
+_checkpoints_lock = threading.Lock()
+_active_jobs: Dict[str, threading.Thread] = {}
+
+
+def get_checkpoints() -> CheckpointStore:
+    global _checkpoints
+    with _checkpoints_lock:
+        if _checkpoints is None:
+            if not BACKFILL_DB:
+                raise RuntimeError(
+                    "Backfill needs BACKFILL_DB set to a SQLite file on durable storage."
+                )
+            _checkpoints = CheckpointStore(BACKFILL_DB)
+        return _checkpoints
+
+
+def set_checkpoints(store: Optional[CheckpointStore]) -> None:
+    global _checkpoints
+    with _checkpoints_lock:
+        _checkpoints = store
+
+
+def import_sources(repo, feeds: Iterable[Dict], backfill: bool = True) -> Dict:
+    """
+    Add ``feeds`` (``name``/``url``/``type`` dicts) in batches.
+
+    With ``backfill``, creates a job covering every imported source, new or
+    already known, and returns its id; the caller decides when it runs.
+    """
+    rows, invalid = _normalise(feeds)
+    # Fail before adding anything when the job could not be checkpointed.
+    store = get_checkpoints() if backfill else None
+    created, existing = [], []
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch_created, batch_existing = repo.add_sources(rows[start:start + IMPORT_BATCH_SIZE])
+        created.extend(batch_created)
+        existing.extend(batch_existing)
+    if created:
+        invalidate_sources()
+    logger.info(
+        "Imported %d source(s) (%d already known, %d invalid)",
+        len(created),
+        len(existing),
+        len(invalid),
+    )
+    job_id = None
+    if backfill and (created or existing):
+        job_id = store.create_job(created + existing)
+    return {
+        "created": len(created),
+        "existing": len(existing),
+        "invalid": invalid,
+        "job_id": job_id,
+    }
+
+
+def _backfill_source(
+    repo, store: CheckpointStore, job_id: str, source: Dict, wait: bool = False
+) -> str:
+    source_id = source["id"]
+    lease_name = coordination.source_lease_name(source_id)
+    if wait:
+        coordination.wait_released(lease_name)
+    with coordination.try_lease(lease_name) as lease:
+        if lease is None:
+            store.release(job_id, source_id)
+            return PENDING
+        store.start(job_id, source_id)
+
+        def checkpoint(rows: List[Dict]) -> None:
+            store.record_entries(job_id, source_id, len(rows))
+
+        try:
+            with tracing.start_trace("backfill", job_id=job_id, source_id=source_id):
+                poll_feed(
+                    repo,
+                    source,
+                    stop_after_seen=0,
+                    batch_size=BACKFILL_BATCH_SIZE,
+                    on_batch=checkpoint,
+                )
+        except Exception as exc:
+            logger.warning("Backfill of source %s failed: %s", source_id, exc)
+            store.fail(job_id, source_id, f"{type(exc).__name__}: {exc}")
+            return FAILED
+    store.finish(job_id, source_id)
+    return DONE
+
+
+def run_job(job_id: str, repo=None, workers: int = BACKFILL_WORKERS) -> Dict:
+    """Backfill every unfinished source of ``job_id``; returns counts by outcome."""
+    if repo is None:
+        from app.core.storage import get_repository
+
+        repo = get_repository()
+    store = get_checkpoints()
+    sources = store.unfinished(job_id)
+    logger.info("Backfill %s: %d source(s) to go", job_id, len(sources))
+    outcomes = {DONE: 0, FAILED: 0, PENDING: 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+        for round_ in range(1 + max(0, BACKFILL_DEFER_RETRIES)):
+            # Sources another worker was polling are tried again once its
+            # lease is released.
+            results = pool.map(
+                lambda s: _backfill_source(repo, store, job_id, s, wait=round_ > 0), sources
+            )
+            deferred = []
+            for source, outcome in zip(sources, results):
+                if outcome == PENDING:
+                    deferred.append(source)
+                else:
+                    outcomes[outcome] += 1
+            sources = deferred
+            if not sources:
+                break
+    outcomes[PENDING] = len(sources)
+    logger.info(
+        "Backfill %s finished: %d done, %d failed, %d deferred",
+        job_id,
+        outcomes[DONE],
+        outcomes[FAILED],
+        outcomes[PENDING],
+    )
+    return outcomes
+
+
+def start_job(job_id: str) -> bool:
+    """Run ``job_id`` in a background thread; False if it is already running here."""
+    with _checkpoints_lock:
+        thread = _active_jobs.get(job_id)
+        if thread is not None and thread.is_alive():
+            return False
+
+        def target() -> None:
+            try:
+                run_job(job_id)
+            except Exception:
+                logger.exception("Backfill %s stopped", job_id)
+            finally:
+                with _checkpoints_lock:
+                    _active_jobs.pop(job_id, None)
+
+        thread = threading.Thread(target=target, name=f"backfill-{job_id}", daemon=True)
+        _active_jobs[job_id] = thread
+    thread.start()
+    return True
+
+
+def resume_unfinished() -> List[str]:
+    """Restart every job with unfinished sources."""
+    if not BACKFILL_RESUME_ON_START:
+        return []
+    if not BACKFILL_DB:
+        logger.info("Backfill disabled (set BACKFILL_DB to a durable path to enable)")
+        return []
+    jobs = [job_id for job_id in get_checkpoints().unfinished_jobs() if start_job(job_id)]
+    if jobs:
+        logger.info("Resuming %d unfinished backfill job(s)", len(jobs))
+    return jobs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.core.storage import get_repository
+
+    parser = argparse.ArgumentParser(description="Import feeds and backfill them.")
+    parser.add_argument("opml", nargs="?", help="OPML file to import")
+    parser.add_argument("--resume", metavar="JOB_ID", help="Resume an existing job")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    args = parser.parse_args()
+    if not (args.opml or args.resume):
+        parser.error("give an OPML file or --resume JOB_ID")
+
+    logging.basicConfig(level=logging.INFO)
+    repository = get_repository()
+    job = args.resume
+    if args.opml:
+        with open(args.opml, encoding="utf-8") as fh:
+            summary = import_sources(repository, parse_opml(fh.read()))
+        print(json.dumps(summary, indent=2))
+        job = summary["job_id"]
+    if job:
+        run_job(job, repository, args.workers)
+        print(json.dumps(get_checkpoints().job(job), indent=2))
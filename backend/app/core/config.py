@@ -0,0 +1,216 @@
+"""
+Process-wide settings, read from the environment once.
+
+``.env`` is loaded here and nowhere else, and :class:`Settings` is the only
+place environment variables are parsed: credentials, app-wide options and
+every module's tuning knobs. Modules copy what they use into module-level
+constants at import (``FEED_TIMEOUT_S = _settings.feed_timeout_s``), so
+the constants stay cheap to read and easy to override in benchmarks.
+
+SDK clients are not built here. They are constructed lazily on first use by
+``llm_utils`` and ``supabase_client``, so importing the app stays cheap.
+"""
+
+import os
+import tempfile
+import threading
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _csv(value: str) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def _flag(value: str) -> bool:
+    return value.lower() == "true"
+
+
+def _tmp(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+class Settings:
+    def __init__(self):
+        env = os.environ
+        # Storage
+        self.supabase_url: Optional[str] = env.get("SUPABASE_URL")
+        self.supabase_key: Optional[str] = env.get("SUPABASE_KEY")
+
+        # LLM providers
+        self.gemini_api_key: Optional[str] = env.get("GEMINI_API_KEY")
+        self.gemini_model = env.get("GEMINI_MODEL", "models/gemini-2.5-flash")
+        self.openai_api_key: Optional[str] = env.get("OPENAI_API_KEY")
+        self.openai_model = env.get("OPENAI_MODEL", "gpt-4o-mini")
+
+        # Email
+        self.email_provider = env.get("EMAIL_PROVIDER", "smtp").lower()
+        self.email_from: Optional[str] = env.get("EMAIL_FROM")
+        self.email_to: Optional[str] = env.get("EMAIL_TO")
+        self.smtp_host = env.get("SMTP_HOST", "smtp.gmail.com")
+        self.smtp_port = int(env.get("SMTP_PORT", "587"))
+        self.smtp_user: Optional[str] = env.get("SMTP_USER")
+        self.smtp_pass: Optional[str] = env.get("SMTP_PASS")
+        self.sendgrid_api_key: Optional[str] = env.get("SENDGRID_API_KEY")
+
+        # HTTP app
+        self.log_level = env.get("LOG_LEVEL", "INFO").upper()
+        self.log_format = env.get(
+            "LOG_FORMAT",
+            "%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(message)s",
+        )
+        self.allowed_origins = _csv(env.get("ALLOWED_ORIGINS", "")) or ["*"]
+        # Browsers reject credentials with a wildcard origin.
+        self.allow_credentials = (
+            env.get("ALLOW_CREDENTIALS", "true").lower() == "true"
+            and self.allowed_origins != ["*"]
+        )
+        self.ready_cache_s = float(env.get("READY_CACHE_S", "10"))
+        self.generate_cache_ttl_s = float(env.get("GENERATE_CACHE_TTL_S", "30"))
+        self.sources_cache_ttl_s = float(env.get("SOURCES_CACHE_TTL_S", "30"))
+        self.response_cache_max_entries = int(env.get("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+        # Stories summarised concurrently by /newsletter/generate/stream.
+        self.stream_workers = int(env.get("STREAM_WORKERS", "4"))
+
+        # Repository and cross-worker coordination
+        self.storage_backend = env.get("STORAGE_BACKEND", "supabase").lower()
+        self.storage_path = env.get("STORAGE_PATH", "creatorpulse.sqlite3")
+        self.coordination_backend = env.get("COORDINATION_BACKEND", "memory").lower()
+        self.coordination_db = env.get("COORDINATION_DB", _tmp("creatorpulse-locks.sqlite3"))
+        self.coordination_lease_ttl_s = float(env.get("COORDINATION_LEASE_TTL_S", "300"))
+        self.coordination_wait_s = float(env.get("COORDINATION_WAIT_S", "600"))
+        self.provider_health_db: Optional[str] = env.get("PROVIDER_HEALTH_DB")
+
+        # Tracing
+        self.tracing_enabled = _flag(env.get("TRACING_ENABLED", "true"))
+        self.trace_export_path: Optional[str] = env.get("TRACE_EXPORT_PATH")
+        self.trace_otlp_endpoint: Optional[str] = env.get("TRACE_OTLP_ENDPOINT")
+        self.trace_service_name = env.get("TRACE_SERVICE_NAME", "creatorpulse-api")
+
+        # Summaries
+        self.summary_output = env.get("SUMMARY_OUTPUT", "json").lower()
+        self.story_min_source_words = int(env.get("STORY_MIN_SOURCE_WORDS", "40"))
+        self.llm_rate_wait_s = float(env.get("LLM_RATE_WAIT_S", "2"))
+        self.llm_breaker_failures = int(env.get("LLM_BREAKER_FAILURES", "3"))
+        self.llm_breaker_cooldown_s = float(env.get("LLM_BREAKER_COOLDOWN_S", "60"))
+        self.gemini_rpm = float(env.get("GEMINI_RPM", "60"))
+        self.gemini_burst = float(env.get("GEMINI_BURST", "5"))
+        self.openai_rpm = float(env.get("OPENAI_RPM", "500"))
+        self.openai_burst = float(env.get("OPENAI_BURST", "20"))
+        self.summary_retry_base_s = float(env.get("SUMMARY_RETRY_BASE_S", "3600"))
+        self.summary_retry_max_s = float(env.get("SUMMARY_RETRY_MAX_S", str(7 * 86400)))
+        self.style_profile_path = env.get("STYLE_PROFILE_PATH", "style_profile.json")
+        self.style_chunk_size = int(env.get("STYLE_CHUNK_SIZE", "200"))
+
+        # Feeds and ingestion
+        self.feed_timeout_s = float(env.get("FEED_TIMEOUT_S", "20"))
+        self.feed_max_age_days = float(env.get("FEED_MAX_AGE_DAYS", "0"))  # 0 = no cutoff
+        self.feed_stop_after_seen = int(env.get("FEED_STOP_AFTER_SEEN", "3"))
+        self.feed_user_agent = env.get("FEED_USER_AGENT", "CreatorPulse/0.1 (+feed reader)")
+        self.ingest_upsert_batch = int(env.get("INGEST_UPSERT_BATCH", "25"))
+        self.ingest_process_workers = int(env.get("INGEST_PROCESS_WORKERS", "0"))
+        self.ingest_extract_batch = max(1, int(env.get("INGEST_EXTRACT_BATCH", "8")))
+
+        # Article fetching
+        self.article_fetch_per_host = int(env.get("ARTICLE_FETCH_PER_HOST", "2"))
+        self.article_crawl_delay_s = float(env.get("ARTICLE_CRAWL_DELAY_S", "1.0"))
+        self.article_max_crawl_delay_s = float(env.get("ARTICLE_MAX_CRAWL_DELAY_S", "10"))
+        self.article_respect_robots = _flag(env.get("ARTICLE_RESPECT_ROBOTS", "true"))
+        self.robots_ttl_s = float(env.get("ROBOTS_TTL_S", "86400"))
+        self.article_cache_path = env.get(
+            "ARTICLE_CACHE_PATH", _tmp("creatorpulse-articles.sqlite3")
+        )
+        self.article_cache_ttl_s = float(env.get("ARTICLE_CACHE_TTL_S", str(7 * 86400)))
+        self.article_negative_ttl_s = float(env.get("ARTICLE_NEGATIVE_TTL_S", "3600"))
+        self.article_cache_max_entries = int(env.get("ARTICLE_CACHE_MAX_ENTRIES", "20000"))
+
+        # YouTube sources
+        self.youtube_api_key = env.get("YOUTUBE_API_KEY", "")
+        self.youtube_api_url = env.get(
+            "YOUTUBE_API_URL", "https://www.googleapis.com/youtube/v3/videos"
+        )
+        # The Data API accepts up to 50 ids per videos.list call.
+        self.youtube_batch_size = min(50, int(env.get("YOUTUBE_BATCH_SIZE", "50")))
+        self.youtube_concurrency = int(env.get("YOUTUBE_CONCURRENCY", "2"))
+        self.youtube_transcript_workers = int(env.get("YOUTUBE_TRANSCRIPT_WORKERS", "4"))
+        self.youtube_transcript_languages = _csv(env.get("YOUTUBE_TRANSCRIPT_LANGUAGES", "en"))
+        self.youtube_timeout_s = float(env.get("YOUTUBE_TIMEOUT_S", "10"))
+
+        # Scheduler
+        self.scheduler_enabled = _flag(env.get("SCHEDULER_ENABLED", "false"))
+        self.scheduler_min_interval_s = float(env.get("SCHEDULER_MIN_INTERVAL_S", "300"))
+        self.scheduler_max_interval_s = float(env.get("SCHEDULER_MAX_INTERVAL_S", "21600"))
+        self.scheduler_default_interval_s = float(
+            env.get("SCHEDULER_DEFAULT_INTERVAL_S", "1800")
+        )
+        self.scheduler_backoff = float(env.get("SCHEDULER_BACKOFF", "1.5"))
+        self.scheduler_workers = int(env.get("SCHEDULER_WORKERS", "2"))
+        self.scheduler_source_refresh_s = float(env.get("SCHEDULER_SOURCE_REFRESH_S", "300"))
+        self.scheduler_send_at: Optional[str] = env.get("SCHEDULER_SEND_AT")  # "HH:MM" UTC
+        self.scheduler_send_retry_s = float(env.get("SCHEDULER_SEND_RETRY_S", "300"))
+
+        # Bulk import and backfill
+        self.import_batch_size = int(env.get("IMPORT_BATCH_SIZE", "100"))
+        self.backfill_db = env.get("BACKFILL_DB", "")
+        self.backfill_workers = int(env.get("BACKFILL_WORKERS", "4"))
+        self.backfill_batch_size = int(env.get("BACKFILL_BATCH_SIZE", "5"))
+        self.backfill_max_attempts = int(env.get("BACKFILL_MAX_ATTEMPTS", "3"))
+        self.backfill_defer_retries = int(env.get("BACKFILL_DEFER_RETRIES", "3"))
+        self.backfill_resume_on_start = _flag(env.get("BACKFILL_RESUME_ON_START", "true"))
+
+        # Reader feedback
+        self.feedback_db = env.get("FEEDBACK_DB", _tmp("creatorpulse-feedback.sqlite3"))
+        self.feedback_half_life_h = float(env.get("FEEDBACK_HALF_LIFE_H", "168"))
+        self.feedback_flush_s = float(env.get("FEEDBACK_FLUSH_S", "2"))
+        self.feedback_batch_size = int(env.get("FEEDBACK_BATCH_SIZE", "200"))
+        self.feedback_max_pending = int(env.get("FEEDBACK_MAX_PENDING", "10000"))
+        self.feedback_max_attempts = int(env.get("FEEDBACK_MAX_ATTEMPTS", "3"))
+        self.feedback_rebuild_half_lives = float(env.get("FEEDBACK_REBUILD_HALF_LIVES", "10"))
+        self.feedback_rebuild_batch = int(env.get("FEEDBACK_REBUILD_BATCH", "1000"))
+        self.feedback_item_weight = float(env.get("FEEDBACK_ITEM_WEIGHT", "0.5"))
+        self.feedback_source_weight = float(env.get("FEEDBACK_SOURCE_WEIGHT", "0.3"))
+
+        # Content storage and retention
+        self.content_codec = env.get("CONTENT_CODEC", "zlib").lower()
+        self.content_compress_level = int(env.get("CONTENT_COMPRESS_LEVEL", "6"))
+        self.content_compress_min_bytes = int(env.get("CONTENT_COMPRESS_MIN_BYTES", "256"))
+        self.retention_hot_days = float(env.get("RETENTION_HOT_DAYS", "30"))
+        self.retention_cold_path = env.get("RETENTION_COLD_PATH", "")
+        self.retention_drop_expired = _flag(env.get("RETENTION_DROP_EXPIRED", "false"))
+        self.retention_batch_size = int(env.get("RETENTION_BATCH_SIZE", "500"))
+        self.retention_compact_interval_h = float(
+            env.get("RETENTION_COMPACT_INTERVAL_H", "24")
+        )
+
+        # Semantic index and trends
+        self.semantic_index_path = env.get("SEMANTIC_INDEX_PATH", _tmp("creatorpulse-index"))
+        self.semantic_embedder = env.get("SEMANTIC_EMBEDDER", "hashing")
+        self.semantic_dim = int(env.get("SEMANTIC_DIM", "256"))
+        self.trend_window_h = float(env.get("TREND_WINDOW_H", "72"))
+        self.trend_max_items = int(env.get("TREND_MAX_ITEMS", "2000"))
+
+    @property
+    def supabase_configured(self) -> bool:
+        return bool(self.supabase_url and self.supabase_key)
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = Settings()
+        return _settings
+
+
+def set_settings(settings: Optional[Settings]) -> None:
+    """Replace the process-wide settings (``None`` re-reads the environment)."""
+    global _settings
+    with _settings_lock:
+        _settings = settings
@@ -1,7 +1,19 @@
-import requests
-from bs4 import BeautifulSoup
+import logging
+import time
+
 from html import unescape
-from typing import Optional
+from typing import Optional, Tuple
+
+from app.core import article_fetcher
+from app.core.metrics import (
+    ARTICLE_FETCH_SECONDS,
+    ARTICLE_FETCH_SKIPS,
+    CACHE_HITS,
+    CACHE_MISSES,
+    HTML_CLEAN_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -10,9 +22,10 @@ USER_AGENT = (
 )
 
 
-def strip_markup(value: Optional[str]) -> str:
-    if not value:
-        return ""
+@HTML_CLEAN_SECONDS.time(stage="strip_markup")
+def _strip_markup(value: str) -> str:
+    from bs4 import BeautifulSoup  # deferred: only needed once content arrives
+
     soup = BeautifulSoup(value, "html.parser")
     for tag in soup(
         [
@@ -32,7 +45,13 @@ def strip_markup(value: Optional[str]) -> str:
     return unescape(" ".join(text.split()))
 
 
-def _extract_main_content(soup: BeautifulSoup) -> str:
+def strip_markup(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _strip_markup(value)
+
+
+def _extract_main_content(soup) -> str:
     for selector in ["article", "main"]:
         node = soup.find(selector)
         if node:
@@ -42,20 +61,69 @@ def _extract_main_content(soup: BeautifulSoup) -> str:
     return soup.get_text(separator=" ", strip=True)
 
 
-def fetch_article_text(url: str, timeout: int = 10) -> str:
-    if not url:
-        return ""
+def cached_article_text(url: str) -> Tuple[bool, str]:
+    """Return ``(hit, text)`` from the article cache; failures are hits with ``""``."""
+    cache = article_fetcher.get_cache()
+    if cache is None:
+        return False, ""
     try:
-        response = requests.get(
-            url,
-            timeout=timeout,
-            headers={"User-Agent": USER_AGENT},
-        )
-        response.raise_for_status()
+        hit, cached = cache.get(url)
     except Exception:
+        logger.warning("Article cache read failed for %s", url, exc_info=True)
+        hit, cached = False, None
+    if not hit:
+        CACHE_MISSES.inc(cache="article_text")
+        return False, ""
+    if cached is None:
+        ARTICLE_FETCH_SKIPS.inc(reason="negative_cache")
+        return True, ""
+    CACHE_HITS.inc(cache="article_text")
+    return True, cached
+
+
+def download_article(url: str, timeout: int = 10) -> Optional[str]:
+    """Download the article HTML, or ``None`` if disallowed or failed."""
+    start = time.perf_counter()
+    try:
+        html = article_fetcher.polite_get(url, timeout, USER_AGENT)
+    except Exception:
+        ARTICLE_FETCH_SECONDS.observe(time.perf_counter() - start, outcome="error")
+        return None
+    ARTICLE_FETCH_SECONDS.observe(time.perf_counter() - start, outcome="ok")
+    return html
+
+
+def remember_article_text(url: str, text: Optional[str]) -> None:
+    """Cache extracted text for ``url``; ``None`` records a failure."""
+    cache = article_fetcher.get_cache()
+    if cache is None:
+        return
+    try:
+        cache.put(url, text)
+    except Exception:
+        logger.warning("Article cache write failed for %s", url, exc_info=True)
+
+
+def fetch_article_text(url: str, timeout: int = 10) -> str:
+    if not url:
         return ""
+    hit, text = cached_article_text(url)
+    if hit:
+        return text
+
+    html = download_article(url, timeout)
+    extracted = None
+    if html is not None:
+        with HTML_CLEAN_SECONDS.time(stage="article_extract"):
+            extracted = _extract_article_text(html)
+    remember_article_text(url, extracted)
+    return extracted or ""
+
+
+def _extract_article_text(html: str) -> str:
+    from bs4 import BeautifulSoup
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")
     for tag in soup(
         [
             "script",
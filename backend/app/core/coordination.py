@@ -0,0 +1,350 @@
+"""
+Leases that keep several API workers / replicas from duplicating work.
+
+A lease is a named lock with an owner and an expiry. ``try_lease`` takes it
+if it is free (or expired) and renews it in the background while held, so a
+crashed holder only blocks others until its lease runs out.
+
+Backends, chosen by ``COORDINATION_BACKEND``:
+
+* ``memory`` (default): threads of one process only.
+* ``sqlite``: every process on a host, via ``COORDINATION_DB``.
+* ``supabase``: every replica, via a ``locks`` table (see the README).
+
+Used for per-source ingest leases (``ingest:source:<id>``) and a per-issue
+send lock (``send:<date>``).
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+from app.core.config import get_settings
+from app.core.metrics import LEASE_CONTENTIONS
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+COORDINATION_BACKEND = _settings.coordination_backend
+COORDINATION_DB = _settings.coordination_db
+LEASE_TTL_S = _settings.coordination_lease_ttl_s
+LEASE_WAIT_S = _settings.coordination_wait_s
+
+# Identifies this process; each lease adds its own suffix.
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LockBackend:
+    """Atomic acquire / renew / release of named, expiring locks."""
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def renew(self, name: str, owner: str, ttl: float) -> bool:
+        raise NotImplementedError
+
+    def release(self, name: str, owner: str) -> None:
+        raise NotImplementedError
+
+    def holder(self, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+
+class MemoryLockBackend(LockBackend):
+    def __init__(self):
+        self._locks: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._locks.get(name)
+            if current and current[0] != owner and current[1] > now:
+                return False
+            self._locks[name] = (owner, now + ttl)
+            return True
+
+    def renew(self, name: str, owner: str, ttl: float) -> bool:
+        with self._lock:
+            current = self._locks.get(name)
+            if not current or current[0] != owner:
+                return False
+            self._locks[name] = (owner, time.time() + ttl)
+            return True
+
+    def release(self, name: str, owner: str) -> None:
+        with self._lock:
+            current = self._locks.get(name)
+            if current and current[0] == owner:
+                del self._locks[name]
+
+    def holder(self, name: str) -> Optional[str]:
+        with self._lock:
+            current = self._locks.get(name)
+        if current and current[1] > time.time():
+            return current[0]
+        return None
+
+
+class SQLiteLockBackend(LockBackend):
+    """Locks shared by every process that opens the same SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS locks ("
+            "name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        # One statement: insert, or take over only if expired or already ours.
+        cur = self._connect().execute(
+            "INSERT INTO locks (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, "
+            "expires_at = excluded.expires_at "
+            "WHERE locks.expires_at <= ? OR locks.owner = excluded.owner",
+            (name, owner, now + ttl, now),
+        )
+        return cur.rowcount == 1
+
+    def renew(self, name: str, owner: str, ttl: float) -> bool:
+        cur = self._connect().execute(
+            "UPDATE locks SET expires_at = ? WHERE name = ? AND owner = ?",
+            (time.time() + ttl, name, owner),
+        )
+        return cur.rowcount == 1
+
+    def release(self, name: str, owner: str) -> None:
+        self._connect().execute(
+            "DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner)
+        )
+
+    def holder(self, name: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT owner FROM locks WHERE name = ? AND expires_at > ?",
+            (name, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class SupabaseLockBackend(LockBackend):
+    """
+    Locks in the Supabase ``locks`` table (``name`` primary key).
+
+    Each step is a single conditional statement, so Postgres arbitrates
+    between replicas: a plain insert fails on a held name, and a stale lock
+    is only taken over by an ``UPDATE ... WHERE expires_at < now``.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from app.core.supabase_client import get_client
+
+            self._client = get_client()
+        return self._client
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        row = {"name": name, "owner": owner, "expires_at": _iso(now + ttl)}
+        try:
+            self.client.table("locks").insert(row).execute()
+            return True
+        except Exception:
+            # Most likely a primary-key conflict; fall through to take-over.
+            pass
+        taken = (
+            self.client.table("locks")
+            .update({"owner": owner, "expires_at": row["expires_at"]})
+            .eq("name", name)
+            .lt("expires_at", _iso(now))
+            .execute()
+            .data
+        )
+        if taken:
+            return True
+        return self.renew(name, owner, ttl)
+
+    def renew(self, name: str, owner: str, ttl: float) -> bool:
+        renewed = (
+            self.client.table("locks")
+            .update({"expires_at": _iso(time.time() + ttl)})
+            .eq("name", name)
+            .eq("owner", owner)
+            .execute()
+            .data
+        )
+        return bool(renewed)
+
+    def release(self, name: str, owner: str) -> None:
+        self.client.table("locks").delete().eq("name", name).eq("owner", owner).execute()
+
+    def holder(self, name: str) -> Optional[str]:
+        rows = (
+            self.client.table("locks")
+            .select("owner")
+            .eq("name", name)
+            .gt("expires_at", _iso(time.time()))
+            .limit(1)
+            .execute()
+            .data
+        )
+        return rows[0]["owner"] if rows else None
+
+
+_backend: Optional[LockBackend] = None
+_backend_lock = threading.Lock()
+_local_fallback = MemoryLockBackend()
+
+
+def get_backend() -> LockBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if COORDINATION_BACKEND == "sqlite":
+                logger.info("Coordinating workers via %s", COORDINATION_DB)
+                _backend = SQLiteLockBackend(COORDINATION_DB)
+            elif COORDINATION_BACKEND == "supabase":
+                logger.info("Coordinating workers via the Supabase locks table")
+                _backend = SupabaseLockBackend()
+            else:
+                _backend = MemoryLockBackend()
+        return _backend
+
+
+def set_backend(backend: Optional[LockBackend]) -> None:
+    """Replace the process-wide backend (``None`` re-reads the env config)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+class Lease:
+    """A held lock, renewed every ``ttl / 3`` seconds until released."""
+
+    def __init__(self, name: str, owner: str, ttl: float, backend: LockBackend):
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+        self._backend = backend
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._heartbeat, name=f"lease:{name}", daemon=True
+        )
+        self._thread.start()
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self._backend.renew(self.name, self.owner, self.ttl):
+                    logger.warning("Lost lease %s", self.name)
+                    return
+            except Exception:
+                logger.warning("Could not renew lease %s", self.name, exc_info=True)
+
+    def release(self) -> None:
+        self._stop.set()
+        try:
+            self._backend.release(self.name, self.owner)
+        except Exception:
+            # The lease will simply expire.
+            logger.warning("Could not release lease %s", self.name, exc_info=True)
+
+
+_thread_state = threading.local()
+
+
+def _held_leases() -> Dict[str, Lease]:
+    held = getattr(_thread_state, "leases", None)
+    if held is None:
+        held = _thread_state.leases = {}
+    return held
+
+
+@contextmanager
+def try_lease(name: str, ttl: float = LEASE_TTL_S) -> Iterator[Optional[Lease]]:
+    """
+    Yield a :class:`Lease` if ``name`` could be taken, else ``None``.
+
+    Never blocks: callers decide whether to skip or wait for the holder.
+    Re-entrant within a thread: a nested ``try_lease`` on a name the thread
+    already holds yields the outer lease and leaves releasing to it.
+    """
+    held = _held_leases()
+    if name in held:
+        yield held[name]
+        return
+    backend = get_backend()
+    owner = f"{NODE_ID}:{threading.get_ident()}"
+    try:
+        acquired = backend.acquire(name, owner, ttl)
+    except Exception:
+        # If the lock store is down, doing the work twice beats not doing it;
+        # still avoid duplicates within this process.
+        logger.warning(
+            "Lock backend unavailable for %s; using an in-process lock",
+            name,
+            exc_info=True,
+        )
+        backend = _local_fallback
+        acquired = backend.acquire(name, owner, ttl)
+    if not acquired:
+        LEASE_CONTENTIONS.inc(kind=name.rsplit(":", 1)[0])
+        logger.info("Lease %s is held elsewhere", name)
+        yield None
+        return
+    lease = Lease(name, owner, ttl, backend)
+    held[name] = lease
+    try:
+        yield lease
+    finally:
+        del held[name]
+        lease.release()
+
+
+def wait_released(name: str, timeout: float = LEASE_WAIT_S, poll: float = 1.0) -> bool:
+    """Block until nobody holds ``name`` (or ``timeout``); True if released."""
+    backend = get_backend()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if backend.holder(name) is None:
+                return True
+        except Exception:
+            logger.warning("Lock backend unavailable for %s", name, exc_info=True)
+            return False
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll)
+
+
+def source_lease_name(source_id) -> str:
+    return f"ingest:source:{source_id}"
+
+
+def send_lock_name(issue: str) -> str:
+    return f"send:{issue}"
@@ -1,22 +1,11 @@
 import logging
-import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from typing import Optional
 
-import requests
-from dotenv import load_dotenv
+from app.core.config import get_settings
+from app.core.metrics import EMAIL_SEND_SECONDS
 
-# Ensure SMTP/API credentials come from .env when running locally.
-load_dotenv()
 logger = logging.getLogger(__name__)
 
-SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-EMAIL_PROVIDER = os.getenv("EMAIL_PROVIDER", "smtp").lower()
-DEFAULT_RECIPIENT = os.getenv("EMAIL_TO")  # optional override
-
 
 def _send_via_smtp(
     sender: str,
@@ -25,8 +14,14 @@ def _send_via_smtp(
     full_html: str,
     plain_text: str,
 ) -> None:
-    user = os.getenv("SMTP_USER")
-    password = os.getenv("SMTP_PASS")
+    # smtplib pulls in ssl; only load it when a message is actually sent.
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    settings = get_settings()
+    user = settings.smtp_user
+    password = settings.smtp_pass
 
     if not all([user, password]):
         logger.error("Missing SMTP_USER / SMTP_PASS; aborting SMTP send")
@@ -41,9 +36,12 @@ def _send_via_smtp(
     msg.attach(MIMEText(full_html, "html", "utf-8"))
 
     logger.debug(
-        "Connecting to SMTP server %s:%s as %s", SMTP_HOST, SMTP_PORT, user
+        "Connecting to SMTP server %s:%s as %s",
+        settings.smtp_host,
+        settings.smtp_port,
+        user,
     )
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
+    with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=30) as server:
         server.starttls()
         server.login(user, password)
         logger.info("Sending email '%s' to %s via SMTP", subject, recipient)
@@ -57,7 +55,9 @@ def _send_via_sendgrid(
     full_html: str,
     plain_text: str,
 ) -> None:
-    api_key = os.getenv("SENDGRID_API_KEY")
+    import requests
+
+    api_key = get_settings().sendgrid_api_key
     if not api_key:
         logger.error("Missing SENDGRID_API_KEY; aborting SendGrid send")
         raise RuntimeError("SENDGRID_API_KEY is required for SendGrid provider.")
@@ -99,12 +99,13 @@ def send_email(
     text_body: Optional[str] = None,
     recipient: Optional[str] = None,
 ):
-    sender = os.getenv("EMAIL_FROM")
+    settings = get_settings()
+    sender = settings.email_from
     if not sender:
         logger.error("EMAIL_FROM missing; aborting email send")
         raise RuntimeError("EMAIL_FROM is required.")
 
-    recipient = recipient or DEFAULT_RECIPIENT or sender
+    recipient = recipient or settings.email_to or sender
     plain_text = (text_body or "").strip()
     full_html = (
         '<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"></head>'
@@ -112,16 +113,20 @@ def send_email(
     )
 
     logger.debug(
-        "Dispatching email via provider '%s' to %s", EMAIL_PROVIDER, recipient
+        "Dispatching email via provider '%s' to %s",
+        settings.email_provider,
+        recipient,
     )
 
-    if EMAIL_PROVIDER == "sendgrid":
-        _send_via_sendgrid(sender, recipient, subject, full_html, plain_text)
-    elif EMAIL_PROVIDER == "smtp":
-        _send_via_smtp(sender, recipient, subject, full_html, plain_text)
+    if settings.email_provider == "sendgrid":
+        with EMAIL_SEND_SECONDS.time(provider="sendgrid"):
+            _send_via_sendgrid(sender, recipient, subject, full_html, plain_text)
+    elif settings.email_provider == "smtp":
+        with EMAIL_SEND_SECONDS.time(provider="smtp"):
+            _send_via_smtp(sender, recipient, subject, full_html, plain_text)
     else:
-        logger.error("Unsupported email provider '%s'", EMAIL_PROVIDER)
+        logger.error("Unsupported email provider '%s'", settings.email_provider)
         raise RuntimeError(
-            f"Unsupported EMAIL_PROVIDER '{EMAIL_PROVIDER}'. "
+            f"Unsupported EMAIL_PROVIDER '{settings.email_provider}'. "
             "Valid options: 'smtp', 'sendgrid'."
         )
@@ -0,0 +1,289 @@
+"""
+Incremental RSS/Atom reader.
+
+:class:`FeedStream` issues one (conditional) GET with ``stream=True`` and
+parses the body with ``xml.etree.ElementTree.iterparse`` as it arrives,
+yielding one entry dict at a time and discarding each element once it has
+been handed out. Memory therefore stays flat regardless of feed size, and
+when the consumer stops early (already-seen URLs, age cutoff) the rest of
+the document is never downloaded.
+
+Entries use the same keys ``ingestion`` reads from ``feedparser`` entries
+(``link``, ``title``, ``summary``, ``content``, ``published_parsed``). If
+the document is not well-formed XML before any entry has been produced, the
+stream falls back to ``feedparser``, which is slower but forgiving.
+"""
+
+import calendar
+import importlib
+import logging
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterator, Optional
+
+from app.core.config import get_settings
+from app.core.metrics import FEED_FETCH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Loaded on first use (see _lazy) to keep app startup fast.
+requests = None
+feedparser = None
+
+_settings = get_settings()
+FEED_TIMEOUT_S = _settings.feed_timeout_s
+FEED_MAX_AGE_DAYS = _settings.feed_max_age_days  # 0 = no cutoff
+FEED_STOP_AFTER_SEEN = _settings.feed_stop_after_seen
+FEED_USER_AGENT = _settings.feed_user_agent
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+DC = "{http://purl.org/dc/elements/1.1/}"
+MEDIA = "{http://search.yahoo.com/mrss/}"
+RSS1 = "{http://purl.org/rss/1.0/}"
+
+_ENTRY_TAGS = {"item", f"{RSS1}item", f"{ATOM}entry"}
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    if elem is None:
+        return ""
+    # Atom xhtml content nests markup; keep the inner text.
+    if len(elem):
+        return "".join(elem.itertext()).strip()
+    return (elem.text or "").strip()
+
+
+def _find(elem: ET.Element, *tags: str) -> Optional[ET.Element]:
+    for tag in tags:
+        found = elem.find(tag)
+        if found is not None:
+            return found
+    return None
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        parsed = None
+    if parsed is None:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _atom_link(elem: ET.Element) -> str:
+    fallback = ""
+    for link in elem.findall(f"{ATOM}link"):
+        rel = link.get("rel", "alternate")
+        href = link.get("href", "")
+        if rel == "alternate" and href:
+            return href
+        fallback = fallback or href
+    return fallback
+
+
+def _entry_from_element(elem: ET.Element) -> Dict:
+    if elem.tag == f"{ATOM}entry":
+        link = _atom_link(elem)
+        title = _text(_find(elem, f"{ATOM}title"))
+        summary = _text(
+            _find(elem, f"{ATOM}summary", f"{MEDIA}group/{MEDIA}description")
+        )
+        content = _text(_find(elem, f"{ATOM}content"))
+        date_text = _text(_find(elem, f"{ATOM}published", f"{ATOM}updated"))
+    else:
+        link = _text(_find(elem, "link", f"{RSS1}link"))
+        if not link:
+            guid = elem.find("guid")
+            if guid is not None and guid.get("isPermaLink", "true") == "true":
+                link = _text(guid)
+        title = _text(_find(elem, "title", f"{RSS1}title"))
+        summary = _text(_find(elem, "description", f"{RSS1}description"))
+        content = _text(_find(elem, f"{CONTENT}encoded"))
+        date_text = _text(_find(elem, "pubDate", f"{DC}date"))
+
+    published = _parse_date(date_text)
+    entry = {"link": link, "title": title, "summary": summary}
+    if content:
+        entry["content"] = [{"value": content}]
+    if published is not None:
+        # Same shape feedparser exposes (UTC struct_time), so ingestion can
+        # treat both alike.
+        entry["published_parsed"] = published.astimezone(timezone.utc).timetuple()
+    return entry
+
+
+class FeedStream:
+    """
+    One conditional fetch of a feed, iterated lazily.
+
+    ``status`` is the HTTP status (304 means unchanged and yields nothing);
+    ``etag`` / ``modified`` are the validators to send next time.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        etag: Optional[str] = None,
+        modified: Optional[str] = None,
+        timeout: float = FEED_TIMEOUT_S,
+    ):
+        self.url = url
+        self.etag = etag
+        self.modified = modified
+        self.status = 200
+        self.bozo_exception: Optional[Exception] = None
+        self._timeout = timeout
+        self._response = None
+        self._elapsed = 0.0
+
+        headers = {"User-Agent": FEED_USER_AGENT}
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+        start = time.perf_counter()
+        try:
+            try:
+                self._response = _lazy("requests").get(
+                    url, headers=headers, timeout=timeout, stream=True
+                )
+            finally:
+                self._elapsed += time.perf_counter() - start
+            self.status = self._response.status_code
+            if self.status != 304:
+                self._response.raise_for_status()
+        except Exception:
+            # The caller never gets to enter the ``with`` block: release the
+            # connection and record the fetch time here.
+            self.close()
+            raise
+        self.etag = self._response.headers.get("ETag") or etag
+        self.modified = self._response.headers.get("Last-Modified") or modified
+
+    def close(self) -> None:
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+        if self._elapsed:
+            FEED_FETCH_SECONDS.observe(self._elapsed)
+            self._elapsed = 0.0
+
+    def __enter__(self) -> "FeedStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self.status == 304 or self._response is None:
+            return
+        raw = self._response.raw
+        raw.decode_content = True
+        produced = 0
+        stack = []
+        parser = ET.iterparse(raw, events=("start", "end"))
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    event, elem = next(parser)
+                except StopIteration:
+                    return
+                finally:
+                    self._elapsed += time.perf_counter() - start
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag in _ENTRY_TAGS:
+                    entry = _entry_from_element(elem)
+                    # Drop the parsed subtree so memory does not grow with the feed.
+                    elem.clear()
+                    if stack:
+                        stack[-1].remove(elem)
+                    produced += 1
+                    yield entry
+        except ET.ParseError as exc:
+            self.bozo_exception = exc
+            if produced:
+                logger.warning(
+                    "Feed %s became malformed after %d entries: %s",
+                    self.url,
+                    produced,
+                    exc,
+                )
+                return
+            logger.warning(
+                "Feed %s is not well-formed XML (%s); falling back to feedparser",
+                self.url,
+                exc,
+            )
+            yield from self._feedparser_fallback()
+
+    def _feedparser_fallback(self) -> Iterator[Dict]:
+        start = time.perf_counter()
+        parsed = _lazy("feedparser").parse(self.url)
+        self._elapsed += time.perf_counter() - start
+        yield from parsed.entries
+
+
+def _lazy(name: str):
+    """Import a module-level dependency (``requests``/``feedparser``) on demand."""
+    module = globals()[name]
+    if module is None:
+        module = globals()[name] = importlib.import_module(name)
+    return module
+
+
+def iter_new_entries(
+    stream: FeedStream,
+    seen: Callable[[str], bool],
+    max_age_days: float = FEED_MAX_AGE_DAYS,
+    stop_after: int = FEED_STOP_AFTER_SEEN,
+    on_seen: Optional[Callable[[Dict], None]] = None,
+) -> Iterator[Dict]:
+    """
+    Yield entries that are not yet ingested and not older than the cutoff.
+
+    Feeds list newest entries first, so after ``stop_after`` consecutive
+    entries that are already seen or too old the rest of the feed is
+    skipped (and never downloaded). A few stragglers are tolerated because
+    some feeds pin or reorder posts.
+    """
+    cutoff = None
+    if max_age_days > 0:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+    streak = 0
+    for entry in stream:
+        link = entry.get("link", "")
+        published = entry.get("published_parsed")
+        too_old = bool(
+            cutoff
+            and published
+            and datetime.fromtimestamp(calendar.timegm(published), timezone.utc) < cutoff
+        )
+        if link and (too_old or seen(link)):
+            if on_seen:
+                on_seen(entry)
+            streak += 1
+            if stop_after and streak >= stop_after:
+                logger.debug(
+                    "Stopping %s after %d consecutive known/old entries",
+                    stream.url,
+                    streak,
+                )
+                return
+            continue
+        streak = 0
+        yield entry
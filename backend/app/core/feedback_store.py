@@ -0,0 +1,525 @@
+"""
+Reader feedback: batched writes and time-decayed running scores.
+
+Votes from ``POST /feedback`` are queued in memory and flushed by a
+background thread every ``FEEDBACK_FLUSH_S`` seconds, or sooner once
+``FEEDBACK_BATCH_SIZE`` votes are waiting. A flush does two things:
+
+* one bulk insert of the raw rows into the Supabase ``feedback`` table;
+* one SQLite transaction that folds the votes into running aggregates per
+  item and per source (see :class:`ScoreStore`).
+
+Aggregates hold exponentially decayed up / down counts (half-life
+``FEEDBACK_HALF_LIFE_H``). Reading them is a primary-key lookup, so
+curation never re-reads raw votes. The score file (``FEEDBACK_DB``) is
+shared by every worker on a host. Set it to an empty string to keep only
+the raw rows.
+
+A batch that fails ``FEEDBACK_MAX_ATTEMPTS`` times is written one vote at
+a time; votes that still fail are logged and dropped.
+
+The raw rows are the source of truth: the score file is a cache that may
+live on ephemeral disk. At startup (:func:`start_feedback`), if the score
+file has not been rebuilt yet (new, or from before rebuilds existed), a
+background thread replaces the aggregates with ones folded from the raw
+votes of the last ``FEEDBACK_REBUILD_HALF_LIVES`` half-lives; older votes
+have decayed to almost nothing.
+"""
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import FEEDBACK_FLUSHES, FEEDBACK_VOTES
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+FEEDBACK_DB = _settings.feedback_db
+FEEDBACK_HALF_LIFE_H = _settings.feedback_half_life_h
+FEEDBACK_FLUSH_S = _settings.feedback_flush_s
+FEEDBACK_BATCH_SIZE = _settings.feedback_batch_size
+FEEDBACK_MAX_PENDING = _settings.feedback_max_pending
+# Failed batch writes before the batch is retried one vote at a time.
+FEEDBACK_MAX_ATTEMPTS = _settings.feedback_max_attempts
+FEEDBACK_REBUILD_HALF_LIVES = _settings.feedback_rebuild_half_lives
+FEEDBACK_REBUILD_BATCH = _settings.feedback_rebuild_batch
+ITEM_WEIGHT = _settings.feedback_item_weight
+SOURCE_WEIGHT = _settings.feedback_source_weight
+
+# Weight of the neutral prior in source quality: a source needs a few votes
+# before its quality moves far from zero.
+SOURCE_PRIOR_VOTES = 5.0
+# Item rows whose decayed votes fall below this are dropped every
+# PRUNE_EVERY flushes.
+PRUNE_BELOW = 0.05
+PRUNE_EVERY = 50
+
+_THUMBS = {"up": 1, "down": -1}
+
+
+class ScoreStore:
+    """
+    Decayed vote totals keyed by ``(kind, key)`` where kind is item/source.
+
+    Each row keeps ``ups`` and ``downs`` as of ``updated_at``; both decay by
+    ``0.5 ** (age / half_life)``, applied when the row is next written or read.
+    """
+
+    def __init__(self, path: str, half_life_h: float = FEEDBACK_HALF_LIFE_H):
+        self.path = path
+        self.half_life_s = max(half_life_h, 0.001) * 3600
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "kind TEXT NOT NULL, key INTEGER NOT NULL, ups REAL NOT NULL, "
+            "downs REAL NOT NULL, votes INTEGER NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (kind, key)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Not every SQLite build ships the math functions.
+            conn.create_function("exp", 1, math.exp, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    def _decay(self, age: float) -> float:
+        return 0.5 ** (max(age, 0.0) / self.half_life_s)
+
+    def apply(self, votes: Iterable[Tuple[str, int, int, float]]) -> int:
+        """Fold ``(kind, key, direction, ts)`` votes in, in one transaction."""
+        return self._fold(votes, rebuild=False) or 0
+
+    def rebuild(self, votes: Iterable[Tuple[str, int, int, float]]) -> Optional[int]:
+        """
+        Replace every score with ``votes`` folded from scratch and mark the
+        store rebuilt; ``None`` (nothing written) if another worker did first.
+        """
+        return self._fold(votes, rebuild=True)
+
+    def needs_rebuild(self) -> bool:
+        row = self._connect().execute("SELECT 1 FROM meta WHERE key = 'rebuilt_at'").fetchone()
+        return row is None
+
+    def _fold(
+        self, votes: Iterable[Tuple[str, int, int, float]], rebuild: bool
+    ) -> Optional[int]:
+        deltas: Dict[Tuple[str, int], List[float]] = {}
+        for kind, key, direction, ts in votes:
+            entry = deltas.setdefault((kind, key), [0.0, 0.0, 0, ts])
+            # Bring earlier votes in the batch forward to this vote's time.
+            factor = self._decay(ts - entry[3]) if ts > entry[3] else 1.0
+            entry[0] = entry[0] * factor + (direction > 0)
+            entry[1] = entry[1] * factor + (direction < 0)
+            entry[2] += 1
+            entry[3] = max(entry[3], ts)
+        if not deltas and not rebuild:
+            return 0
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if rebuild:
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'rebuilt_at'").fetchone():
+                    conn.execute("ROLLBACK")
+                    return None
+                conn.execute("DELETE FROM scores")
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('rebuilt_at', ?)",
+                    (str(time.time()),),
+                )
+            rows = []
+            for kind in {kind for kind, _ in deltas}:
+                keys = [key for k, key in deltas if k == kind]
+                current = self._rows(conn, kind, keys)
+                for key in keys:
+                    ups, downs, votes, ts = deltas[(kind, key)]
+                    old = current.get(key)
+                    if old:
+                        updated_at = max(ts, old[3])
+                        new_factor = self._decay(updated_at - ts)
+                        old_factor = self._decay(updated_at - old[3])
+                        ups = ups * new_factor + old[0] * old_factor
+                        downs = downs * new_factor + old[1] * old_factor
+                        votes += old[2]
+                        ts = updated_at
+                    rows.append((kind, key, ups, downs, votes, ts))
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores (kind, key, ups, downs, votes, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    @staticmethod
+    def _rows(conn, kind: str, keys: List[int]) -> Dict[int, tuple]:
+        found = {}
+        # Stay well below SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, ups, downs, votes, updated_at in conn.execute(
+                "SELECT key, ups, downs, votes, updated_at FROM scores "
+                f"WHERE kind = ? AND key IN ({placeholders})",
+                (kind, *chunk),
+            ):
+                found[key] = (ups, downs, votes, updated_at)
+        return found
+
+    def totals(
+        self, kind: str, keys: Iterable[int], now: Optional[float] = None
+    ) -> Dict[int, Tuple[float, float]]:
+        """Decayed ``(ups, downs)`` for each key that has votes."""
+        keys = list({key for key in keys if key is not None})
+        if not keys:
+            return {}
+        now = time.time() if now is None else now
+        rows = self._rows(self._connect(), kind, keys)
+        return {
+            key: (ups * self._decay(now - ts), downs * self._decay(now - ts))
+            for key, (ups, downs, _, ts) in rows.items()
+        }
+
+    def item_scores(self, item_ids: Iterable[int]) -> Dict[int, float]:
+        """Net decayed votes per item (positive means liked)."""
+        totals = self.totals("item", item_ids)
+        return {key: ups - downs for key, (ups, downs) in totals.items()}
+
+    def source_quality(self, source_ids: Iterable[int]) -> Dict[int, float]:
+        """Per-source quality in ``(-1, 1)``, shrunk towards 0 for few votes."""
+        return {
+            key: (ups - downs) / (ups + downs + SOURCE_PRIOR_VOTES)
+            for key, (ups, downs) in self.totals("source", source_ids).items()
+        }
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Drop item rows whose votes have decayed to almost nothing."""
+        now = time.time() if now is None else now
+        cur = self._connect().execute(
+            "DELETE FROM scores WHERE kind = 'item' AND "
+            "(ups + downs) * exp(? * (updated_at - ?)) < ?",
+            (math.log(2) / self.half_life_s, now, PRUNE_BELOW),
+        )
+        return cur.rowcount
+
+
+def _parse_ts(value) -> float:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def rebuild_scores(store: ScoreStore, repo=None) -> Optional[int]:
+    """
+    Rebuild ``store`` from the raw ``feedback`` rows unless that was already
+    done. Returns the number of score rows written, or ``None`` if skipped.
+    """
+    if not store.needs_rebuild():
+        return None
+    if repo is None:
+        from app.core.storage import get_repository
+
+        repo = get_repository()
+    horizon = time.time() - FEEDBACK_REBUILD_HALF_LIVES * store.half_life_s
+    start_iso = datetime.fromtimestamp(horizon, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+    votes: List[Tuple[int, int, float]] = []
+    after_id = 0
+    while True:
+        rows = repo.feedback_since(start_iso, after_id, FEEDBACK_REBUILD_BATCH)
+        if not rows:
+            break
+        after_id = rows[-1]["id"]
+        votes.extend(
+            (row["item_id"], _THUMBS[row["thumbs"]], _parse_ts(row.get("created_at")))
+            for row in rows
+            if row.get("thumbs") in _THUMBS and row.get("item_id") is not None
+        )
+
+    item_ids = sorted({item_id for item_id, _, _ in votes})
+    sources: Dict[int, Optional[int]] = {}
+    for start in range(0, len(item_ids), 500):
+        for row in repo.get_items(item_ids[start : start + 500], "id,source_id"):
+            sources[row["id"]] = row.get("source_id")
+
+    updates = []
+    for item_id, direction, ts in votes:
+        updates.append(("item", item_id, direction, ts))
+        if sources.get(item_id) is not None:
+            updates.append(("source", sources[item_id], direction, ts))
+    # Scores other workers folded in meanwhile are replaced, so their votes
+    # are not counted twice; only a vote flushed between the read above and
+    # this write can be missed.
+    written = store.rebuild(updates)
+    if written is not None:
+        logger.info("Rebuilt feedback scores from %d raw vote(s)", len(votes))
+    return written
+
+
+_store: Optional[ScoreStore] = None
+_store_lock = threading.Lock()
+_store_initialised = False
+
+
+def get_store() -> Optional[ScoreStore]:
+    global _store, _store_initialised
+    with _store_lock:
+        if not _store_initialised:
+            _store_initialised = True
+            if FEEDBACK_DB:
+                try:
+                    _store = ScoreStore(FEEDBACK_DB)
+                except Exception:
+                    logger.warning(
+                        "Feedback scores unavailable at %s; continuing without them",
+                        FEEDBACK_DB,
+                        exc_info=True,
+                    )
+        return _store
+
+
+def _rebuild_in_background() -> None:
+    try:
+        store = get_store()
+        if store is not None:
+            rebuild_scores(store)
+    except Exception:
+        logger.warning("Could not rebuild feedback scores from raw votes", exc_info=True)
+
+
+def start_feedback() -> threading.Thread:
+    """
+    Rebuild the score file from raw votes off the request path; called at
+    startup. Curation reads whatever scores exist until it finishes.
+    """
+    thread = threading.Thread(
+        target=_rebuild_in_background, name="feedback-rebuild", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def set_store(store: Optional[ScoreStore]) -> None:
+    """Replace the process-wide score store (``None`` disables aggregates)."""
+    global _store, _store_initialised
+    with _store_lock:
+        _store = store
+        _store_initialised = True
+
+
+class FeedbackPipeline:
+    """Queues votes and writes them in batches from a background thread."""
+
+    def __init__(
+        self, flush_s: float = FEEDBACK_FLUSH_S, batch_size: int = FEEDBACK_BATCH_SIZE
+    ):
+        self.flush_s = flush_s
+        self.batch_size = max(1, batch_size)
+        self._writes = 0
+        self._pending: Deque[Dict] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="feedback-flush", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self.flush()
+
+    def submit(self, item_id: int, thumbs: str, diff: Optional[dict] = None) -> int:
+        """Queue one vote; returns the number of votes now waiting."""
+        FEEDBACK_VOTES.inc(thumbs=thumbs if thumbs in _THUMBS else "other")
+        with self._lock:
+            if len(self._pending) >= FEEDBACK_MAX_PENDING:
+                # Shed the oldest vote rather than grow without bound.
+                self._pending.popleft()
+                logger.warning("Feedback queue full; dropped the oldest vote")
+            self._pending.append(
+                {"item_id": item_id, "thumbs": thumbs, "diff": diff or {}, "ts": time.time()}
+            )
+            waiting = len(self._pending)
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        if waiting >= self.batch_size:
+            self._wake.set()
+        return waiting
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_s)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Feedback flush failed")
+
+    def flush(self) -> int:
+        """Write every queued vote now; returns how many were written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    count = min(len(self._pending), self.batch_size)
+                    batch = [self._pending.popleft() for _ in range(count)]
+                if not batch:
+                    return written
+                try:
+                    self._write(batch)
+                except Exception:
+                    FEEDBACK_FLUSHES.inc(outcome="error")
+                    for vote in batch:
+                        vote["attempts"] = vote.get("attempts", 0) + 1
+                    if max(vote["attempts"] for vote in batch) < FEEDBACK_MAX_ATTEMPTS:
+                        with self._lock:
+                            self._pending.extendleft(reversed(batch))
+                        logger.warning(
+                            "Could not write %d vote(s); will retry", len(batch), exc_info=True
+                        )
+                        return written
+                    # One bad row (e.g. a vote for a deleted item) must not
+                    # hold up every vote queued behind it.
+                    written += self._write_each(batch)
+                    continue
+                FEEDBACK_FLUSHES.inc(outcome="ok")
+                written += len(batch)
+
+    def _write_each(self, batch: List[Dict]) -> int:
+        """Write ``batch`` one vote at a time, dropping the votes that fail."""
+        written = 0
+        for vote in batch:
+            try:
+                self._write([vote])
+            except Exception as exc:
+                FEEDBACK_FLUSHES.inc(outcome="dropped")
+                logger.error(
+                    "Dropping vote %r for item %s after %d attempt(s): %s",
+                    vote["thumbs"],
+                    vote["item_id"],
+                    vote["attempts"] + 1,
+                    exc,
+                )
+                continue
+            FEEDBACK_FLUSHES.inc(outcome="ok")
+            written += 1
+        return written
+
+    def _write(self, batch: List[Dict]) -> None:
+        from app.core.storage import get_repository
+
+        repo = get_repository()
+        repo.add_feedback(
+            [{"item_id": v["item_id"], "thumbs": v["thumbs"], "diff": v["diff"]} for v in batch]
+        )
+
+        store = get_store()
+        if store is None:
+            return
+        voted = [v for v in batch if v["thumbs"] in _THUMBS]
+        if not voted:
+            return
+        item_ids = sorted({v["item_id"] for v in voted})
+        try:
+            rows = repo.get_items(item_ids, "id,source_id")
+            sources = {row["id"]: row.get("source_id") for row in rows}
+            updates = []
+            for vote in voted:
+                direction = _THUMBS[vote["thumbs"]]
+                updates.append(("item", vote["item_id"], direction, vote["ts"]))
+                source_id = sources.get(vote["item_id"])
+                if source_id is not None:
+                    updates.append(("source", source_id, direction, vote["ts"]))
+            store.apply(updates)
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                store.prune()
+        except Exception:
+            # Raw rows are already stored; retrying would double-count them.
+            logger.warning("Could not update feedback scores", exc_info=True)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+_pipeline = FeedbackPipeline()
+
+
+def get_pipeline() -> FeedbackPipeline:
+    return _pipeline
+
+
+def record_vote(item_id: int, thumbs: str, diff: Optional[dict] = None) -> int:
+    return _pipeline.submit(item_id, thumbs, diff)
+
+
+def stop_feedback() -> None:
+    """Flush queued votes; called on shutdown."""
+    _pipeline.stop()
+
+
+def rank_items(items: List[Dict], limit: int) -> List[Dict]:
+    """
+    Re-rank newest-first ``items`` by recency plus feedback, keep ``limit``.
+
+    Recency contributes 1.0 for the newest candidate down to 0 for the
+    oldest; item scores are squashed with ``tanh`` so one popular story
+    cannot swamp everything else.
+    """
+    store = get_store()
+    if store is None or len(items) <= 1:
+        return items[:limit]
+    try:
+        item_scores = store.item_scores(it.get("id") for it in items)
+        quality = store.source_quality(it.get("source_id") for it in items)
+    except Exception:
+        logger.warning("Feedback scores unavailable; ranking by recency", exc_info=True)
+        return items[:limit]
+    if not item_scores and not quality:
+        return items[:limit]
+
+    last = len(items) - 1
+
+    def score(pair):
+        position, item = pair
+        return (
+            1.0 - position / last
+            + ITEM_WEIGHT * math.tanh(item_scores.get(item.get("id"), 0.0))
+            + SOURCE_WEIGHT * quality.get(item.get("source_id"), 0.0)
+        )
+
+    ranked = sorted(enumerate(items), key=score, reverse=True)
+    return [item for _, item in ranked[:limit]]
@@ -3,20 +3,34 @@ from __future__ import annotations
 import logging
 import time
 from datetime import datetime
-from typing import Dict, Iterable, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-import feedparser
-
-from app.core.content_utils import fetch_article_text, strip_markup
+from app.core import tracing
+from app.core.config import get_settings
+from app.core.content_utils import (
+    cached_article_text,
+    download_article,
+    remember_article_text,
+)
+from app.core.extraction import extract_many
+from app.core.feed_stream import FEED_STOP_AFTER_SEEN, iter_new_entries
 from app.core.llm_utils import (
     fallback_summary,
     normalize_summary,
+    story_source,
     summarize_story,
-    summary_is_informative,
+    summary_version,
 )
+from app.core.metrics import DEDUP_SKIPS
+from app.core.retention import encode_content
+from app.core.source_adapters import SourceAdapter, get_adapter
+from app.core.summary_state import content_hash, record_attempt
 
 logger = logging.getLogger(__name__)
 
+_settings = get_settings()
+UPSERT_BATCH_SIZE = _settings.ingest_upsert_batch
+
 
 def _clean_text(value: str | None) -> str | None:
     if value is None:
@@ -25,16 +39,9 @@ def _clean_text(value: str | None) -> str | None:
     return value.replace("\x00", "")
 
 
-def _existing_urls(sb, source_id: int) -> set[str]:
+def _existing_urls(repo, source_id: int) -> set[str]:
     try:
-        existing = (
-            sb.table("items")
-            .select("url")
-            .eq("source_id", source_id)
-            .execute()
-            .data
-        )
-        urls = {row["url"] for row in existing if row.get("url")}
+        urls = repo.item_urls(source_id)
         logger.debug("Found %d existing URLs for source %s", len(urls), source_id)
         return urls
     except Exception:
@@ -42,108 +49,271 @@ def _existing_urls(sb, source_id: int) -> set[str]:
         return set()
 
 
-def ingest_feed(sb, source: Dict) -> Tuple[int, Iterable[Dict]]:
+def _published(entry) -> str:
+    if entry.get("published_parsed"):
+        return datetime.fromtimestamp(
+            time.mktime(entry["published_parsed"])
+        ).isoformat()
+    return datetime.now().isoformat()
+
+
+def _fetch_job(entry, fetch: bool = True) -> Dict:
+    """
+    Download (or reuse the cached text of) an entry's article page. With
+    ``fetch=False`` only the feed's own summary and content are used.
+    """
+    link = entry.get("link", "")
+    raw_content = (
+        entry.get("content", [{}])[0].get("value", "")
+        if entry.get("content")
+        else ""
+    )
+    job = {
+        "html": None,
+        "cached": None,
+        "summary": entry.get("summary", ""),
+        "content": raw_content,
+    }
+    if not link or not fetch:
+        return job
+    with tracing.span("fetch", url=link) as fetch_span:
+        hit, cached = cached_article_text(link)
+        if hit:
+            fetch_span.set_attribute("cached", True)
+            job["cached"] = cached
+        else:
+            job["html"] = download_article(link)
+    return job
+
+
+def _summarise_item(entry, source_id: int, cleaned: Dict, version: str) -> Dict:
+    """Summarise one cleaned feed entry into an item row."""
+    link = entry.get("link", "")
+    article_text = cleaned["article_text"] or cleaned["content"] or cleaned["summary"]
+
+    title = entry.get("title", "Untitled")
+    summary_source = story_source(
+        title, article_text, cleaned["summary"], cleaned["content"]
+    )
+    with tracing.span("summarise", url=link) as summarise_span:
+        story = summarize_story(summary_source, title)
+        ok = story["ok"]
+        if not ok:
+            logger.debug(
+                "Using fallback summary for link %s (title: %s)", link, story["headline"]
+            )
+            summarise_span.set_attribute("fallback", True)
+            story["summary"] = fallback_summary(story["headline"])
+
+    story["summary"] = normalize_summary(_clean_text(story["summary"]) or "")
+    content = _clean_text(article_text)
+
+    return {
+        "source_id": source_id,
+        "title": _clean_text(story["headline"]),
+        "url": link,
+        "content": encode_content(content),
+        "summary": _clean_text(story["summary"]),
+        "published": _published(entry),
+        **record_attempt({}, ok, version, content_hash(content)),
+    }
+
+
+def _build_items(entries: List, source_id: int, fetch: bool = True) -> List[Dict]:
+    """
+    Fetch, clean and summarise a batch of feed entries into item rows.
+
+    Downloads happen first (unless ``fetch`` is off), then the whole batch
+    is cleaned in one go (in worker processes when ``INGEST_PROCESS_WORKERS``
+    is set), then each entry is summarised.
+    """
+    jobs = [_fetch_job(entry, fetch) for entry in entries]
+    with tracing.span("clean", entries=len(jobs)):
+        cleaned = extract_many(jobs)
+    for entry, job, result in zip(entries, jobs, cleaned):
+        if fetch and job["cached"] is None and entry.get("link"):
+            remember_article_text(entry["link"], result["extracted"])
+    version = summary_version()
+    rows = []
+    for entry, result in zip(entries, cleaned):
+        with tracing.span("entry", url=entry.get("link")):
+            rows.append(_summarise_item(entry, source_id, result, version))
+    return rows
+
+
+def ingest_feed(repo, source: Dict) -> Tuple[int, Iterable[Dict]]:
     """
-    Pulls entries from the RSS feed, fetches article bodies, generates
-    news-style headlines + summaries, and upserts items into Supabase.
+    Pulls entries from the source (through its adapter, see
+    :mod:`app.core.source_adapters`), fetches article bodies, generates
+    news-style headlines + summaries, and upserts items through ``repo``
+    (a :class:`app.core.storage.Repository`).
     Returns a tuple of (inserted_count, processed_items).
     """
-    source_id = source["id"]
-    feed_url = source["url"]
-    logger.info("Starting ingestion for source %s (%s)", source_id, feed_url)
+    result = poll_feed(repo, source)
+    return result["inserted"], result["items"]
 
-    existing_urls = _existing_urls(sb, source_id)
 
-    feed = feedparser.parse(feed_url)
-    if feed.bozo:
-        logger.warning(
-            "Feed parser reported a problem for %s - %s",
+def poll_feed(
+    repo,
+    source: Dict,
+    etag: Optional[str] = None,
+    modified: Optional[str] = None,
+    stop_after_seen: int = FEED_STOP_AFTER_SEEN,
+    batch_size: Optional[int] = None,
+    on_batch: Optional[Callable[[List[Dict]], None]] = None,
+) -> Dict:
+    """
+    Conditional variant of :func:`ingest_feed` used by the scheduler.
+
+    Sends ``If-None-Match`` / ``If-Modified-Since`` when validators from a
+    previous poll are supplied. The feed is parsed as it downloads and
+    reading stops once it runs into already-ingested (or too old) entries;
+    see :mod:`app.core.feed_stream`. Returns a dict with ``status`` (HTTP
+    status, 304 when unchanged), ``inserted``, ``items`` (the new rows
+    without their ``content``), the new ``etag`` / ``modified`` validators
+    and ``entry_times`` (publish timestamps of the entries read, used to
+    estimate how often the source updates).
+
+    ``batch_size`` defaults to the adapter's, then ``INGEST_UPSERT_BATCH``.
+    Backfills pass ``stop_after_seen=0`` to read the whole feed, a small
+    ``batch_size`` and ``on_batch``, which is called with each batch of rows
+    once it is stored, to checkpoint progress.
+    """
+    source_id = source["id"]
+    feed_url = source["url"]
+    adapter = get_adapter(source.get("type"))
+    batch_size = batch_size or adapter.batch_size or UPSERT_BATCH_SIZE
+    with adapter.slot(), tracing.span(
+        "source", source_id=source_id, url=feed_url, type=adapter.type
+    ) as source_span:
+        result = _poll_feed(
+            repo,
+            adapter,
+            source_id,
             feed_url,
-            getattr(feed, "bozo_exception", "unknown error"),
+            etag,
+            modified,
+            stop_after_seen,
+            batch_size,
+            on_batch,
         )
+        source_span.set_attribute("inserted", result["inserted"])
+        source_span.set_attribute("status", result["status"])
+        return result
 
-    items_to_insert = []
-    processed_items = []
-    for entry in feed.entries:
-        link = entry.get("link", "")
-        if not link:
-            logger.debug("Skipping entry with no link from %s", feed_url)
-            continue
-        if link in existing_urls:
-            logger.debug("Skipping already ingested link %s", link)
-            continue
-
-        published_time = datetime.now().isoformat()
-        if hasattr(entry, "published_parsed") and entry.published_parsed:
-            published_time = datetime.fromtimestamp(
-                time.mktime(entry.published_parsed)
-            ).isoformat()
-
-        raw_content = (
-            entry.get("content", [{}])[0].get("value", "")
-            if entry.get("content")
-            else ""
-        )
-        raw_summary = entry.get("summary", "")
 
-        article_text = fetch_article_text(link)
-        if not article_text:
-            article_text = strip_markup(raw_content) or strip_markup(raw_summary)
+def _entry_timestamp(entry) -> Optional[float]:
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if not parsed:
+        return None
+    return time.mktime(parsed)
 
-        summary_source = (
-            article_text or strip_markup(raw_summary) or entry.get("title", "")
-        )
 
-        title = entry.get("title", "Untitled")
-        story = summarize_story(summary_source, title)
+def _upsert_batch(repo, rows: List[Dict]) -> int:
+    with tracing.span("upsert", rows=len(rows)):
+        written = repo.upsert_items(rows)
+    if written:
+        # Imported here so NumPy is not loaded at startup.
+        from app.core.semantic_index import index_items
 
-        if not summary_is_informative(story["summary"]):
-            alternate_source = " ".join(
-                filter(
-                    None,
-                    [
-                        title,
-                        strip_markup(raw_summary),
-                        strip_markup(raw_content),
-                        article_text,
-                    ],
-                )
-            )
-            if alternate_source.strip():
-                alt_story = summarize_story(alternate_source, title)
-                if summary_is_informative(alt_story["summary"]):
-                    story = alt_story
+        # Embed once here so curation and search never have to.
+        with tracing.span("index", rows=len(written)):
+            index_items(written)
+    return len(written) if written else len(rows)
 
-        if not summary_is_informative(story["summary"]):
-            logger.debug(
-                "Using fallback summary for link %s (title: %s)", link, story["headline"]
-            )
-            story["summary"] = fallback_summary(story["headline"])
 
-        story["summary"] = normalize_summary(_clean_text(story["summary"]) or "")
+def _poll_feed(
+    repo,
+    adapter: SourceAdapter,
+    source_id: int,
+    feed_url: str,
+    etag: Optional[str],
+    modified: Optional[str],
+    stop_after_seen: int,
+    batch_size: int,
+    on_batch: Optional[Callable[[List[Dict]], None]],
+) -> Dict:
+    logger.info(
+        "Starting ingestion for %s source %s (%s)", adapter.type, source_id, feed_url
+    )
+
+    with tracing.span("feed.open", url=feed_url):
+        feed = adapter.open(feed_url, etag=etag, modified=modified)
+    result = {
+        "status": feed.status,
+        "inserted": 0,
+        "items": [],
+        "etag": feed.etag,
+        "modified": feed.modified,
+        "entry_times": [],
+    }
+    with feed:
+        if feed.status == 304:
+            logger.info("Feed %s not modified since last poll", feed_url)
+            return result
 
-        item = {
-            "source_id": source_id,
-            "title": _clean_text(story["headline"]),
-            "url": link,
-            "content": _clean_text(article_text),
-            "summary": _clean_text(story["summary"]),
-            "published": published_time,
-        }
-        items_to_insert.append(item)
-        processed_items.append(item)
+        existing_urls = _existing_urls(repo, source_id)
 
-    if not items_to_insert:
-        logger.info("No new items found for source %s", source_id)
-        return 0, processed_items
+        def seen(link: str) -> bool:
+            return link in existing_urls
 
-    res = sb.table("items").upsert(items_to_insert, on_conflict="url").execute()
-    inserted_count = (
-        len(res.data) if getattr(res, "data", None) else len(items_to_insert)
-    )
+        def record_time(entry) -> None:
+            stamp = _entry_timestamp(entry)
+            if stamp is not None:
+                result["entry_times"].append(stamp)
+
+        def skipped(entry) -> None:
+            record_time(entry)
+            DEDUP_SKIPS.inc()
+
+        # Entries are processed and written in small batches as the feed
+        # streams in, so only one batch of article bodies is held in memory.
+        batch: List = []
+
+        def flush() -> None:
+            with tracing.span("batch", entries=len(batch)):
+                with tracing.span("prepare", entries=len(batch), type=adapter.type):
+                    entries = adapter.prepare(list(batch))
+                batch.clear()
+                if not entries:
+                    return
+                rows = _build_items(entries, source_id, adapter.fetch_articles)
+                result["items"].extend(
+                    {key: value for key, value in row.items() if key != "content"}
+                    for row in rows
+                )
+                result["inserted"] += _upsert_batch(repo, rows)
+                if on_batch is not None:
+                    on_batch(rows)
+
+        for entry in iter_new_entries(
+            feed, seen, stop_after=stop_after_seen, on_seen=skipped
+        ):
+            record_time(entry)
+            link = entry.get("link", "")
+            if not link:
+                logger.debug("Skipping entry with no link from %s", feed_url)
+                continue
+            existing_urls.add(link)
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+
+    if feed.bozo_exception is not None:
+        logger.warning(
+            "Feed parser reported a problem for %s - %s",
+            feed_url,
+            feed.bozo_exception,
+        )
+    if not result["items"]:
+        logger.info("No new items found for source %s", source_id)
+        return result
     logger.info(
         "Ingestion completed for source %s - %d new item(s)",
         source_id,
-        inserted_count,
+        result["inserted"],
     )
-    return inserted_count, processed_items
+    return result
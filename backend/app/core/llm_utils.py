@@ -1,30 +1,292 @@
+import hashlib
+import json
 import logging
-import os
+import re
+import threading
+import time
 from html import escape, unescape
-from typing import Dict, Tuple
-
-import google.generativeai as genai
-from openai import OpenAI
-from dotenv import load_dotenv
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+from app.core import tracing
+from app.core.config import get_settings
 from app.core.content_utils import strip_markup
+from app.core.metrics import (
+    LLM_CALL_SECONDS,
+    LLM_FALLBACKS,
+    LLM_FIRST_TOKEN_SECONDS,
+    LLM_REPAIRS,
+    LLM_RETRIES,
+    LLM_SKIPS,
+    RENDER_SECONDS,
+    SUMMARY_REJECTIONS,
+)
+from app.core.resilience import CircuitBreaker, TokenBucket
 
-# Load .env values so keys resolve during module import.
-load_dotenv()
 logger = logging.getLogger(__name__)
 
-# Configure Gemini (default)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    logger.info("Configured Gemini client with model '%s'", GEMINI_MODEL)
+_settings = get_settings()
+GEMINI_API_KEY = _settings.gemini_api_key
+GEMINI_MODEL = _settings.gemini_model
+OPENAI_API_KEY = _settings.openai_api_key
+OPENAI_MODEL = _settings.openai_model
+
+# Provider SDKs take over a second to import, so they are loaded and
+# configured on first use rather than at startup.
+genai = None
+openai_client = None
+_sdk_lock = threading.Lock()
+
+
+def _gemini_sdk():
+    global genai
+    with _sdk_lock:
+        if genai is None:
+            import google.generativeai
+
+            google.generativeai.configure(api_key=GEMINI_API_KEY)
+            logger.info("Configured Gemini client with model '%s'", GEMINI_MODEL)
+            genai = google.generativeai
+        return genai
+
+
+def _openai_client():
+    global openai_client
+    with _sdk_lock:
+        if openai_client is None:
+            from openai import OpenAI
+
+            openai_client = OpenAI(api_key=OPENAI_API_KEY)
+            logger.info("Configured OpenAI client")
+        return openai_client
+
+# Bump when the story prompt or its parsing changes, so stored summaries
+# are regenerated (see app/core/summary_state.py).
+STORY_PROMPT_VERSION = 2
+# "json" asks providers for a JSON story object that is validated and
+# repaired locally; "text" uses the older "Headline:/Summary:" lines.
+SUMMARY_OUTPUT = _settings.summary_output
+# Article text shorter than this is summarised together with the title
+# and feed summary, so a single call has enough to work with.
+STORY_MIN_SOURCE_WORDS = _settings.story_min_source_words
+
+LLM_RATE_WAIT_S = _settings.llm_rate_wait_s
+_BREAKER_FAILURES = _settings.llm_breaker_failures
+_BREAKER_COOLDOWN_S = _settings.llm_breaker_cooldown_s
+
+_BREAKERS = {
+    name: CircuitBreaker(
+        f"llm:{name}",
+        failure_threshold=_BREAKER_FAILURES,
+        recovery_timeout=_BREAKER_COOLDOWN_S,
+    )
+    for name in ("gemini", "openai")
+}
+# Per-provider quotas (requests per minute); 0 disables the limiter.
+_LIMITERS = {
+    "gemini": TokenBucket(
+        "llm:gemini",
+        rate=_settings.gemini_rpm / 60,
+        capacity=_settings.gemini_burst,
+    ),
+    "openai": TokenBucket(
+        "llm:openai",
+        rate=_settings.openai_rpm / 60,
+        capacity=_settings.openai_burst,
+    ),
+}
+
+
+def _observe_llm_call(provider: str, model: str, start: float, outcome: str) -> None:
+    LLM_CALL_SECONDS.observe(
+        time.perf_counter() - start, provider=provider, model=model, outcome=outcome
+    )
+
+
+def _is_rate_limit(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if status == 429:
+        return True
+    name = type(exc).__name__
+    return name in {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+
+
+def _gemini_options(json_mode: bool) -> Dict:
+    if not json_mode:
+        return {}
+    return {"generation_config": {"response_mime_type": "application/json"}}
+
 
-# Configure OpenAI (fallback)
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
-if OPENAI_API_KEY:
-    logger.info("Configured OpenAI client")
+def _openai_options(json_mode: bool) -> Dict:
+    return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+
+def _call_gemini(prompt: str, max_tokens: int, json_mode: bool = False) -> str:
+    model = _gemini_sdk().GenerativeModel(GEMINI_MODEL)
+    resp = model.generate_content(prompt, **_gemini_options(json_mode))
+    return (resp.text or "").strip()
+
+
+def _call_openai(prompt: str, max_tokens: int, json_mode: bool = False) -> str:
+    resp = _openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=0.3,
+        **_openai_options(json_mode),
+    )
+    return (resp.choices[0].message.content or "").strip()
+
+
+def _stream_gemini(prompt: str, max_tokens: int, json_mode: bool = False) -> Iterator[str]:
+    model = _gemini_sdk().GenerativeModel(GEMINI_MODEL)
+    for chunk in model.generate_content(prompt, stream=True, **_gemini_options(json_mode)):
+        yield chunk.text or ""
+
+
+def _stream_openai(prompt: str, max_tokens: int, json_mode: bool = False) -> Iterator[str]:
+    stream = _openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+        temperature=0.3,
+        stream=True,
+        **_openai_options(json_mode),
+    )
+    for chunk in stream:
+        if chunk.choices:
+            yield chunk.choices[0].delta.content or ""
+
+
+_STREAMERS = {"gemini": _stream_gemini, "openai": _stream_openai}
+
+
+def _providers():
+    """Configured providers in preference order, as (name, model, call)."""
+    providers = []
+    if GEMINI_API_KEY:
+        providers.append(("gemini", GEMINI_MODEL, _call_gemini))
+    if OPENAI_API_KEY or openai_client is not None:
+        providers.append(("openai", OPENAI_MODEL, _call_openai))
+    return providers
+
+
+def _stream_call(
+    name: str,
+    model: str,
+    prompt: str,
+    max_tokens: int,
+    on_delta: Callable[[str], None],
+    parts: List[str],
+    json_mode: bool = False,
+) -> str:
+    """Stream one provider call, collecting chunks into ``parts``."""
+    start = time.perf_counter()
+    for delta in _STREAMERS[name](prompt, max_tokens, json_mode):
+        if not delta:
+            continue
+        if not parts:
+            LLM_FIRST_TOKEN_SECONDS.observe(
+                time.perf_counter() - start, provider=name, model=model
+            )
+        parts.append(delta)
+        on_delta(delta)
+    return "".join(parts).strip()
+
+
+def _generate(
+    prompt: str,
+    max_tokens: int,
+    label: str,
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> Optional[str]:
+    return _generate_from(prompt, max_tokens, label, on_delta)[0]
+
+
+def _generate_from(
+    prompt: str,
+    max_tokens: int,
+    label: str,
+    on_delta: Optional[Callable[[str], None]] = None,
+    json_mode: bool = False,
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Run ``prompt`` against the first healthy provider that returns text;
+    returns ``(text, provider, model)``.
+
+    Providers whose breaker is open, or whose rate limiter has no token
+    within ``LLM_RATE_WAIT_S``, are skipped without a request. Returns
+    ``None`` when every provider was skipped, failed or returned nothing.
+
+    With ``on_delta`` the response is streamed and each text chunk is passed
+    to it as it arrives. A stream that breaks after its first chunk is not
+    retried elsewhere (the caller has already shown that text); whatever
+    arrived is returned for the caller to validate.
+
+    ``json_mode`` asks the provider for a JSON object.
+    """
+    previous = None
+    for name, model, call in _providers():
+        if previous:
+            LLM_FALLBACKS.inc(from_provider=previous, to_provider=name)
+        previous = name
+
+        breaker = _BREAKERS[name]
+        if not breaker.allow():
+            LLM_SKIPS.inc(provider=name, reason="breaker_open")
+            logger.debug("Skipping %s for %s: circuit open", name, label)
+            continue
+        if not _LIMITERS[name].acquire(max_wait=LLM_RATE_WAIT_S):
+            LLM_SKIPS.inc(provider=name, reason="rate_limited")
+            logger.debug("Skipping %s for %s: local rate limit", name, label)
+            breaker.release()
+            continue
+
+        start = time.perf_counter()
+        parts: List[str] = []
+        try:
+            with tracing.span("llm", provider=name, model=model, stream=on_delta is not None):
+                if on_delta is None:
+                    content = call(prompt, max_tokens, json_mode)
+                else:
+                    content = _stream_call(
+                        name, model, prompt, max_tokens, on_delta, parts, json_mode
+                    )
+        except Exception as exc:
+            _observe_llm_call(name, model, start, "error")
+            rate_limited = _is_rate_limit(exc)
+            # Upstream throttling opens the circuit straight away.
+            breaker.record_failure(
+                weight=_BREAKER_FAILURES if rate_limited else 1
+            )
+            logger.warning(
+                "%s failed for %s (%s: %s)",
+                name,
+                label,
+                type(exc).__name__,
+                str(exc)[:200],
+            )
+            logger.debug("%s failure detail", name, exc_info=True)
+            if parts:
+                return "".join(parts).strip(), name, model
+            LLM_RETRIES.inc(provider=name, model=model, reason="error")
+            continue
+
+        breaker.record_success()
+        if content:
+            _observe_llm_call(name, model, start, "ok")
+            return content, name, model
+        _observe_llm_call(name, model, start, "empty")
+        LLM_RETRIES.inc(provider=name, model=model, reason="empty")
+        logger.info("%s returned empty output for %s", name, label)
+
+    if previous:
+        LLM_FALLBACKS.inc(from_provider=previous, to_provider="truncate")
+    return None, None, None
+
+
+def provider_health() -> Dict[str, str]:
+    """Current breaker state per configured provider."""
+    return {name: _BREAKERS[name].state() for name, _, _ in _providers()}
 
 
 def _sanitize_summary(value: str) -> str:
@@ -48,36 +310,11 @@ def summarize_article(text: str) -> str:
         "Do not include markup, HTML tags, or bullet lists; keep it concise prose.\n\n"
         f"{cleaned_text}"
     )
-    # Try Gemini first
-    try:
-        if not GEMINI_API_KEY:
-            raise RuntimeError("GEMINI_API_KEY not set")
-        logger.debug("Summarising article with Gemini (length=%d)", len(cleaned_text))
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        resp = model.generate_content(prompt)
-        content = resp.text or ""
-        if content.strip():
-            return _sanitize_summary(content)
-        logger.info("Gemini returned empty summary, falling back to OpenAI")
-    except Exception:
-        logger.exception("Gemini summarisation failed - falling back to OpenAI")
-
-    # Fallback: OpenAI
-    try:
-        if not openai_client:
-            raise RuntimeError("OPENAI_API_KEY not set")
-        logger.debug("Summarising article with OpenAI (length=%d)", len(cleaned_text))
-        resp = openai_client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=250,
-            temperature=0.3,
-        )
-        return _sanitize_summary(resp.choices[0].message.content)
-    except Exception:
-        # Last resort: truncate input
-        logger.exception("OpenAI summarisation failed; returning truncated text")
-        return (cleaned_text or "")[:500]
+    content = _generate(prompt, 250, "article")
+    if content:
+        return _sanitize_summary(content)
+    # Last resort: truncate input
+    return (cleaned_text or "")[:500]
 
 
 def normalize_summary(value: str) -> str:
@@ -87,14 +324,18 @@ def normalize_summary(value: str) -> str:
 def summary_is_informative(value: str) -> bool:
     text = strip_markup(value or "")
     if not text:
+        SUMMARY_REJECTIONS.inc(reason="empty")
         return False
     words = text.split()
     if len(words) < 10:
+        SUMMARY_REJECTIONS.inc(reason="too_short")
         return False
     if "why it matters" not in text.lower():
+        SUMMARY_REJECTIONS.inc(reason="missing_why_it_matters")
         return False
     placeholders = {"comments", "comment", "read more", "n/a", "na"}
     if text.strip().lower() in placeholders:
+        SUMMARY_REJECTIONS.inc(reason="placeholder")
         return False
     return True
 
@@ -129,66 +370,425 @@ def _parse_headline_summary(raw: str, fallback_title: str) -> Dict[str, str]:
     return {"headline": headline, "summary": summary}
 
 
-def summarize_story(text: str, fallback_title: str) -> Dict[str, str]:
-    cleaned_text = strip_markup(text)
-    if not cleaned_text:
-        cleaned_text = (text or fallback_title or "").strip()
-
-    prompt = (
+def summary_version() -> str:
+    """
+    Fingerprint of the story prompt and output mode, the configured models
+    and the style profile version. Models are the configured names, not the
+    providers this replica has keys for, so every replica agrees.
+    """
+    from app.core.style_trainer import style_version
+
+    models = f"gemini:{GEMINI_MODEL},openai:{OPENAI_MODEL}"
+    key = f"{STORY_PROMPT_VERSION}|{SUMMARY_OUTPUT}|{models}|style:{style_version()}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+_JSON_FIELDS = {
+    "headline": "headline",
+    "title": "headline",
+    "summary": "summary",
+    "whyitmatters": "why",
+    "why": "why",
+    "impact": "why",
+}
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_WHY_RE = re.compile(r"\bwhy it matters\s*:\s*", re.IGNORECASE)
+
+
+def _escape_end(text: str, i: int) -> int:
+    """Index just past the escape sequence starting at ``text[i]``."""
+    return i + (6 if text[i + 1 : i + 2] == "u" else 2)
+
+
+def _close_truncated(text: str) -> str:
+    """Close a JSON object cut off mid-value (e.g. by the token limit)."""
+    in_string = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\":
+            if _escape_end(text, i) > len(text):
+                # Cut off inside an escape: drop the partial sequence.
+                text = text[:i]
+                break
+            i = _escape_end(text, i)
+            continue
+        if ch == '"':
+            in_string = not in_string
+        i += 1
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    if text.endswith(":"):
+        text += '""'
+    return text + "}"
+
+
+def _load_json_object(raw: str) -> Tuple[Optional[Dict], List[str]]:
+    """The JSON object in ``raw`` and the repairs needed to read it."""
+    repairs = []
+    text = raw.strip()
+    if text.startswith("```"):
+        text = _FENCE_RE.sub("", text).strip()
+        repairs.append("code_fence")
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1:
+        return None, repairs
+    if end < start:
+        text = _close_truncated(text[start:])
+        repairs.append("truncated")
+    else:
+        if start > 0 or end < len(text) - 1:
+            repairs.append("extra_text")
+        text = text[start : end + 1]
+    relaxed = _TRAILING_COMMA_RE.sub(r"\1", text)
+    for candidate, repair in ((text, None), (relaxed, "trailing_comma")):
+        try:
+            # strict=False accepts raw newlines inside strings.
+            value = json.loads(candidate, strict=False)
+        except ValueError:
+            continue
+        if repair:
+            repairs.append(repair)
+        return (value if isinstance(value, dict) else None), repairs
+    return None, repairs
+
+
+def _field_text(value) -> str:
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(part) for part in value)
+    return " ".join(strip_markup(str(value or "")).split())
+
+
+def _story_from_fields(
+    fields: Dict, fallback_title: str
+) -> Tuple[Dict[str, str], List[str]]:
+    """Validate structured story fields, fixing what can be fixed locally."""
+    values: Dict[str, str] = {}
+    for key, value in fields.items():
+        name = _JSON_FIELDS.get(re.sub(r"[^a-z]", "", str(key).lower()))
+        if name and not values.get(name):
+            values[name] = _field_text(value)
+
+    repairs = []
+    headline = values.get("headline", "").strip("\"' ").rstrip(".")
+    if not headline:
+        headline = fallback_title.strip() or "Untitled"
+        repairs.append("missing_headline")
+
+    summary = values.get("summary", "")
+    why = _WHY_RE.sub("", values.get("why", ""), count=1).strip()
+    embedded = _WHY_RE.search(summary)
+    if embedded:
+        # "Why it matters:" written into the summary itself.
+        if not why:
+            why = summary[embedded.end() :].strip()
+        summary = summary[: embedded.start()].strip()
+        repairs.append("why_in_summary")
+
+    text = f"{summary} Why it matters: {why}" if why else summary
+    return {"headline": headline, "summary": _sanitize_summary(text)}, repairs
+
+
+def parse_story(raw: str, fallback_title: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Headline and summary from a structured (JSON) story response, plus the
+    local repairs applied. Output that is not JSON at all is read as the
+    older ``Headline:/Summary:`` lines.
+    """
+    fields, repairs = _load_json_object(raw)
+    if fields is None:
+        return _parse_headline_summary(raw, fallback_title), repairs + ["not_json"]
+    story, field_repairs = _story_from_fields(fields, fallback_title)
+    return story, repairs + field_repairs
+
+
+_PARTIAL_SUMMARY_RE = re.compile(r'"summary"\s*:\s*"')
+_PARTIAL_WHY_RE = re.compile(r'"(?:why_it_matters|whyItMatters|why)"\s*:\s*"')
+
+
+def _partial_string(raw: str, start: int) -> Tuple[Optional[str], bool]:
+    """
+    The JSON string starting at ``raw[start]``, decoded as far as it goes,
+    and whether its closing quote has arrived.
+    """
+    i = start
+    while i < len(raw) and raw[i] != '"':
+        if raw[i] == "\\":
+            if _escape_end(raw, i) > len(raw):
+                break
+            i = _escape_end(raw, i)
+        else:
+            i += 1
+    end = min(i, len(raw))
+    try:
+        text = json.loads(f'"{raw[start:end]}"', strict=False)
+    except ValueError:
+        return None, False
+    return text, i < len(raw) and raw[i] == '"'
+
+
+class _StoryDeltas:
+    """
+    Passes the plain summary text in a streamed JSON story to ``on_delta``
+    as it arrives, instead of raw JSON fragments. The impact line is held
+    back until the summary is complete, then follows after
+    " Why it matters: " as in the stored summary, whichever order the
+    model wrote the fields in.
+    """
+
+    def __init__(self, on_delta: Callable[[str], None]):
+        self._on_delta = on_delta
+        self._raw = ""
+        self._summary_sent = 0
+        self._summary_done = False
+        self._why_sent: Optional[int] = None
+
+    def __call__(self, chunk: str) -> None:
+        self._raw += chunk
+        if not self._summary_done:
+            match = _PARTIAL_SUMMARY_RE.search(self._raw)
+            if match is None:
+                return
+            text, self._summary_done = _partial_string(self._raw, match.end())
+            if text and len(text) > self._summary_sent:
+                self._on_delta(text[self._summary_sent :])
+                self._summary_sent = len(text)
+            if not self._summary_done:
+                return
+        match = _PARTIAL_WHY_RE.search(self._raw)
+        if match is None:
+            return
+        text, _ = _partial_string(self._raw, match.end())
+        if not text:
+            return
+        if self._why_sent is None:
+            self._on_delta(" Why it matters: " + text)
+        elif len(text) > self._why_sent:
+            self._on_delta(text[self._why_sent :])
+        self._why_sent = len(text)
+
+
+def story_source(title: str, *texts: Optional[str]) -> str:
+    """
+    Text to summarise: the first non-empty of ``texts``. When that is
+    shorter than ``STORY_MIN_SOURCE_WORDS``, everything available is joined
+    with the title so one call has all the context there is.
+    """
+    parts = [text.strip() for text in texts if text and text.strip()]
+    primary = parts[0] if parts else ""
+    if len(strip_markup(primary).split()) >= STORY_MIN_SOURCE_WORDS:
+        return primary
+    combined = []
+    for part in [title or "", *parts]:
+        if part and part not in combined:
+            combined.append(part)
+    return " ".join(combined)
+
+
+def _story_prompt(cleaned_text: str, style: str) -> str:
+    if SUMMARY_OUTPUT == "json":
+        return (
+            "You are a newsletter editor. Produce a concise, informative brief.\n"
+            "Respond with only a JSON object with these string fields:\n"
+            '"headline": a sharp news-style headline in Title Case, max 12 words\n'
+            '"summary": two sentences of plain text\n'
+            '"why_it_matters": one sentence on why it matters to the reader\n'
+            "Do not include HTML, markdown, or any text outside the JSON object.\n"
+            f"{style}\n"
+            f"{cleaned_text}"
+        )
+    return (
         "You are a newsletter editor. Produce a concise, informative brief.\n"
         "Respond with exactly two lines:\n"
         "Headline: <A sharp news-style headline in Title Case, max 12 words>\n"
         "Summary: <Two sentences of plain text ending with 'Why it matters:' insight>\n"
-        "Do not include HTML, bullets, or any additional commentary.\n\n"
+        "Do not include HTML, bullets, or any additional commentary.\n"
+        f"{style}\n"
         f"{cleaned_text}"
     )
 
-    try:
-        if not GEMINI_API_KEY:
-            raise RuntimeError("GEMINI_API_KEY not set")
-        logger.debug(
-            "Summarising story with Gemini (title=%s, length=%d)",
-            fallback_title,
-            len(cleaned_text),
-        )
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        resp = model.generate_content(prompt)
-        content = (resp.text or "").strip()
-        if content:
-            return _parse_headline_summary(content, fallback_title)
-        logger.info("Gemini returned empty story summary for %s", fallback_title)
-    except Exception:
-        logger.exception("Gemini failed to summarise story %s", fallback_title)
 
-    try:
-        if not openai_client:
-            raise RuntimeError("OPENAI_API_KEY not set")
-        logger.debug(
-            "Summarising story with OpenAI (title=%s, length=%d)",
-            fallback_title,
-            len(cleaned_text),
+def summarize_story(
+    text: str,
+    fallback_title: str,
+    on_delta: Optional[Callable[[str], None]] = None,
+) -> Dict:
+    """
+    Headline, summary and ``ok`` (whether the summary passed
+    :func:`summary_is_informative`) for an article, from one LLM call.
+
+    Structured output is repaired locally rather than re-requested; an
+    unusable result is counted as a retry for its provider and model,
+    since the item is summarised again on its retry schedule. ``on_delta``
+    receives the summary text as it streams in (parsed out of the JSON in
+    structured mode).
+    """
+    cleaned_text = strip_markup(text)
+    if not cleaned_text:
+        cleaned_text = (text or fallback_title or "").strip()
+
+    # Creator voice from the trained style profile, if there is one. The
+    # trainer pulls in NumPy, so it is imported on first use.
+    from app.core.style_trainer import prompt_guidance
+
+    style = prompt_guidance()
+    if style:
+        style += "\n"
+    json_mode = SUMMARY_OUTPUT == "json"
+    if json_mode and on_delta is not None:
+        on_delta = _StoryDeltas(on_delta)
+    content, provider, model = _generate_from(
+        _story_prompt(cleaned_text, style),
+        260,
+        f"story {fallback_title!r}",
+        on_delta,
+        json_mode,
+    )
+    if not content:
+        summary = normalize_summary(cleaned_text[:500])
+        return {
+            "headline": fallback_title.strip() or "Untitled",
+            "summary": summary,
+            "ok": summary_is_informative(summary),
+        }
+
+    if json_mode:
+        story, repairs = parse_story(content, fallback_title)
+        for repair in repairs:
+            LLM_REPAIRS.inc(provider=provider, model=model, repair=repair)
+    else:
+        story = _parse_headline_summary(content, fallback_title)
+    story["ok"] = summary_is_informative(story["summary"])
+    if not story["ok"]:
+        LLM_RETRIES.inc(provider=provider, model=model, reason="invalid")
+    return story
+
+
+def _story_parts(idx: int, it: Dict, total_items: int) -> Tuple[str, List[str]]:
+    """HTML block and plain-text lines for story number ``idx``."""
+    raw_title = it.get("title", f"Story {idx}") or f"Story {idx}"
+    title = unescape(raw_title)
+    url = it.get("url", "")
+    summary_raw = (it.get("summary", "") or "").strip()
+    summary = unescape(summary_raw)
+
+    text_lines = [f"{idx}. {title}"]
+    if url:
+        text_lines.append(url)
+    if summary:
+        text_lines.append(summary)
+    text_lines.append("")
+
+    title_html = escape(title)
+    summary_html = escape(summary).replace("\n", "<br>")
+    summary_section = ""
+    if summary_html:
+        summary_section = (
+            f'<p style="margin:0 0 12px;font-size:15px;line-height:1.6;color:#1f2933;">'
+            f"{summary_html}"
+            "</p>"
         )
-        resp = openai_client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=260,
-            temperature=0.3,
+
+    border_style = "border-bottom:1px solid #e5e7eb;" if idx != total_items else ""
+    link_html = ""
+    if url:
+        safe_url = escape(url, quote=True)
+        link_html = (
+            f'<a href="{safe_url}" '
+            'style="color:#2563eb;text-decoration:none;font-weight:500;">'
+            "Read the full story -></a>"
         )
-        content = resp.choices[0].message.content.strip()
-        if content:
-            return _parse_headline_summary(content, fallback_title)
-    except Exception:
-        logger.exception("OpenAI failed to summarise story %s", fallback_title)
 
-    return {
-        "headline": fallback_title.strip() or "Untitled",
-        "summary": normalize_summary(cleaned_text[:500]),
-    }
+    block = (
+        f'<div style="margin-bottom:24px;padding-bottom:24px;{border_style}">'
+        f'<div style="font-size:12px;color:#9ca3af;text-transform:uppercase;letter-spacing:0.08em;">'
+        f"Story {idx}"
+        "</div>"
+        f'<h3 style="margin:8px 0 12px;font-size:18px;color:#111827;">{title_html}</h3>'
+        f"{summary_section}"
+        f"{link_html}"
+        "</div>"
+    )
+    return block, text_lines
+
+
+def _trends_parts(trends: list) -> Tuple[str, List[str]]:
+    if not trends:
+        return "", []
+    text_lines = ["Trends to Watch"]
+    for raw_t in trends:
+        if not raw_t:
+            continue
+        clean_t = unescape(raw_t)
+        text_lines.append(f"- {clean_t}")
+    text_lines.append("")
+    trend_items = "".join(
+        f'<li style="margin-bottom:8px;">{escape(unescape(t))}</li>'
+        for t in trends
+        if t
+    )
+    section = (
+        '<div style="margin-top:24px;">'
+        '<h2 style="margin:0 0 12px;font-size:17px;color:#111827;">Trends to Watch</h2>'
+        '<ul style="margin:0;padding-left:20px;color:#374151;font-size:15px;line-height:1.6;">'
+        f"{trend_items}"
+        "</ul>"
+        "</div>"
+    )
+    return section, text_lines
+
+
+def render_shell(intro: str) -> Tuple[str, str]:
+    """
+    The email around the stories, as ``(head, tail)``.
+
+    ``head + story blocks + trends + tail`` is what :func:`render_newsletter`
+    returns as HTML; streaming previews fill the middle in as stories arrive.
+    """
+    intro_html = escape((intro or "").strip()).replace("\n", "<br>")
+    head = (
+        '<div style="background-color:#f5f7fb;padding:24px 0;">'
+        '<table role="presentation" cellpadding="0" cellspacing="0" width="100%" '
+        "style=\"max-width:640px;margin:0 auto;background-color:#ffffff;border-radius:12px;overflow:hidden;"
+        "font-family:'Segoe UI',Arial,sans-serif;color:#1f2933;\">"
+        "<tr>"
+        '<td style="background-color:#111827;padding:28px 32px;">'
+        '<h1 style="margin:0;font-size:24px;color:#ffffff;">CreatorPulse Daily</h1>'
+        f'<p style="margin:12px 0 0;font-size:15px;line-height:1.6;color:#f3f4f6;">{intro_html}</p>'
+        "</td>"
+        "</tr>"
+        "<tr>"
+        '<td style="padding:32px;">'
+        '<h2 style="margin:0 0 16px;font-size:18px;color:#111827;">Top Stories</h2>'
+    )
+    tail = (
+        "</td>"
+        "</tr>"
+        "<tr>"
+        '<td style="background-color:#f3f4f6;padding:16px 32px;font-size:12px;color:#6b7280;text-align:center;">'
+        "You are receiving this update because you follow CreatorPulse."
+        "</td>"
+        "</tr>"
+        "</table>"
+        "</div>"
+    )
+    return head, tail
+
+
+def render_story(idx: int, item: Dict, total_items: int) -> str:
+    """HTML block for one story (1-based ``idx``), as placed by :func:`render_newsletter`."""
+    return _story_parts(idx, item, total_items)[0]
+
+
+def render_trends(trends: list) -> str:
+    return _trends_parts(trends)[0]
 
 
+@RENDER_SECONDS.time()
 def render_newsletter(intro: str, items: list, trends: list) -> Tuple[str, str]:
     intro_text = (intro or "").strip()
-    intro_html = escape(intro_text).replace("\n", "<br>")
     logger.debug(
         "Rendering newsletter with %d item(s) and intro length %d",
         len(items),
@@ -207,51 +807,9 @@ def render_newsletter(intro: str, items: list, trends: list) -> Tuple[str, str]:
         text_lines.append("")
 
     for idx, it in enumerate(items, start=1):
-        raw_title = it.get("title", f"Story {idx}") or f"Story {idx}"
-        title = unescape(raw_title)
-        url = it.get("url", "")
-        summary_raw = (it.get("summary", "") or "").strip()
-        summary = unescape(summary_raw)
-
-        text_lines.append(f"{idx}. {title}")
-        if url:
-            text_lines.append(url)
-        if summary:
-            text_lines.append(summary)
-        text_lines.append("")
-
-        title_html = escape(title)
-        summary_html = escape(summary).replace("\n", "<br>")
-        summary_section = ""
-        if summary_html:
-            summary_section = (
-                f'<p style="margin:0 0 12px;font-size:15px;line-height:1.6;color:#1f2933;">'
-                f"{summary_html}"
-                "</p>"
-            )
-
-        border_style = "border-bottom:1px solid #e5e7eb;" if idx != total_items else ""
-        link_html = ""
-        if url:
-            safe_url = escape(url, quote=True)
-            link_html = (
-                f'<a href="{safe_url}" '
-                'style="color:#2563eb;text-decoration:none;font-weight:500;">'
-                "Read the full story -></a>"
-            )
-
-        item_blocks.append(
-            (
-                f'<div style="margin-bottom:24px;padding-bottom:24px;{border_style}">'
-                f'<div style="font-size:12px;color:#9ca3af;text-transform:uppercase;letter-spacing:0.08em;">'
-                f"Story {idx}"
-                "</div>"
-                f'<h3 style="margin:8px 0 12px;font-size:18px;color:#111827;">{title_html}</h3>'
-                f"{summary_section}"
-                f"{link_html}"
-                "</div>"
-            )
-        )
+        block, lines = _story_parts(idx, it, total_items)
+        item_blocks.append(block)
+        text_lines.extend(lines)
 
     if not item_blocks:
         item_blocks.append(
@@ -262,56 +820,11 @@ def render_newsletter(intro: str, items: list, trends: list) -> Tuple[str, str]:
             )
         )
 
-    trends_section = ""
-    if trends:
-        text_lines.append("Trends to Watch")
-        for raw_t in trends:
-            if not raw_t:
-                continue
-            clean_t = unescape(raw_t)
-            text_lines.append(f"- {clean_t}")
-        text_lines.append("")
-        trend_items = "".join(
-            f'<li style="margin-bottom:8px;">{escape(unescape(t))}</li>'
-            for t in trends
-            if t
-        )
-        trends_section = (
-            '<div style="margin-top:24px;">'
-            '<h2 style="margin:0 0 12px;font-size:17px;color:#111827;">Trends to Watch</h2>'
-            '<ul style="margin:0;padding-left:20px;color:#374151;font-size:15px;line-height:1.6;">'
-            f"{trend_items}"
-            "</ul>"
-            "</div>"
-        )
+    trends_section, trend_lines = _trends_parts(trends)
+    text_lines.extend(trend_lines)
 
     text_body = "\n".join(line for line in text_lines if line is not None).strip()
-    items_html = "".join(item_blocks)
-    html_body = (
-        '<div style="background-color:#f5f7fb;padding:24px 0;">'
-        '<table role="presentation" cellpadding="0" cellspacing="0" width="100%" '
-        "style=\"max-width:640px;margin:0 auto;background-color:#ffffff;border-radius:12px;overflow:hidden;"
-        "font-family:'Segoe UI',Arial,sans-serif;color:#1f2933;\">"
-        "<tr>"
-        '<td style="background-color:#111827;padding:28px 32px;">'
-        '<h1 style="margin:0;font-size:24px;color:#ffffff;">CreatorPulse Daily</h1>'
-        f'<p style="margin:12px 0 0;font-size:15px;line-height:1.6;color:#f3f4f6;">{intro_html}</p>'
-        "</td>"
-        "</tr>"
-        "<tr>"
-        '<td style="padding:32px;">'
-        '<h2 style="margin:0 0 16px;font-size:18px;color:#111827;">Top Stories</h2>'
-        f"{items_html}"
-        f"{trends_section}"
-        "</td>"
-        "</tr>"
-        "<tr>"
-        '<td style="background-color:#f3f4f6;padding:16px 32px;font-size:12px;color:#6b7280;text-align:center;">'
-        "You are receiving this update because you follow CreatorPulse."
-        "</td>"
-        "</tr>"
-        "</table>"
-        "</div>"
-    )
+    head, tail = render_shell(intro_text)
+    html_body = head + "".join(item_blocks) + trends_section + tail
 
     return html_body, text_body
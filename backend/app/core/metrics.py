@@ -0,0 +1,316 @@
+"""
+Minimal in-process metrics registry with Prometheus text exposition.
+
+Metrics are plain Python objects guarded by a lock; recording a sample is a
+dict lookup plus a couple of additions, and scraping only walks the series
+that have actually been observed.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import ContextDecorator
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+_REGISTRY: List["_Metric"] = []
+_REGISTRY_LOCK = threading.Lock()
+
+LabelKey = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _REGISTRY_LOCK:
+            _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_str(self, key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        inner = ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs)
+        return "{" + inner + "}"
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            snapshot = list(self._values.items())
+        for key, value in snapshot:
+            yield f"{self.name}{self._label_str(key)} {_format_value(value)}"
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram: "Histogram", labels: Dict[str, object]):
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def _recreate_cm(self):
+        # Used as a decorator, each call needs its own start time.
+        return _Timer(self._histogram, self._labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per-series: [bucket counts..., +Inf count], sum
+        self._series: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    def time(self, **labels) -> _Timer:
+        """Context manager / decorator that observes the elapsed wall time."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            snapshot = [
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._series.items()
+            ]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                label = self._label_str(key, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{label} {cumulative}"
+            yield f"{self.name}_sum{self._label_str(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._label_str(key)} {cumulative}"
+
+
+def render_latest() -> str:
+    """Return every registered metric in Prometheus text format (v0.0.4)."""
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# --- Application metrics -----------------------------------------------------
+
+FEED_FETCH_SECONDS = Histogram(
+    "creatorpulse_feed_fetch_seconds",
+    "Time spent downloading and parsing an RSS/Atom feed.",
+)
+ARTICLE_FETCH_SECONDS = Histogram(
+    "creatorpulse_article_fetch_seconds",
+    "Time spent downloading a full article page.",
+    ["outcome"],
+)
+ARTICLE_FETCH_SKIPS = Counter(
+    "creatorpulse_article_fetch_skips_total",
+    "Article downloads skipped (robots.txt, cached failure).",
+    ["reason"],
+)
+HTML_CLEAN_SECONDS = Histogram(
+    "creatorpulse_html_clean_seconds",
+    "Time spent stripping markup / extracting article text.",
+    ["stage"],
+)
+LLM_CALL_SECONDS = Histogram(
+    "creatorpulse_llm_call_seconds",
+    "Latency of individual LLM provider calls.",
+    ["provider", "model", "outcome"],
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "creatorpulse_llm_first_token_seconds",
+    "Time from a streamed LLM request to its first text chunk.",
+    ["provider", "model"],
+)
+LLM_FALLBACKS = Counter(
+    "creatorpulse_llm_fallbacks_total",
+    "Times a summary request moved on from one provider to the next.",
+    ["from_provider", "to_provider"],
+)
+LLM_SKIPS = Counter(
+    "creatorpulse_llm_skips_total",
+    "Provider calls skipped without a request (breaker open, rate limited).",
+    ["provider", "reason"],
+)
+BREAKER_TRANSITIONS = Counter(
+    "creatorpulse_breaker_transitions_total",
+    "Circuit breaker state changes.",
+    ["name", "state"],
+)
+SUPABASE_QUERY_SECONDS = Histogram(
+    "creatorpulse_supabase_query_seconds",
+    "Latency of Supabase REST queries.",
+    ["table", "operation"],
+)
+RENDER_SECONDS = Histogram(
+    "creatorpulse_render_seconds",
+    "Time spent rendering the newsletter HTML and text bodies.",
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "creatorpulse_email_send_seconds",
+    "Time spent handing the newsletter to the email provider.",
+    ["provider"],
+)
+CACHE_HITS = Counter(
+    "creatorpulse_cache_hits_total",
+    "Lookups served from an existing cached value.",
+    ["cache"],
+)
+CACHE_MISSES = Counter(
+    "creatorpulse_cache_misses_total",
+    "Lookups that had to recompute their value.",
+    ["cache"],
+)
+DEDUP_SKIPS = Counter(
+    "creatorpulse_dedup_skips_total",
+    "Feed entries skipped because their URL was already ingested.",
+)
+LEASE_CONTENTIONS = Counter(
+    "creatorpulse_lease_contentions_total",
+    "Work skipped or deferred because another worker held the lease.",
+    ["kind"],
+)
+SUMMARY_REJECTIONS = Counter(
+    "creatorpulse_summary_rejections_total",
+    "Summaries rejected by summary_is_informative, by reason.",
+    ["reason"],
+)
+LLM_RETRIES = Counter(
+    "creatorpulse_llm_retries_total",
+    "LLM outputs that had to be requested again, by the provider/model that "
+    "produced them and why (error, empty, invalid).",
+    ["provider", "model", "reason"],
+)
+LLM_REPAIRS = Counter(
+    "creatorpulse_llm_repairs_total",
+    "Defects in structured story output fixed locally instead of re-requested.",
+    ["provider", "model", "repair"],
+)
+FEEDBACK_VOTES = Counter(
+    "creatorpulse_feedback_votes_total",
+    "Reader votes received, by thumbs value.",
+    ["thumbs"],
+)
+FEEDBACK_FLUSHES = Counter(
+    "creatorpulse_feedback_flushes_total",
+    "Batched feedback writes, by outcome.",
+    ["outcome"],
+)
+COALESCED_REQUESTS = Counter(
+    "creatorpulse_coalesced_requests_total",
+    "Requests that waited for an identical in-flight request instead of recomputing.",
+    ["route"],
+)
+NOT_MODIFIED = Counter(
+    "creatorpulse_not_modified_total",
+    "Responses answered with 304 because the client's ETag was current.",
+    ["route"],
+)
+RETENTION_ITEMS = Counter(
+    "creatorpulse_retention_items_total",
+    "Item bodies handled by compaction, by action (archived, dropped, compressed).",
+    ["action"],
+)
+RETENTION_RECLAIMED_BYTES = Counter(
+    "creatorpulse_retention_reclaimed_bytes_total",
+    "Bytes of item content removed from the hot table by compaction.",
+)
+ADAPTER_LOOKUPS = Counter(
+    "creatorpulse_adapter_lookups_total",
+    "Batched lookups made by source adapters, by adapter, kind and outcome.",
+    ["adapter", "kind", "outcome"],
+)
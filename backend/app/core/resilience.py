@@ -0,0 +1,254 @@
+"""
+Circuit breakers and token-bucket rate limiters for upstream providers.
+
+Both keep their state as small dicts in a :class:`HealthStore`. The default
+store is in-process; setting ``PROVIDER_HEALTH_DB`` to a file path switches
+to a SQLite-backed store so every uvicorn worker (or any process on the same
+host) shares one view of provider health and one quota budget.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+PROVIDER_HEALTH_DB = _settings.provider_health_db
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+Updater = Callable[[Dict], Tuple[Dict, object]]
+
+
+class HealthStore:
+    """Atomically read-modify-write a small JSON state per key."""
+
+    def update(self, key: str, fn: Updater):
+        raise NotImplementedError
+
+    def read(self, key: str) -> Dict:
+        return self.update(key, lambda state: (state, dict(state)))
+
+
+class MemoryHealthStore(HealthStore):
+    def __init__(self):
+        self._states: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def update(self, key: str, fn: Updater):
+        with self._lock:
+            state, result = fn(dict(self._states.get(key, {})))
+            self._states[key] = state
+            return result
+
+
+class SQLiteHealthStore(HealthStore):
+    """Shares state between processes through a local SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS provider_health ("
+                "key TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def update(self, key: str, fn: Updater):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state FROM provider_health WHERE key = ?", (key,)
+            ).fetchone()
+            state, result = fn(json.loads(row[0]) if row else {})
+            conn.execute(
+                "INSERT INTO provider_health (key, state) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state",
+                (key, json.dumps(state)),
+            )
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_store: Optional[HealthStore] = None
+_store_lock = threading.Lock()
+
+
+def get_health_store() -> HealthStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            if PROVIDER_HEALTH_DB:
+                logger.info("Sharing provider health via %s", PROVIDER_HEALTH_DB)
+                _store = SQLiteHealthStore(PROVIDER_HEALTH_DB)
+            else:
+                _store = MemoryHealthStore()
+        return _store
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    ``failure_threshold`` consecutive failures open the circuit. After
+    ``recovery_timeout`` seconds it turns half-open and lets up to
+    ``half_open_probes`` calls through; one success closes it again and a
+    failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_probes: int = 1,
+        store: Optional[HealthStore] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self._store = store
+        self._key = f"breaker:{name}"
+
+    @property
+    def store(self) -> HealthStore:
+        return self._store or get_health_store()
+
+    def _transition(self, state: Dict, new_state: str) -> None:
+        if state.get("state", CLOSED) != new_state:
+            BREAKER_TRANSITIONS.inc(name=self.name, state=new_state)
+            logger.info("Circuit breaker %s -> %s", self.name, new_state)
+        state["state"] = new_state
+
+    def allow(self) -> bool:
+        """Return True if a call may go ahead (reserving a probe slot if half-open)."""
+
+        def decide(state: Dict):
+            now = time.time()
+            current = state.get("state", CLOSED)
+            if current == OPEN:
+                if now - state.get("opened_at", 0) < self.recovery_timeout:
+                    return state, False
+                self._transition(state, HALF_OPEN)
+                state["probes"] = 0
+                current = HALF_OPEN
+            if current == HALF_OPEN:
+                if state.get("probes", 0) >= self.half_open_probes:
+                    # A probe that never reported back must not wedge the breaker.
+                    if now - state.get("probe_started", 0) < self.recovery_timeout:
+                        return state, False
+                    state["probes"] = 0
+                state["probes"] = state.get("probes", 0) + 1
+                state["probe_started"] = now
+            return state, True
+
+        return self.store.update(self._key, decide)
+
+    def release(self) -> None:
+        """Give back a half-open probe slot when no call was actually made."""
+
+        def apply(state: Dict):
+            if state.get("state") == HALF_OPEN and state.get("probes", 0) > 0:
+                state["probes"] -= 1
+            return state, None
+
+        self.store.update(self._key, apply)
+
+    def record_success(self) -> None:
+        def apply(state: Dict):
+            self._transition(state, CLOSED)
+            state["failures"] = 0
+            state["probes"] = 0
+            return state, None
+
+        self.store.update(self._key, apply)
+
+    def record_failure(self, weight: int = 1) -> None:
+        """Count a failure; ``weight`` >= threshold opens the circuit at once."""
+
+        def apply(state: Dict):
+            current = state.get("state", CLOSED)
+            state["failures"] = state.get("failures", 0) + weight
+            if current == HALF_OPEN or state["failures"] >= self.failure_threshold:
+                self._transition(state, OPEN)
+                state["opened_at"] = time.time()
+                state["probes"] = 0
+            return state, None
+
+        self.store.update(self._key, apply)
+
+    def state(self) -> str:
+        return self.store.read(self._key).get("state", CLOSED)
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        capacity: Optional[float] = None,
+        store: Optional[HealthStore] = None,
+    ):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._store = store
+        self._key = f"bucket:{name}"
+
+    @property
+    def store(self) -> HealthStore:
+        return self._store or get_health_store()
+
+    def _take(self) -> float:
+        """Take a token if available; otherwise return the seconds to wait."""
+
+        def apply(state: Dict):
+            now = time.time()
+            tokens = state.get("tokens", self.capacity)
+            updated = state.get("updated", now)
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            state["updated"] = now
+            if tokens >= 1:
+                state["tokens"] = tokens - 1
+                return state, 0.0
+            state["tokens"] = tokens
+            return state, (1 - tokens) / self.rate
+
+        return self.store.update(self._key, apply)
+
+    def acquire(self, max_wait: float = 0.0) -> bool:
+        """Wait up to ``max_wait`` seconds for a token."""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
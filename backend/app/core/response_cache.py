@@ -0,0 +1,173 @@
+"""
+Request coalescing and short-lived response caching for read endpoints.
+
+* :class:`SingleFlight` lets concurrent identical requests share one
+  in-flight computation instead of each doing the work.
+* :class:`ResponseCache` keeps the serialised JSON body and its ETag for a
+  few seconds, keyed by whatever identifies the response's inputs.
+* :func:`cached_json` ties the two together and answers ``304 Not Modified``
+  when the client's ``If-None-Match`` already names the current body.
+
+Both are per process. Other workers only see a change once their own
+entries expire, so TTLs are kept short. The ``/sources`` listing lives here
+so every code path that adds or removes sources can call
+:func:`invalidate_sources`.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import get_settings
+from app.core.metrics import CACHE_HITS, CACHE_MISSES, COALESCED_REQUESTS, NOT_MODIFIED
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+RESPONSE_CACHE_MAX_ENTRIES = _settings.response_cache_max_entries
+SOURCES_CACHE_TTL_S = _settings.sources_cache_ttl_s
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run ``fn`` once per key at a time; callers that arrive meanwhile share it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            COALESCED_REQUESTS.inc(route=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+class ResponseCache:
+    """Serialised JSON bodies with an ETag, expiring after ``ttl`` seconds."""
+
+    def __init__(self, name: str, ttl: float, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, payload: Any) -> CachedBody:
+        body = json.dumps(
+            jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+        entry = CachedBody(body, make_etag(body), time.monotonic() + self.ttl)
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+sources_cache = ResponseCache("sources", SOURCES_CACHE_TTL_S, max_entries=1)
+
+
+def invalidate_sources() -> None:
+    """Drop the cached ``/sources`` listing after sources change."""
+    sources_cache.clear()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` comparison (weak, so ``W/`` prefixes are ignored)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def cached_json(
+    request: Request,
+    cache: ResponseCache,
+    flights: SingleFlight,
+    key: Hashable,
+    build: Callable[[], Any],
+    conditional: bool = True,
+) -> Response:
+    """
+    Serve ``build()`` as JSON through ``cache`` and ``flights``.
+
+    With ``conditional`` (safe methods only), a matching ``If-None-Match``
+    gets an empty ``304``.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        CACHE_HITS.inc(cache=cache.name)
+    else:
+        CACHE_MISSES.inc(cache=cache.name)
+        # Re-check inside the flight: a leader that finished just before we
+        # joined has already stored the body.
+        entry = flights.do(key, lambda: cache.get(key) or cache.put(key, build()))
+
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if conditional and etag_matches(request.headers.get("if-none-match"), entry.etag):
+        NOT_MODIFIED.inc(route=cache.name)
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
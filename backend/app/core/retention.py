@@ -0,0 +1,314 @@
+"""
+Compressed article bodies and retention tiers for stored items.
+
+* **Hot**: ingestion writes ``items.content`` compressed with
+  ``CONTENT_CODEC``. ``zlib`` is the default; ``zstd`` needs the optional
+  ``zstandard`` package; ``none`` stores plain text. Encoded values carry a
+  ``~codec:`` prefix, so rows stored before compression still read back.
+* **Cold**: when ``RETENTION_COLD_PATH`` names a SQLite file on durable
+  storage, :func:`compact` moves bodies of items published more than
+  ``RETENTION_HOT_DAYS`` ago into it and clears them from ``items``.
+  Titles, summaries and summary bookkeeping stay. Without a cold path, old
+  bodies stay hot unless ``RETENTION_DROP_EXPIRED`` is set, which drops
+  them. There is no default path: a file in the working directory of an
+  ephemeral container would lose "archived" bodies on restart.
+
+Curation reads items without ``content`` and loads bodies (hot or cold)
+only for the few stories it has to re-summarise; see :func:`load_content`.
+
+Run a compaction by hand with ``python -m app.core.retention [--vacuum]``.
+The scheduler also runs one every ``RETENTION_COMPACT_INTERVAL_H`` hours.
+"""
+
+import base64
+import importlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import get_settings
+from app.core.metrics import RETENTION_ITEMS, RETENTION_RECLAIMED_BYTES
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+CONTENT_CODEC = _settings.content_codec
+CONTENT_COMPRESS_LEVEL = _settings.content_compress_level
+# Shorter bodies are stored as-is; the prefix and base64 would outweigh the gain.
+CONTENT_COMPRESS_MIN_BYTES = _settings.content_compress_min_bytes
+RETENTION_HOT_DAYS = _settings.retention_hot_days
+RETENTION_COLD_PATH = _settings.retention_cold_path
+RETENTION_DROP_EXPIRED = _settings.retention_drop_expired
+RETENTION_BATCH_SIZE = _settings.retention_batch_size
+RETENTION_COMPACT_INTERVAL_H = _settings.retention_compact_interval_h
+
+_PREFIX = "~"
+_ENCODED_PREFIXES = tuple(f"{_PREFIX}{codec}:" for codec in ("zlib", "zstd"))
+_zstd_module = None
+
+
+def _zstd():
+    global _zstd_module
+    if _zstd_module is None:
+        try:
+            _zstd_module = importlib.import_module("zstandard")
+        except ImportError:
+            _zstd_module = False
+    return _zstd_module or None
+
+
+def _codec() -> str:
+    if CONTENT_CODEC == "zstd" and _zstd() is None:
+        logger.warning("CONTENT_CODEC=zstd but zstandard is not installed; using zlib")
+        return "zlib"
+    return CONTENT_CODEC
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=CONTENT_COMPRESS_LEVEL).compress(data)
+    return zlib.compress(data, CONTENT_COMPRESS_LEVEL)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        module = _zstd()
+        if module is None:
+            raise RuntimeError("Content is zstd-compressed but zstandard is not installed")
+        return module.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise RuntimeError(f"Unknown content codec: {codec}")
+
+
+def is_encoded(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(_ENCODED_PREFIXES)
+
+
+def encode_content(text: Optional[str]) -> Optional[str]:
+    """Compress ``text`` for storage; short or incompressible text stays plain."""
+    if not text or is_encoded(text):
+        return text
+    codec = _codec()
+    raw = text.encode("utf-8")
+    if codec == "none" or len(raw) < CONTENT_COMPRESS_MIN_BYTES:
+        return text
+    encoded = f"{_PREFIX}{codec}:" + base64.b64encode(_compress(codec, raw)).decode("ascii")
+    return encoded if len(encoded) < len(text) else text
+
+
+def decode_content(value: Optional[str]) -> Optional[str]:
+    """Inverse of :func:`encode_content`; plain (legacy) text passes through."""
+    if not is_encoded(value):
+        return value
+    codec, _, payload = value[len(_PREFIX):].partition(":")
+    return _decompress(codec, base64.b64decode(payload)).decode("utf-8")
+
+
+class ColdStore:
+    """Archived article bodies by item id, kept in their encoded form."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            """
+            CREATE TABLE IF NOT EXISTS cold_content (
+                item_id INTEGER PRIMARY KEY,
+                url TEXT,
+                content TEXT NOT NULL,
+                archived_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, rows: List[Dict]) -> None:
+        """Store ``{"id", "url", "content"}`` rows; ``content`` already encoded."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cold_content (item_id, url, content, archived_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(row["id"], row.get("url"), row["content"], now) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_many(self, item_ids: Iterable[int]) -> Dict[int, str]:
+        """Decoded bodies for the ids that were archived."""
+        ids = list(item_ids)
+        if not ids:
+            return {}
+        cur = self._connect().execute(
+            f"SELECT item_id, content FROM cold_content WHERE item_id IN ({', '.join('?' * len(ids))})",
+            ids,
+        )
+        return {item_id: decode_content(content) for item_id, content in cur}
+
+
+_cold_store: Optional[ColdStore] = None
+_cold_store_lock = threading.Lock()
+
+
+def get_cold_store() -> Optional[ColdStore]:
+    global _cold_store
+    with _cold_store_lock:
+        if _cold_store is None and RETENTION_COLD_PATH:
+            _cold_store = ColdStore(RETENTION_COLD_PATH)
+        return _cold_store
+
+
+def set_cold_store(store: Optional[ColdStore]) -> None:
+    global _cold_store
+    with _cold_store_lock:
+        _cold_store = store
+
+
+def load_content(repo, items: List[Dict]) -> None:
+    """
+    Fill in ``content`` (decoded) for ``items`` that were read without it.
+
+    Bodies come from ``items`` first and then from the cold store. Items
+    whose body was dropped are left without a ``content`` key.
+    """
+    ids = [item["id"] for item in items if item.get("id") is not None]
+    if not ids:
+        return
+    bodies = {
+        row["id"]: decode_content(row["content"])
+        for row in repo.get_items(ids, "id,content")
+        if row.get("content")
+    }
+    missing = [item_id for item_id in ids if item_id not in bodies]
+    cold = get_cold_store()
+    if missing and cold is not None:
+        bodies.update(cold.get_many(missing))
+    for item in items:
+        body = bodies.get(item.get("id"))
+        if body is not None:
+            item["content"] = body
+
+
+def _published_at(value) -> Optional[datetime]:
+    """``published`` as an aware datetime; naive values are local time."""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    # Ingestion writes naive local timestamps; astimezone() reads them as such.
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+
+def compact(
+    repo,
+    hot_days: float = RETENTION_HOT_DAYS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    vacuum: bool = False,
+    now: Optional[datetime] = None,
+) -> Dict:
+    """
+    Archive (or, with ``RETENTION_DROP_EXPIRED``, drop) bodies older than
+    ``hot_days`` and compress the rest.
+
+    Works through ``items`` in id order, ``batch_size`` rows at a time.
+    Returns a report of rows touched and content bytes before and after;
+    ``vacuum`` also asks the store to return freed pages to the filesystem.
+    """
+    started = time.perf_counter()
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=hot_days)
+    cold = get_cold_store()
+    expire = cold is not None or RETENTION_DROP_EXPIRED
+    report = {
+        "cutoff": cutoff.isoformat(),
+        "scanned": 0,
+        "archived": 0,
+        "dropped": 0,
+        "compressed": 0,
+        "bytes_before": 0,
+        "bytes_after": 0,
+    }
+
+    after_id = 0
+    while True:
+        rows = repo.items_with_content(after_id, batch_size)
+        if not rows:
+            break
+        after_id = rows[-1]["id"]
+        report["scanned"] += len(rows)
+
+        expired, recompressed = [], []
+        for row in rows:
+            stored = row["content"]
+            report["bytes_before"] += len(stored)
+            published = _published_at(row["published"]) if row.get("published") else None
+            if expire and published is not None and published < cutoff:
+                expired.append({**row, "content": encode_content(stored)})
+                continue
+            encoded = encode_content(stored)
+            report["bytes_after"] += len(encoded)
+            if encoded != stored:
+                recompressed.append({"id": row["id"], "url": row["url"], "content": encoded})
+
+        if expired:
+            if cold is not None:
+                cold.put_many(expired)
+                report["archived"] += len(expired)
+            else:
+                report["dropped"] += len(expired)
+            # Only cleared once the cold copy is committed.
+            repo.clear_content([row["id"] for row in expired])
+        if recompressed:
+            repo.update_items(recompressed)
+            report["compressed"] += len(recompressed)
+
+    report["reclaimed_bytes"] = report["bytes_before"] - report["bytes_after"]
+    report["vacuumed_bytes"] = repo.vacuum() if vacuum else None
+    report["duration_s"] = round(time.perf_counter() - started, 3)
+    for action in ("archived", "dropped", "compressed"):
+        RETENTION_ITEMS.inc(report[action], action=action)
+    RETENTION_RECLAIMED_BYTES.inc(max(report["reclaimed_bytes"], 0))
+    logger.info(
+        "Compaction: %d scanned, %d archived, %d dropped, %d compressed, %d bytes reclaimed",
+        report["scanned"],
+        report["archived"],
+        report["dropped"],
+        report["compressed"],
+        report["reclaimed_bytes"],
+    )
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from app.core.storage import get_repository
+
+    parser = argparse.ArgumentParser(description="Compact stored article bodies.")
+    parser.add_argument("--hot-days", type=float, default=RETENTION_HOT_DAYS)
+    parser.add_argument("--vacuum", action="store_true", help="Also shrink the SQLite file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(compact(get_repository(), args.hot_days, vacuum=args.vacuum), indent=2))
@@ -0,0 +1,350 @@
+"""
+In-process background scheduler for incremental ingestion.
+
+Each source is polled on its own interval. The interval starts at
+``SCHEDULER_DEFAULT_INTERVAL_S`` and adapts after every poll:
+
+* the feed's own publish timestamps give an estimate of how often it
+  updates, and the next poll is aimed at half that gap;
+* a ``304 Not Modified`` or a poll with no new entries backs off by
+  ``SCHEDULER_BACKOFF``;
+* errors back off exponentially.
+
+Intervals are always clamped to ``[SCHEDULER_MIN_INTERVAL_S,
+SCHEDULER_MAX_INTERVAL_S]``. Because ingestion summarises as it goes, items
+are ready by the time the newsletter is sent, so the optional daily send
+(``SCHEDULER_SEND_AT``, ``HH:MM`` UTC) is just a read and render. Every
+``RETENTION_COMPACT_INTERVAL_H`` hours it also runs
+:func:`app.core.retention.compact` (0 disables it).
+
+Polling state (validators, intervals) is kept in memory; after a restart the
+first poll of each source is a full fetch and dedup skips known URLs. When
+several workers run the scheduler, per-source leases and the per-issue send
+lock (:mod:`app.core.coordination`) keep them from polling the same source or
+sending the same issue at once.
+"""
+
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dtime, timezone
+from typing import Callable, Dict, List, Optional
+
+from app.core import coordination, retention, tracing
+from app.core.config import get_settings
+from app.core.ingestion import poll_feed
+from app.core.storage import get_repository
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+SCHEDULER_ENABLED = _settings.scheduler_enabled
+MIN_INTERVAL_S = _settings.scheduler_min_interval_s
+MAX_INTERVAL_S = _settings.scheduler_max_interval_s
+DEFAULT_INTERVAL_S = _settings.scheduler_default_interval_s
+BACKOFF = _settings.scheduler_backoff
+WORKERS = _settings.scheduler_workers
+SOURCE_REFRESH_S = _settings.scheduler_source_refresh_s
+SEND_AT = _settings.scheduler_send_at  # "HH:MM" in UTC, optional
+# Wait between attempts after a failed scheduled send.
+SEND_RETRY_S = _settings.scheduler_send_retry_s
+
+
+def parse_send_at(value: Optional[str]) -> Optional[dtime]:
+    """``"H:MM"``/``"HH:MM"`` as a time; ``None`` (logged) when unset or invalid."""
+    if not value:
+        return None
+    try:
+        hours, minutes = (int(part) for part in value.strip().split(":"))
+        return dtime(hours, minutes)
+    except ValueError:
+        logger.warning("Ignoring invalid SCHEDULER_SEND_AT %r (expected HH:MM)", value)
+        return None
+
+
+SEND_TIME = parse_send_at(SEND_AT)
+
+
+def _clamp(value: float) -> float:
+    return max(MIN_INTERVAL_S, min(MAX_INTERVAL_S, value))
+
+
+def estimate_update_interval(entry_times: List[float]) -> Optional[float]:
+    """Median gap between consecutive entries, or ``None`` if unknown."""
+    stamps = sorted(set(entry_times), reverse=True)[:20]
+    if len(stamps) < 2:
+        return None
+    gaps = [a - b for a, b in zip(stamps, stamps[1:]) if a > b]
+    return statistics.median(gaps) if gaps else None
+
+
+def next_interval(current: float, result: Optional[Dict], failed: bool = False) -> float:
+    """Compute the next polling interval from the outcome of a poll."""
+    if failed or result is None:
+        return _clamp(current * 2)
+    if result["status"] == 304 or not result["inserted"]:
+        return _clamp(current * BACKOFF)
+    estimate = estimate_update_interval(result["entry_times"])
+    if estimate is None:
+        return _clamp(current)
+    # New content arrived: aim to poll about twice per observed update gap.
+    return _clamp(estimate / 2)
+
+
+def _sent_since(start_iso: str) -> bool:
+    try:
+        return get_repository().sent_since(start_iso)
+    except Exception:
+        logger.warning("Could not read send history; assuming not sent", exc_info=True)
+        return False
+
+
+class _SourceState:
+    def __init__(self, source: Dict):
+        self.source = source
+        self.interval = DEFAULT_INTERVAL_S
+        self.next_poll = time.time()
+        self.etag: Optional[str] = None
+        self.modified: Optional[str] = None
+        self.last_status: Optional[int] = None
+        self.last_polled: Optional[float] = None
+        self.failures = 0
+        self.running = False
+
+    def snapshot(self) -> Dict:
+        return {
+            "source_id": self.source["id"],
+            "url": self.source["url"],
+            "interval_s": round(self.interval, 1),
+            "next_poll": datetime.fromtimestamp(self.next_poll, timezone.utc).isoformat(),
+            "last_polled": (
+                datetime.fromtimestamp(self.last_polled, timezone.utc).isoformat()
+                if self.last_polled
+                else None
+            ),
+            "last_status": self.last_status,
+            "failures": self.failures,
+        }
+
+
+class FeedScheduler:
+    def __init__(self, send: Optional[Callable[[], None]] = None):
+        self._send = send
+        self._states: Dict[int, _SourceState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="feed-poll")
+        self._last_refresh = 0.0
+        self._last_send_date: Optional[str] = None
+        self._next_send_attempt = 0.0
+        self._last_compact = 0.0
+        self._compacting = False
+        self._last_compaction: Optional[Dict] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="feed-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Feed scheduler started (interval %ss-%ss, workers=%d, send_at=%s)",
+            int(MIN_INTERVAL_S),
+            int(MAX_INTERVAL_S),
+            WORKERS,
+            SEND_TIME.strftime("%H:%M") if SEND_TIME else "disabled",
+        )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        logger.info("Feed scheduler stopped")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            sources = [state.snapshot() for state in self._states.values()]
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "send_at": SEND_TIME.strftime("%H:%M") if SEND_TIME else None,
+            "last_send_date": self._last_send_date,
+            "last_compaction": self._last_compaction,
+            "sources": sorted(sources, key=lambda s: s["next_poll"]),
+        }
+
+    # Internals -----------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception:
+                logger.exception("Feed scheduler tick failed")
+            self._stop.wait(self._sleep_time())
+
+    def _sleep_time(self) -> float:
+        with self._lock:
+            upcoming = [s.next_poll for s in self._states.values() if not s.running]
+        if not upcoming:
+            return 5.0
+        return min(max(min(upcoming) - time.time(), 1.0), 30.0)
+
+    def _tick(self) -> None:
+        now = time.time()
+        if now - self._last_refresh >= SOURCE_REFRESH_S:
+            self._refresh_sources()
+            self._last_refresh = now
+
+        with self._lock:
+            due = [s for s in self._states.values() if not s.running and s.next_poll <= now]
+            for state in due:
+                state.running = True
+        for state in due:
+            self._pool.submit(self._poll, state)
+
+        self._maybe_send()
+        self._maybe_compact(now)
+
+    def _refresh_sources(self) -> None:
+        rows = get_repository().list_sources()
+        with self._lock:
+            seen = set()
+            for row in rows:
+                seen.add(row["id"])
+                state = self._states.get(row["id"])
+                if state is None:
+                    self._states[row["id"]] = _SourceState(row)
+                else:
+                    state.source = row
+            for source_id in list(self._states):
+                if source_id not in seen:
+                    del self._states[source_id]
+        logger.debug("Scheduler tracking %d source(s)", len(rows))
+
+    def _poll(self, state: _SourceState) -> None:
+        source = state.source
+        result = None
+        failed = False
+        leased_elsewhere = False
+        try:
+            with coordination.try_lease(
+                coordination.source_lease_name(source["id"])
+            ) as lease:
+                if lease is None:
+                    # Another worker is polling it right now; try again later.
+                    leased_elsewhere = True
+                    return
+                with tracing.start_trace("scheduled_ingest", source_id=source["id"]):
+                    result = poll_feed(get_repository(), source, state.etag, state.modified)
+            state.etag = result["etag"]
+            state.modified = result["modified"]
+            state.last_status = result["status"]
+            state.failures = 0
+            if result["inserted"]:
+                logger.info(
+                    "Scheduled ingest for source %s added %d item(s)",
+                    source["id"],
+                    result["inserted"],
+                )
+        except Exception:
+            failed = True
+            state.failures += 1
+            logger.warning(
+                "Scheduled ingest failed for source %s (%d consecutive)",
+                source["id"],
+                state.failures,
+                exc_info=True,
+            )
+        finally:
+            with self._lock:
+                if not leased_elsewhere:
+                    state.interval = next_interval(state.interval, result, failed)
+                state.last_polled = time.time()
+                state.next_poll = state.last_polled + state.interval
+                state.running = False
+            logger.debug(
+                "Next poll for source %s in %.0fs", source["id"], state.interval
+            )
+
+    def _maybe_send(self) -> None:
+        if not (SEND_TIME and self._send):
+            return
+        now = datetime.now(timezone.utc)
+        today = now.date().isoformat()
+        if (
+            self._last_send_date == today
+            or now.time() < SEND_TIME
+            or time.time() < self._next_send_attempt
+        ):
+            return
+        # The lock spans the history check and the send, so only one worker
+        # (or replica) sends each issue.
+        with coordination.try_lease(coordination.send_lock_name(today)) as lease:
+            if lease is None:
+                logger.info("Another worker is sending the %s issue", today)
+                return
+            if _sent_since(f"{today}T00:00:00"):
+                # Already sent today (e.g. before a restart) - do not send twice.
+                logger.info("Newsletter already sent for %s; skipping scheduled send", today)
+                self._last_send_date = today
+                return
+            logger.info("Running scheduled newsletter send for %s", today)
+            try:
+                self._send()
+            except Exception:
+                # Only a successful send marks the day done; try again later.
+                self._next_send_attempt = time.time() + SEND_RETRY_S
+                logger.exception(
+                    "Scheduled newsletter send failed; retrying in %.0fs", SEND_RETRY_S
+                )
+                return
+            self._last_send_date = today
+
+    def _maybe_compact(self, now: float) -> None:
+        interval = retention.RETENTION_COMPACT_INTERVAL_H * 3600
+        with self._lock:
+            if interval <= 0 or self._compacting or now - self._last_compact < interval:
+                return
+            self._compacting = True
+            self._last_compact = now
+        self._pool.submit(self._compact)
+
+    def _compact(self) -> None:
+        try:
+            with coordination.try_lease("retention:compact") as lease:
+                if lease is None:
+                    logger.info("Another worker is compacting item content")
+                    return
+                self._last_compaction = retention.compact(get_repository())
+        except Exception:
+            logger.exception("Scheduled compaction failed")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+
+_scheduler: Optional[FeedScheduler] = None
+
+
+def start_scheduler(send: Optional[Callable[[], None]] = None) -> Optional[FeedScheduler]:
+    global _scheduler
+    if not SCHEDULER_ENABLED:
+        logger.info("Feed scheduler disabled (set SCHEDULER_ENABLED=true to enable)")
+        return None
+    if _scheduler is None:
+        _scheduler = FeedScheduler(send=send)
+    _scheduler.start()
+    return _scheduler
+
+
+def stop_scheduler() -> None:
+    if _scheduler is not None:
+        _scheduler.stop()
+
+
+def get_scheduler() -> Optional[FeedScheduler]:
+    return _scheduler
@@ -9,6 +9,12 @@ class SourceIn(BaseModel):
 class Source(SourceIn):
     id: int
 
+class SourceImport(BaseModel):
+    opml: Optional[str] = None  # OPML document text
+    sources: Optional[List[SourceIn]] = None
+    urls: Optional[List[str]] = None
+    backfill: bool = True
+
 class FeedbackIn(BaseModel):
     item_id: int
     thumbs: str  # "up" | "down"
@@ -0,0 +1,342 @@
+"""
+Source adapters: how each ``sources.type`` is read.
+
+Every adapter opens a source as a stream of entry dicts with the keys
+ingestion already uses (``link``, ``title``, ``summary``, ``content``,
+``published_parsed``), so dedup, cleaning, summarising and the upsert in
+:mod:`app.core.ingestion` treat all types alike. An adapter also declares:
+
+* ``batch_size``: entries handed to :meth:`SourceAdapter.prepare` (and
+  written) at a time; ``None`` uses the pipeline default.
+* ``concurrency``: sources of this type polled at once across the process
+  (``0`` = no limit).
+* ``fetch_articles``: whether linked pages are downloaded and their text
+  cached in the article cache.
+
+Built in:
+
+* ``rss``: RSS/Atom feeds, read with :class:`app.core.feed_stream.FeedStream`.
+* ``youtube``: channel or playlist feeds. Each batch gets one YouTube Data
+  API call for metadata (with ``YOUTUBE_API_KEY``; upcoming premieres and
+  live streams are held back) and transcripts through the optional
+  ``youtube-transcript-api`` package, ``YOUTUBE_TRANSCRIPT_WORKERS`` at a
+  time. Transcripts are kept in the article cache under the video URL.
+  Watch pages are never downloaded.
+* ``alert``: Google Alerts feeds. Redirect links are unwrapped to the
+  article URL (so dedup sees the real page) and highlight markup is
+  removed from titles.
+
+Unknown types are read as ``rss``. Register another adapter with
+:func:`register_adapter`; lookups can be injected for fixture-based runs
+(see ``benchmarks/fakes.py``).
+"""
+
+import importlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from app.core import tracing
+from app.core.config import get_settings
+from app.core.content_utils import (
+    cached_article_text,
+    remember_article_text,
+    strip_markup,
+)
+from app.core.feed_stream import FeedStream
+from app.core.metrics import ADAPTER_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Loaded on first use to keep app startup fast.
+requests = None
+
+_settings = get_settings()
+YOUTUBE_API_KEY = _settings.youtube_api_key
+YOUTUBE_API_URL = _settings.youtube_api_url
+# The Data API accepts up to 50 ids per videos.list call.
+YOUTUBE_BATCH_SIZE = _settings.youtube_batch_size
+YOUTUBE_CONCURRENCY = _settings.youtube_concurrency
+YOUTUBE_TRANSCRIPT_WORKERS = _settings.youtube_transcript_workers
+YOUTUBE_TRANSCRIPT_LANGUAGES = _settings.youtube_transcript_languages
+YOUTUBE_TIMEOUT_S = _settings.youtube_timeout_s
+
+_transcript_module = None
+
+
+class SourceAdapter:
+    """Reads one type of source; the defaults describe a plain RSS/Atom feed."""
+
+    type = "rss"
+    batch_size: Optional[int] = None
+    concurrency = 0
+    fetch_articles = True
+
+    def __init__(self):
+        self._slots = (
+            threading.BoundedSemaphore(self.concurrency) if self.concurrency > 0 else None
+        )
+
+    def slot(self):
+        """Held while one source of this type is polled."""
+        return self._slots if self._slots is not None else nullcontext()
+
+    def open(self, url: str, etag: Optional[str] = None, modified: Optional[str] = None):
+        """
+        Start reading ``url``. The result iterates entry dicts and has the
+        :class:`FeedStream` attributes (``status``, ``etag``, ``modified``,
+        ``bozo_exception``, ``url``) and context-manager protocol.
+        """
+        return FeedStream(url, etag=etag, modified=modified)
+
+    def prepare(self, entries: List[Dict]) -> List[Dict]:
+        """
+        Enrich a batch of new entries before articles are fetched; returns
+        the entries to ingest now. Entries left out are retried next poll.
+        """
+        return entries
+
+
+class _MappedStream:
+    """A :class:`FeedStream` whose entries pass through ``fn`` (``None`` drops them)."""
+
+    def __init__(self, stream: FeedStream, fn: Callable[[Dict], Optional[Dict]]):
+        self._stream = stream
+        self._fn = fn
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __enter__(self) -> "_MappedStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stream.close()
+
+    def __iter__(self) -> Iterator[Dict]:
+        for entry in self._stream:
+            mapped = self._fn(entry)
+            if mapped is not None:
+                yield mapped
+
+
+# --- YouTube ------------------------------------------------------------------
+
+
+def video_id(link: str) -> Optional[str]:
+    """The video id in a watch, short or youtu.be URL."""
+    parsed = urlparse(link or "")
+    host = parsed.netloc.lower()
+    if host.endswith("youtu.be"):
+        return parsed.path.strip("/") or None
+    if "youtube" not in host:
+        return None
+    if parsed.path.startswith(("/shorts/", "/live/")):
+        return parsed.path.split("/")[2] or None
+    ids = parse_qs(parsed.query).get("v")
+    return ids[0] if ids else None
+
+
+def fetch_video_metadata(ids: List[str]) -> Dict[str, Dict]:
+    """``videos.list`` snippets by id; empty without ``YOUTUBE_API_KEY``."""
+    if not YOUTUBE_API_KEY or not ids:
+        return {}
+    global requests
+    if requests is None:
+        requests = importlib.import_module("requests")
+    # The key goes in a header: request URLs end up in exception messages and logs.
+    response = requests.get(
+        YOUTUBE_API_URL,
+        params={"part": "snippet", "id": ",".join(ids)},
+        headers={"X-Goog-Api-Key": YOUTUBE_API_KEY},
+        timeout=YOUTUBE_TIMEOUT_S,
+    )
+    if response.status_code >= 400:
+        raise RuntimeError(f"videos.list returned HTTP {response.status_code}")
+    return {video["id"]: video["snippet"] for video in response.json().get("items", [])}
+
+
+def _transcripts():
+    global _transcript_module
+    if _transcript_module is None:
+        try:
+            _transcript_module = importlib.import_module("youtube_transcript_api")
+        except ImportError:
+            logger.info("youtube-transcript-api is not installed; using video descriptions")
+            _transcript_module = False
+    return _transcript_module or None
+
+
+def fetch_transcript(vid: str) -> Optional[str]:
+    """Transcript text for ``vid``, or ``None`` when there is none."""
+    module = _transcripts()
+    if module is None:
+        return None
+    api = module.YouTubeTranscriptApi
+    try:
+        if hasattr(api, "get_transcript"):
+            segments = api.get_transcript(vid, languages=YOUTUBE_TRANSCRIPT_LANGUAGES)
+            texts = [segment["text"] for segment in segments]
+        else:
+            texts = [
+                snippet.text
+                for snippet in api().fetch(vid, languages=YOUTUBE_TRANSCRIPT_LANGUAGES)
+            ]
+    except Exception as exc:
+        # Disabled or missing captions are common; the description is used instead.
+        logger.debug("No transcript for video %s: %s", vid, exc)
+        return None
+    return " ".join(text.replace("\n", " ") for text in texts).strip() or None
+
+
+class YouTubeAdapter(SourceAdapter):
+    type = "youtube"
+    batch_size = YOUTUBE_BATCH_SIZE
+    concurrency = YOUTUBE_CONCURRENCY
+    fetch_articles = False
+
+    def __init__(
+        self,
+        metadata: Callable[[List[str]], Dict[str, Dict]] = fetch_video_metadata,
+        transcript: Callable[[str], Optional[str]] = fetch_transcript,
+        transcript_workers: int = YOUTUBE_TRANSCRIPT_WORKERS,
+    ):
+        super().__init__()
+        self._metadata = metadata
+        self._transcript = transcript
+        self._transcript_workers = max(1, transcript_workers)
+
+    def prepare(self, entries: List[Dict]) -> List[Dict]:
+        ids = {id(entry): video_id(entry.get("link", "")) for entry in entries}
+        try:
+            snippets = self._metadata([vid for vid in ids.values() if vid])
+            ADAPTER_LOOKUPS.inc(adapter=self.type, kind="metadata", outcome="ok")
+        except Exception as exc:
+            ADAPTER_LOOKUPS.inc(adapter=self.type, kind="metadata", outcome="error")
+            logger.warning("YouTube metadata lookup failed: %s", exc)
+            snippets = {}
+
+        ready = []
+        for entry in entries:
+            snippet = snippets.get(ids[id(entry)])
+            if snippet is None:
+                ready.append(entry)
+                continue
+            if snippet.get("liveBroadcastContent") in ("upcoming", "live"):
+                # Nothing to summarise until the stream or premiere is over.
+                continue
+            if snippet.get("description"):
+                entry["summary"] = snippet["description"]
+            ready.append(entry)
+
+        for entry, text in zip(ready, self._load_transcripts(ready, ids)):
+            if text:
+                entry["content"] = [{"value": text}]
+        return ready
+
+    def _load_transcripts(
+        self, entries: List[Dict], ids: Dict[int, Optional[str]]
+    ) -> List[Optional[str]]:
+        """Transcripts for ``entries`` in order, from the article cache or fetched."""
+        texts: List[Optional[str]] = [None] * len(entries)
+        missing = []
+        for i, entry in enumerate(entries):
+            if not ids[id(entry)]:
+                continue
+            hit, text = cached_article_text(entry["link"])
+            if hit:
+                texts[i] = text or None
+            else:
+                missing.append(i)
+        if not missing:
+            return texts
+
+        def load(i: int) -> Optional[str]:
+            text = self._transcript(ids[id(entries[i])])
+            remember_article_text(entries[i]["link"], text)
+            return text
+
+        with ThreadPoolExecutor(
+            max_workers=min(self._transcript_workers, len(missing)),
+            thread_name_prefix="yt-transcript",
+        ) as pool:
+            for i, text in zip(missing, pool.map(tracing.wrap(load), missing)):
+                texts[i] = text
+        found = sum(1 for i in missing if texts[i])
+        ADAPTER_LOOKUPS.inc(found, adapter=self.type, kind="transcript", outcome="ok")
+        ADAPTER_LOOKUPS.inc(
+            len(missing) - found, adapter=self.type, kind="transcript", outcome="missing"
+        )
+        return texts
+
+
+# --- Google Alerts ------------------------------------------------------------
+
+
+def unwrap_alert_link(link: str) -> str:
+    """The target of a ``google.com/url?...&url=<article>`` redirect."""
+    parsed = urlparse(link or "")
+    if parsed.netloc.lower().endswith("google.com") and parsed.path == "/url":
+        query = parse_qs(parsed.query)
+        target = (query.get("url") or query.get("q") or [""])[0]
+        if target.startswith(("http://", "https://")):
+            return target
+    return link
+
+
+class AlertAdapter(SourceAdapter):
+    type = "alert"
+
+    def open(self, url: str, etag: Optional[str] = None, modified: Optional[str] = None):
+        return _MappedStream(super().open(url, etag, modified), self._entry)
+
+    @staticmethod
+    def _entry(entry: Dict) -> Dict:
+        entry = dict(entry)
+        entry["link"] = unwrap_alert_link(entry.get("link", ""))
+        entry["title"] = strip_markup(entry.get("title"))
+        return entry
+
+
+# --- Registry -----------------------------------------------------------------
+
+_ADAPTERS: Dict[str, SourceAdapter] = {}
+_adapters_lock = threading.Lock()
+
+
+def register_adapter(adapter: SourceAdapter) -> None:
+    """Use ``adapter`` for sources of ``adapter.type`` (replacing any other)."""
+    with _adapters_lock:
+        _ADAPTERS[adapter.type] = adapter
+
+
+def get_adapter(source_type: Optional[str]) -> SourceAdapter:
+    with _adapters_lock:
+        adapter = _ADAPTERS.get(source_type or "rss")
+        if adapter is None:
+            logger.debug("No adapter for source type %r; reading it as rss", source_type)
+            adapter = _ADAPTERS["rss"]
+        return adapter
+
+
+def source_types() -> List[str]:
+    with _adapters_lock:
+        return sorted(_ADAPTERS)
+
+
+def detect_type(url: str) -> str:
+    """Best guess at the source type of a feed URL."""
+    parsed = urlparse(url or "")
+    host = parsed.netloc.lower()
+    if "youtube.com" in host and parsed.path.startswith("/feeds/"):
+        return "youtube"
+    if host.endswith("google.com") and parsed.path.startswith("/alerts/feeds/"):
+        return "alert"
+    return "rss"
+
+
+for _adapter in (SourceAdapter(), YouTubeAdapter(), AlertAdapter()):
+    register_adapter(_adapter)
@@ -0,0 +1,644 @@
+"""
+Storage repository for the ``sources``, ``items``, ``feedback`` and
+``history`` tables.
+
+Callers go through :func:`get_repository` instead of building Supabase
+queries themselves. Two implementations, chosen by ``STORAGE_BACKEND``:
+
+* ``supabase`` (default): the hosted database, via
+  :func:`app.core.supabase_client.get_client`.
+* ``sqlite``: an embedded database at ``STORAGE_PATH``. It uses WAL mode,
+  indexes on ``items (source_id, url)`` and ``items (published)``, and an
+  FTS5 index over item titles and summaries. It suits single-node
+  deployments and local runs with no outside service.
+
+Column lists use the PostgREST ``select`` syntax (``"id,title"``) for both
+backends. ``items.content`` holds the article body as written by ingestion
+(usually compressed, see :mod:`app.core.retention`). Listing queries leave
+it out and return :data:`ITEM_HOT_COLUMNS` only.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.core.summary_state import STATE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+STORAGE_BACKEND = _settings.storage_backend
+STORAGE_PATH = _settings.storage_path
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Everything curation needs from a listing; bodies are fetched separately.
+ITEM_HOT_COLUMNS = ",".join(
+    ("id", "source_id", "title", "url", "summary", "published", *STATE_COLUMNS)
+)
+
+
+def _search_terms(query: str, limit: int = 8) -> List[str]:
+    return _WORD_RE.findall(query or "")[:limit]
+
+
+class Repository:
+    """Persistence operations used by the API, ingestion and the scheduler."""
+
+    # Sources -------------------------------------------------------------------
+
+    def list_sources(self, source_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    def get_source_by_url(self, url: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def add_source(self, name: str, url: str, type: str) -> Dict:
+        raise NotImplementedError
+
+    def add_sources(self, rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Insert ``{"name", "url", "type"}`` rows whose URL is not stored yet.
+
+        Returns ``(created, existing)`` source rows.
+        """
+        raise NotImplementedError
+
+    def delete_source(self, url: str) -> int:
+        raise NotImplementedError
+
+    # Items ---------------------------------------------------------------------
+
+    def item_urls(self, source_id: int) -> Set[str]:
+        raise NotImplementedError
+
+    def upsert_items(self, rows: List[Dict]) -> List[Dict]:
+        """Insert or update by ``url``; returns the written rows with ids."""
+        raise NotImplementedError
+
+    def update_items(self, rows: List[Dict]) -> None:
+        """Update existing rows by ``id`` with the columns each row carries."""
+        raise NotImplementedError
+
+    def latest_items(
+        self, limit: int, source_ids: Optional[Iterable[int]] = None
+    ) -> List[Dict]:
+        """Newest items first (by ``published``), without ``content``."""
+        raise NotImplementedError
+
+    def latest_item_marker(self, source_ids: Optional[Iterable[int]] = None) -> Tuple:
+        """``(id, published)`` of the most recently stored item."""
+        raise NotImplementedError
+
+    def get_items(self, ids: Iterable[int], columns: str = "*") -> List[Dict]:
+        raise NotImplementedError
+
+    def page_items(self, offset: int, limit: int, columns: str = "*") -> List[Dict]:
+        """Items ordered by id, for batch jobs."""
+        raise NotImplementedError
+
+    def search_items(
+        self, query: str, limit: int, source_ids: Optional[Iterable[int]] = None
+    ) -> List[Dict]:
+        """
+        Items whose title or summary contains every word of ``query``, in any
+        order, best matches first.
+        """
+        raise NotImplementedError
+
+    def items_with_content(self, after_id: int, limit: int) -> List[Dict]:
+        """``id, url, published, content`` of rows that still hold a body, by id."""
+        raise NotImplementedError
+
+    def clear_content(self, ids: List[int]) -> None:
+        raise NotImplementedError
+
+    def vacuum(self) -> Optional[int]:
+        """Return freed space to the filesystem; bytes freed, if known."""
+        return None
+
+    # Feedback and history ------------------------------------------------------
+
+    def add_feedback(self, rows: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def feedback_since(self, start_iso: str, after_id: int, limit: int) -> List[Dict]:
+        """``id, item_id, thumbs, created_at`` of votes since ``start_iso``, by id."""
+        raise NotImplementedError
+
+    def record_send(self, status: str = "sent") -> None:
+        raise NotImplementedError
+
+    def sent_since(self, start_iso: str) -> bool:
+        raise NotImplementedError
+
+    def ping(self) -> None:
+        """Raise if the store cannot be reached."""
+        raise NotImplementedError
+
+
+class SupabaseRepository(Repository):
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from app.core.supabase_client import get_client
+
+            return get_client()
+        return self._client
+
+    def list_sources(self, source_ids=None) -> List[Dict]:
+        query = self.client.table("sources").select("*")
+        if source_ids is not None:
+            query = query.in_("id", list(source_ids))
+        return query.execute().data or []
+
+    def get_source_by_url(self, url: str) -> Optional[Dict]:
+        rows = (
+            self.client.table("sources").select("*").eq("url", url).limit(1).execute().data
+        )
+        return rows[0] if rows else None
+
+    def add_source(self, name: str, url: str, type: str) -> Dict:
+        res = (
+            self.client.table("sources")
+            .insert({"name": name, "url": url, "type": type})
+            .execute()
+        )
+        return res.data[0]
+
+    def add_sources(self, rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        urls = [row["url"] for row in rows]
+        existing = (
+            self.client.table("sources").select("*").in_("url", urls).execute().data or []
+        )
+        known = {row["url"] for row in existing}
+        new_rows = [row for row in rows if row["url"] not in known]
+        created = []
+        if new_rows:
+            created = self.client.table("sources").insert(new_rows).execute().data or []
+        return created, existing
+
+    def delete_source(self, url: str) -> int:
+        res = self.client.table("sources").delete().eq("url", url).execute()
+        count = getattr(res, "count", None)
+        return count if count is not None else len(res.data or [])
+
+    def item_urls(self, source_id: int) -> Set[str]:
+        rows = (
+            self.client.table("items")
+            .select("url")
+            .eq("source_id", source_id)
+            .execute()
+            .data
+        )
+        return {row["url"] for row in rows or [] if row.get("url")}
+
+    def upsert_items(self, rows: List[Dict]) -> List[Dict]:
+        res = self.client.table("items").upsert(rows, on_conflict="url").execute()
+        return getattr(res, "data", None) or []
+
+    def update_items(self, rows: List[Dict]) -> None:
+        # A PATCH per row: an upsert of partial rows would be checked against
+        # the table's NOT NULL columns before ON CONFLICT is considered.
+        for row in rows:
+            values = {name: value for name, value in row.items() if name != "id"}
+            if values:
+                self.client.table("items").update(values).eq("id", row["id"]).execute()
+
+    def latest_items(self, limit: int, source_ids=None) -> List[Dict]:
+        query = self.client.table("items").select(ITEM_HOT_COLUMNS)
+        if source_ids:
+            query = query.in_("source_id", list(source_ids))
+        return query.order("published", desc=True).limit(limit).execute().data or []
+
+    def latest_item_marker(self, source_ids=None) -> Tuple:
+        query = self.client.table("items").select("id,published")
+        if source_ids:
+            query = query.in_("source_id", list(source_ids))
+        rows = query.order("id", desc=True).limit(1).execute().data or []
+        return (rows[0].get("id"), rows[0].get("published")) if rows else (None, None)
+
+    def get_items(self, ids: Iterable[int], columns: str = "*") -> List[Dict]:
+        ids = list(ids)
+        if not ids:
+            return []
+        return self.client.table("items").select(columns).in_("id", ids).execute().data or []
+
+    def page_items(self, offset: int, limit: int, columns: str = "*") -> List[Dict]:
+        return (
+            self.client.table("items")
+            .select(columns)
+            .order("id")
+            .range(offset, offset + limit - 1)
+            .execute()
+            .data
+            or []
+        )
+
+    def search_items(self, query: str, limit: int, source_ids=None) -> List[Dict]:
+        terms = _search_terms(query)
+        if not terms:
+            return []
+        # Terms are plain word characters, so they are safe inside the filter.
+        # Every term must match the title or the summary.
+        each = ",".join(f"or(title.ilike.%{term}%,summary.ilike.%{term}%)" for term in terms)
+        builder = (
+            self.client.table("items")
+            .select("id,title,summary,url,source_id,published")
+            .or_(f"and({each})")
+        )
+        if source_ids:
+            builder = builder.in_("source_id", list(source_ids))
+        return builder.order("published", desc=True).limit(limit).execute().data or []
+
+    def items_with_content(self, after_id: int, limit: int) -> List[Dict]:
+        return (
+            self.client.table("items")
+            .select("id,url,published,content")
+            .gt("id", after_id)
+            .not_.is_("content", "null")
+            .order("id")
+            .limit(limit)
+            .execute()
+            .data
+            or []
+        )
+
+    def clear_content(self, ids: List[int]) -> None:
+        if ids:
+            self.client.table("items").update({"content": None}).in_("id", ids).execute()
+
+    def add_feedback(self, rows: List[Dict]) -> None:
+        self.client.table("feedback").insert(rows).execute()
+
+    def feedback_since(self, start_iso: str, after_id: int, limit: int) -> List[Dict]:
+        return (
+            self.client.table("feedback")
+            .select("id,item_id,thumbs,created_at")
+            .gt("id", after_id)
+            .gte("created_at", start_iso)
+            .order("id")
+            .limit(limit)
+            .execute()
+            .data
+            or []
+        )
+
+    def record_send(self, status: str = "sent") -> None:
+        self.client.table("history").insert(
+            {"run_date": datetime.utcnow().isoformat(), "status": status}
+        ).execute()
+
+    def sent_since(self, start_iso: str) -> bool:
+        rows = (
+            self.client.table("history")
+            .select("id")
+            .gte("run_date", start_iso)
+            .eq("status", "sent")
+            .limit(1)
+            .execute()
+            .data
+        )
+        return bool(rows)
+
+    def ping(self) -> None:
+        self.client.table("sources").select("id").limit(1).execute()
+
+
+_ITEM_COLUMNS = (
+    "id",
+    "source_id",
+    "title",
+    "url",
+    "content",
+    "summary",
+    "published",
+    "created_at",
+    *STATE_COLUMNS,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    url TEXT NOT NULL UNIQUE,
+    type TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_id INTEGER REFERENCES sources (id) ON DELETE CASCADE,
+    title TEXT,
+    url TEXT NOT NULL UNIQUE,
+    summary TEXT,
+    published TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    summary_version TEXT,
+    content_hash TEXT,
+    summary_status TEXT,
+    summary_attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT,
+    -- Last, so reads of the other columns stop before its overflow pages.
+    content TEXT
+);
+CREATE INDEX IF NOT EXISTS items_source_url ON items (source_id, url);
+CREATE INDEX IF NOT EXISTS items_published ON items (published);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (
+    title, summary, content = 'items', content_rowid = 'id'
+);
+CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, summary)
+    VALUES ('delete', old.id, old.title, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF title, summary ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, summary)
+    VALUES ('delete', old.id, old.title, old.summary);
+    INSERT INTO items_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id INTEGER,
+    thumbs TEXT,
+    diff TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_date TEXT NOT NULL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS history_run_date ON history (run_date);
+"""
+
+
+def _columns(columns: str, allowed: Tuple[str, ...]) -> str:
+    """Turn a PostgREST column list into SQL, rejecting unknown names."""
+    if columns.strip() == "*":
+        return "*"
+    names = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return ", ".join(names)
+
+
+def _placeholders(values: List) -> str:
+    return ", ".join("?" * len(values))
+
+
+class SQLiteRepository(Repository):
+    """Embedded store; one connection per thread, WAL so readers never block."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _all(self, sql: str, params: Iterable = ()) -> List[Dict]:
+        return [dict(row) for row in self._connect().execute(sql, tuple(params))]
+
+    def list_sources(self, source_ids=None) -> List[Dict]:
+        if source_ids is None:
+            return self._all("SELECT * FROM sources ORDER BY id")
+        ids = list(source_ids)
+        if not ids:
+            return []
+        return self._all(
+            f"SELECT * FROM sources WHERE id IN ({_placeholders(ids)}) ORDER BY id", ids
+        )
+
+    def get_source_by_url(self, url: str) -> Optional[Dict]:
+        rows = self._all("SELECT * FROM sources WHERE url = ?", (url,))
+        return rows[0] if rows else None
+
+    def add_source(self, name: str, url: str, type: str) -> Dict:
+        return self._all(
+            "INSERT INTO sources (name, url, type) VALUES (?, ?, ?) RETURNING *",
+            (name, url, type),
+        )[0]
+
+    def add_sources(self, rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        created, existing = [], []
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                inserted = conn.execute(
+                    "INSERT INTO sources (name, url, type) VALUES (?, ?, ?) "
+                    "ON CONFLICT (url) DO NOTHING RETURNING *",
+                    (row.get("name"), row["url"], row.get("type")),
+                ).fetchone()
+                if inserted is not None:
+                    created.append(dict(inserted))
+                else:
+                    existing.append(
+                        dict(conn.execute("SELECT * FROM sources WHERE url = ?", (row["url"],)).fetchone())
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return created, existing
+
+    def delete_source(self, url: str) -> int:
+        return self._connect().execute("DELETE FROM sources WHERE url = ?", (url,)).rowcount
+
+    def item_urls(self, source_id: int) -> Set[str]:
+        cur = self._connect().execute(
+            "SELECT url FROM items WHERE source_id = ?", (source_id,)
+        )
+        return {url for (url,) in cur}
+
+    def upsert_items(self, rows: List[Dict]) -> List[Dict]:
+        written = []
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                names = [name for name in row if name in _ITEM_COLUMNS and name != "id"]
+                updates = ", ".join(f"{name} = excluded.{name}" for name in names if name != "url")
+                written.extend(
+                    dict(r)
+                    for r in conn.execute(
+                        f"INSERT INTO items ({', '.join(names)}) "
+                        f"VALUES ({_placeholders(names)}) "
+                        f"ON CONFLICT (url) DO UPDATE SET {updates} RETURNING *",
+                        [row[name] for name in names],
+                    )
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return written
+
+    def update_items(self, rows: List[Dict]) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                names = [name for name in row if name in _ITEM_COLUMNS and name != "id"]
+                if not names:
+                    continue
+                conn.execute(
+                    f"UPDATE items SET {', '.join(f'{name} = ?' for name in names)} "
+                    "WHERE id = ?",
+                    [row[name] for name in names] + [row["id"]],
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def latest_items(self, limit: int, source_ids=None) -> List[Dict]:
+        ids = list(source_ids or [])
+        where = f"WHERE source_id IN ({_placeholders(ids)})" if ids else ""
+        return self._all(
+            f"SELECT {_columns(ITEM_HOT_COLUMNS, _ITEM_COLUMNS)} FROM items {where} "
+            "ORDER BY published DESC LIMIT ?",
+            ids + [limit],
+        )
+
+    def latest_item_marker(self, source_ids=None) -> Tuple:
+        ids = list(source_ids or [])
+        where = f"WHERE source_id IN ({_placeholders(ids)})" if ids else ""
+        row = self._connect().execute(
+            f"SELECT id, published FROM items {where} ORDER BY id DESC LIMIT 1", ids
+        ).fetchone()
+        return (row["id"], row["published"]) if row else (None, None)
+
+    def get_items(self, ids: Iterable[int], columns: str = "*") -> List[Dict]:
+        ids = list(ids)
+        if not ids:
+            return []
+        return self._all(
+            f"SELECT {_columns(columns, _ITEM_COLUMNS)} FROM items "
+            f"WHERE id IN ({_placeholders(ids)})",
+            ids,
+        )
+
+    def page_items(self, offset: int, limit: int, columns: str = "*") -> List[Dict]:
+        return self._all(
+            f"SELECT {_columns(columns, _ITEM_COLUMNS)} FROM items "
+            "ORDER BY id LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+
+    def search_items(self, query: str, limit: int, source_ids=None) -> List[Dict]:
+        terms = _search_terms(query)
+        if not terms:
+            return []
+        # Quoted terms, so FTS5 operators in user input are taken literally;
+        # listed side by side they must all match, as on Supabase.
+        match = " ".join(f'"{term}"' for term in terms)
+        ids = list(source_ids or [])
+        source_filter = f"AND items.source_id IN ({_placeholders(ids)})" if ids else ""
+        return self._all(
+            "SELECT items.id, items.title, items.summary, items.url, items.source_id, "
+            "items.published, bm25(items_fts) AS rank "
+            "FROM items_fts JOIN items ON items.id = items_fts.rowid "
+            f"WHERE items_fts MATCH ? {source_filter} ORDER BY rank LIMIT ?",
+            [match, *ids, limit],
+        )
+
+    def items_with_content(self, after_id: int, limit: int) -> List[Dict]:
+        return self._all(
+            "SELECT id, url, published, content FROM items "
+            "WHERE id > ? AND content IS NOT NULL ORDER BY id LIMIT ?",
+            (after_id, limit),
+        )
+
+    def clear_content(self, ids: List[int]) -> None:
+        if ids:
+            self._connect().execute(
+                f"UPDATE items SET content = NULL WHERE id IN ({_placeholders(ids)})", ids
+            )
+
+    def _file_bytes(self) -> int:
+        return sum(
+            os.path.getsize(path)
+            for path in (self.path, self.path + "-wal")
+            if os.path.exists(path)
+        )
+
+    def vacuum(self) -> Optional[int]:
+        conn = self._connect()
+        before = self._file_bytes()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return before - self._file_bytes()
+
+    def add_feedback(self, rows: List[Dict]) -> None:
+        self._connect().executemany(
+            "INSERT INTO feedback (item_id, thumbs, diff) VALUES (?, ?, ?)",
+            [(row["item_id"], row["thumbs"], json.dumps(row.get("diff") or {})) for row in rows],
+        )
+
+    def feedback_since(self, start_iso: str, after_id: int, limit: int) -> List[Dict]:
+        return self._all(
+            "SELECT id, item_id, thumbs, created_at FROM feedback "
+            "WHERE id > ? AND created_at >= ? ORDER BY id LIMIT ?",
+            (after_id, start_iso, limit),
+        )
+
+    def record_send(self, status: str = "sent") -> None:
+        self._connect().execute(
+            "INSERT INTO history (run_date, status) VALUES (?, ?)",
+            (datetime.utcnow().isoformat(), status),
+        )
+
+    def sent_since(self, start_iso: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM history WHERE run_date >= ? AND status = 'sent' LIMIT 1",
+            (start_iso,),
+        ).fetchone()
+        return row is not None
+
+    def ping(self) -> None:
+        self._connect().execute("SELECT 1 FROM sources LIMIT 1").fetchall()
+
+
+_repository: Optional[Repository] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> Repository:
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            if STORAGE_BACKEND == "sqlite":
+                logger.info("Using embedded SQLite storage at %s", STORAGE_PATH)
+                _repository = SQLiteRepository(STORAGE_PATH)
+            else:
+                _repository = SupabaseRepository()
+        return _repository
+
+
+def set_repository(repository: Optional[Repository]) -> None:
+    """Replace the process-wide repository (``None`` re-reads the env config)."""
+    global _repository
+    with _repository_lock:
+        _repository = repository
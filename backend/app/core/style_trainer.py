@@ -1,14 +1,449 @@
+"""
+Writing-style profiles built from a creator's past newsletters.
+
+:class:`StyleStats` is a mergeable accumulator: sentence lengths are kept as
+a fixed-size NumPy histogram and vocabulary / n-grams as bounded counters,
+so an archive of thousands of issues is processed chunk by chunk in
+constant memory and new issues can be folded into a saved profile later.
+Each chunk is tokenised once with a single regex pass; sentence lengths
+come from ``np.diff`` over terminator positions and ``np.bincount``.
+
+The saved profile (``STYLE_PROFILE_PATH``) is turned into a few lines of
+guidance that :func:`app.core.llm_utils.summarize_story` adds to its prompt.
+Its ``style_version`` only goes up when an update changes the guidance
+materially (tone, traits or things to avoid), so folding in new issues does
+not invalidate every stored summary (see :func:`style_version`).
+
+CLI (from ``backend/``)::
+
+    python -m app.core.style_trainer archive/ --profile style_profile.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
 import re
-from statistics import mean
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+STYLE_PROFILE_PATH = _settings.style_profile_path
+STYLE_CHUNK_SIZE = _settings.style_chunk_size
+
+MAX_SENTENCE_LEN = 120  # longer sentences share the last histogram bin
+VOCAB_LIMIT = 50000
+NGRAM_LIMIT = 20000
+PROFILE_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'’\-]*|[.!?]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can do for from had has have he her his "
+    "i if in into is it its just me my not of on or our she so than that the "
+    "their them then there these they this to up us was we were what when "
+    "which who will with would you your".split()
+)
+_FIRST_PERSON = frozenset({"i", "i'm", "i've", "me", "my", "we", "we're", "our", "us"})
+_SECOND_PERSON = frozenset({"you", "you're", "your", "yours", "you'll"})
+
+
+def _prune(counter: Counter, limit: int) -> Counter:
+    if len(counter) <= limit:
+        return counter
+    return Counter(dict(counter.most_common(limit)))
+
+
+class StyleStats:
+    def __init__(self):
+        self.documents = 0
+        self.words = 0
+        self.questions = 0
+        self.exclamations = 0
+        self.first_person = 0
+        self.second_person = 0
+        self.sentence_hist = np.zeros(MAX_SENTENCE_LEN + 1, dtype=np.int64)
+        self.vocabulary: Counter = Counter()
+        self.bigrams: Counter = Counter()
+        self.trigrams: Counter = Counter()
+        self.seen: set = set()
+        self.style_version = 0
+
+    # Accumulation ----------------------------------------------------------------
+
+    def add_texts(self, texts: Iterable[str]) -> int:
+        """Fold a chunk of documents in; already-seen documents are skipped."""
+        fresh = []
+        for text in texts:
+            text = (text or "").strip()
+            if not text:
+                continue
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+            if digest in self.seen:
+                continue
+            self.seen.add(digest)
+            # Each document ends a sentence, even without punctuation.
+            fresh.append(text + " .")
+        if not fresh:
+            return 0
+
+        tokens = np.array(_TOKEN_RE.findall(" ".join(fresh)), dtype=object)
+        is_term = np.fromiter(
+            (t[0] in ".!?" for t in tokens), dtype=bool, count=len(tokens)
+        )
+        term_positions = np.flatnonzero(is_term)
+        lengths = np.diff(np.concatenate(([-1], term_positions))) - 1
+        lengths = np.minimum(lengths[lengths > 0], MAX_SENTENCE_LEN)
+        self.sentence_hist += np.bincount(lengths, minlength=MAX_SENTENCE_LEN + 1)
+
+        terminators = tokens[term_positions]
+        self.questions += int(sum("?" in t for t in terminators))
+        self.exclamations += int(sum("!" in t for t in terminators))
+
+        words = [w.lower().replace("’", "'") for w in tokens[~is_term]]
+        self.words += len(words)
+        self.documents += len(fresh)
+        counts = Counter(words)
+        self.first_person += sum(counts[w] for w in _FIRST_PERSON)
+        self.second_person += sum(counts[w] for w in _SECOND_PERSON)
+        self.vocabulary.update(counts)
+
+        # N-grams never span a sentence boundary.
+        sentence_ids = np.cumsum(is_term)[~is_term]
+        same2 = sentence_ids[1:] == sentence_ids[:-1]
+        same3 = same2[1:] & same2[:-1]
+        self.bigrams.update(
+            f"{a} {b}" for a, b, ok in zip(words, words[1:], same2) if ok
+        )
+        self.trigrams.update(
+            f"{a} {b} {c}"
+            for a, b, c, ok in zip(words, words[1:], words[2:], same3)
+            if ok
+        )
+
+        self.vocabulary = _prune(self.vocabulary, VOCAB_LIMIT)
+        self.bigrams = _prune(self.bigrams, NGRAM_LIMIT)
+        self.trigrams = _prune(self.trigrams, NGRAM_LIMIT)
+        return len(fresh)
+
+    def merge(self, other: "StyleStats") -> "StyleStats":
+        self.documents += other.documents
+        self.words += other.words
+        self.questions += other.questions
+        self.exclamations += other.exclamations
+        self.first_person += other.first_person
+        self.second_person += other.second_person
+        self.sentence_hist += other.sentence_hist
+        self.vocabulary = _prune(self.vocabulary + other.vocabulary, VOCAB_LIMIT)
+        self.bigrams = _prune(self.bigrams + other.bigrams, NGRAM_LIMIT)
+        self.trigrams = _prune(self.trigrams + other.trigrams, NGRAM_LIMIT)
+        self.seen |= other.seen
+        return self
+
+    # Derived profile ---------------------------------------------------------------
+
+    @property
+    def sentences(self) -> int:
+        return int(self.sentence_hist.sum())
+
+    def sentence_percentile(self, pct: float) -> int:
+        total = self.sentences
+        if not total:
+            return 0
+        cumulative = np.cumsum(self.sentence_hist)
+        return int(np.searchsorted(cumulative, pct / 100 * total))
+
+    def signature_phrases(self, limit: int = 8, min_count: int = 3) -> List[str]:
+        phrases, used_pairs = [], set()
+        for counter in (self.trigrams, self.bigrams):
+            for phrase, count in counter.most_common():
+                if count < min_count or len(phrases) >= limit:
+                    break
+                words = phrase.split()
+                if all(word in _STOPWORDS for word in words):
+                    continue
+                # Overlapping n-grams of one longer phrase count once.
+                pairs = set(zip(words, words[1:]))
+                if pairs & used_pairs:
+                    continue
+                used_pairs |= pairs
+                phrases.append(phrase)
+        return phrases
+
+    def profile(self) -> Dict:
+        sentences = self.sentences
+        if not sentences:
+            return {
+                "avg_sentence_len": 18,
+                "tone": "concise, neutral",
+                "avoid": ["jargon"],
+                "traits": [],
+            }
+        lengths = np.arange(MAX_SENTENCE_LEN + 1)
+        avg_len = float((self.sentence_hist * lengths).sum() / sentences)
+        question_rate = self.questions / sentences
+        exclaim_rate = self.exclamations / sentences
+        you_rate = self.second_person / max(self.words, 1)
+        we_rate = self.first_person / max(self.words, 1)
+
+        tone, traits, avoid = [], [], ["clickbait"]
+        if avg_len < 14:
+            tone.append("punchy")
+            avoid.append("long, winding sentences")
+        elif avg_len > 24:
+            tone.append("detailed")
+        else:
+            tone.append("concise")
+        if you_rate > 0.01 or we_rate > 0.015:
+            tone.append("conversational")
+        else:
+            tone.append("neutral")
+        if question_rate > 0.08:
+            traits.append("asks the reader questions")
+        if exclaim_rate > 0.05:
+            traits.append("enthusiastic")
+        else:
+            avoid.append("exclamation marks")
+        if you_rate > 0.01:
+            traits.append("addresses the reader as 'you'")
+        if we_rate > 0.015:
+            traits.append("writes in the first person")
+
+        content_words = [
+            w for w, _ in self.vocabulary.most_common(200) if w not in _STOPWORDS
+        ]
+        return {
+            "avg_sentence_len": round(avg_len, 2),
+            "sentence_len_p25": self.sentence_percentile(25),
+            "sentence_len_p50": self.sentence_percentile(50),
+            "sentence_len_p90": self.sentence_percentile(90),
+            "tone": ", ".join(tone),
+            "avoid": avoid,
+            "traits": traits,
+            "question_rate": round(question_rate, 4),
+            "exclamation_rate": round(exclaim_rate, 4),
+            "vocabulary_size": len(self.vocabulary),
+            "top_words": content_words[:20],
+            "signature_phrases": self.signature_phrases(),
+            "documents": self.documents,
+            "sentences": sentences,
+        }
+
+    # Persistence -------------------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": PROFILE_VERSION,
+            "style_version": self.style_version,
+            "documents": self.documents,
+            "words": self.words,
+            "questions": self.questions,
+            "exclamations": self.exclamations,
+            "first_person": self.first_person,
+            "second_person": self.second_person,
+            "sentence_hist": self.sentence_hist.tolist(),
+            "vocabulary": dict(self.vocabulary),
+            "bigrams": dict(self.bigrams),
+            "trigrams": dict(self.trigrams),
+            "seen": sorted(self.seen),
+            "profile": self.profile(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StyleStats":
+        stats = cls()
+        if data.get("version") != PROFILE_VERSION:
+            logger.warning("Ignoring style profile with unknown version %s", data.get("version"))
+            return stats
+        for field in (
+            "documents",
+            "words",
+            "questions",
+            "exclamations",
+            "first_person",
+            "second_person",
+            "style_version",
+        ):
+            setattr(stats, field, int(data.get(field, 0)))
+        hist = np.asarray(data.get("sentence_hist", []), dtype=np.int64)
+        stats.sentence_hist[: len(hist)] = hist[: MAX_SENTENCE_LEN + 1]
+        stats.vocabulary = Counter(data.get("vocabulary", {}))
+        stats.bigrams = Counter(data.get("bigrams", {}))
+        stats.trigrams = Counter(data.get("trigrams", {}))
+        stats.seen = set(data.get("seen", []))
+        return stats
+
+
+def load_stats(path: str = STYLE_PROFILE_PATH) -> StyleStats:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return StyleStats.from_dict(json.load(handle))
+    except FileNotFoundError:
+        return StyleStats()
+
+
+def save_stats(stats: StyleStats, path: str = STYLE_PROFILE_PATH) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump(stats.to_dict(), handle)
+    os.replace(tmp, path)
+
+
+def _chunks(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for text in texts:
+        chunk.append(text)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def update_profile(
+    texts: Iterable[str],
+    path: Optional[str] = STYLE_PROFILE_PATH,
+    chunk_size: int = STYLE_CHUNK_SIZE,
+) -> Dict:
+    """
+    Stream ``texts`` into the saved profile at ``path`` (created if missing)
+    and return the derived profile. Documents already counted are skipped,
+    so re-running over a growing archive only adds the new issues.
+    """
+    stats = load_stats(path) if path else StyleStats()
+    before = _material(stats.profile())
+    added = 0
+    for chunk in _chunks(texts, chunk_size):
+        added += stats.add_texts(chunk)
+    if added and _material(stats.profile()) != before:
+        stats.style_version += 1
+    if path and added:
+        save_stats(stats, path)
+        _reset_guidance_cache()
+    logger.info("Style profile updated with %d new document(s)", added)
+    return stats.profile()
+
+
+def _material(profile: Dict) -> tuple:
+    """The parts of a profile whose change should regenerate summaries."""
+    return (
+        bool(profile.get("sentences")),
+        profile.get("tone"),
+        tuple(profile.get("traits", [])),
+        tuple(profile.get("avoid", [])),
+    )
+
 
 def build_style_profile(texts: list[str]) -> dict:
-    if not texts:
-        return {"avg_sentence_len": 18, "tone": "concise, neutral", "avoid": ["jargon"], "traits": []}
-    sent_lens = []
-    for t in texts:
-        sents = re.split(r"[.!?]+\s+", t.strip())
-        words = [len(s.split()) for s in sents if s]
-        if words:
-            sent_lens.append(mean(words))
-    avg_len = round(mean(sent_lens), 2) if sent_lens else 18
-    return {"avg_sentence_len": avg_len, "tone": "insightful, conversational", "avoid": ["clickbait"], "traits": ["active voice"]}
+    return update_profile(texts, path=None)
+
+
+# Prompt guidance ---------------------------------------------------------------------
+
+_guidance_lock = threading.Lock()
+_guidance_cache: Dict[str, object] = {"mtime": None, "text": "", "version": 0}
+
+
+def _reset_guidance_cache() -> None:
+    with _guidance_lock:
+        _guidance_cache["mtime"] = None
+
+
+def format_guidance(profile: Dict) -> str:
+    if not profile.get("sentences"):
+        return ""
+    lines = [
+        f"Match the creator's voice: {profile['tone']}.",
+        (
+            f"Keep sentences around {profile['sentence_len_p50']} words "
+            f"(usually {profile['sentence_len_p25']}-{profile['sentence_len_p90']})."
+        ),
+    ]
+    if profile.get("traits"):
+        lines.append("Style traits: " + "; ".join(profile["traits"]) + ".")
+    if profile.get("signature_phrases"):
+        phrases = ", ".join(f'"{p}"' for p in profile["signature_phrases"][:5])
+        lines.append(f"Where natural, echo phrasing like {phrases}.")
+    if profile.get("avoid"):
+        lines.append("Avoid: " + ", ".join(profile["avoid"]) + ".")
+    return "\n".join(lines)
+
+
+def _cached_profile(path: str) -> Dict[str, object]:
+    """Guidance text and style version of the profile at ``path``."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {"text": "", "version": 0}
+    with _guidance_lock:
+        if _guidance_cache["mtime"] == mtime:
+            return dict(_guidance_cache)
+    try:
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        text = format_guidance(data.get("profile", {}))
+        version = int(data.get("style_version", 0))
+    except Exception:
+        logger.warning("Could not read style profile at %s", path, exc_info=True)
+        text, version = "", 0
+    with _guidance_lock:
+        _guidance_cache.update(mtime=mtime, text=text, version=version)
+        return dict(_guidance_cache)
+
+
+def prompt_guidance(path: str = STYLE_PROFILE_PATH) -> str:
+    """Style lines for LLM prompts; empty when no profile has been trained."""
+    return _cached_profile(path)["text"]
+
+
+def style_version(path: str = STYLE_PROFILE_PATH) -> int:
+    """Bumped only by material profile changes; 0 when there is no profile."""
+    return _cached_profile(path)["version"]
+
+
+# CLI ---------------------------------------------------------------------------------
+
+_ARCHIVE_SUFFIXES = {".txt", ".md", ".html", ".htm"}
+
+
+def _read_archive(paths: List[str]) -> Iterator[str]:
+    from app.core.content_utils import strip_markup
+
+    for root in paths:
+        root_path = Path(root)
+        files = sorted(root_path.rglob("*")) if root_path.is_dir() else [root_path]
+        for file in files:
+            if not file.is_file() or file.suffix.lower() not in _ARCHIVE_SUFFIXES:
+                continue
+            text = file.read_text(encoding="utf-8", errors="replace")
+            if file.suffix.lower() in {".html", ".htm"}:
+                text = strip_markup(text)
+            yield text
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Build or update the creator style profile from past issues."
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories (.txt, .md, .html)")
+    parser.add_argument("--profile", default=STYLE_PROFILE_PATH)
+    parser.add_argument("--chunk-size", type=int, default=STYLE_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    profile = update_profile(_read_archive(args.paths), args.profile, args.chunk_size)
+    print(json.dumps(profile, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
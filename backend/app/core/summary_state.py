@@ -0,0 +1,105 @@
+"""
+Bookkeeping that decides when an item's summary must be regenerated.
+
+Every item row carries:
+
+* ``summary_version``: fingerprint of the prompt, the configured models and
+  the style profile version that produced the summary
+  (:func:`app.core.llm_utils.summary_version`);
+* ``content_hash``: hash of the text that was summarised;
+* ``summary_status``: ``ok`` or ``failed`` (the stored summary is a fallback);
+* ``summary_attempts``: consecutive failed attempts;
+* ``next_attempt_at``: when a failed item may be tried again.
+
+A summary is regenerated when the content or version changes, or when a
+failed item's backoff has elapsed. The backoff doubles from
+``SUMMARY_RETRY_BASE_S`` up to ``SUMMARY_RETRY_MAX_S``.
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+
+_settings = get_settings()
+SUMMARY_RETRY_BASE_S = _settings.summary_retry_base_s
+SUMMARY_RETRY_MAX_S = _settings.summary_retry_max_s
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATE_COLUMNS = (
+    "summary_version",
+    "content_hash",
+    "summary_status",
+    "summary_attempts",
+    "next_attempt_at",
+)
+
+
+def content_hash(text: Optional[str]) -> str:
+    normalised = " ".join((text or "").split())
+    return hashlib.sha1(normalised.encode("utf-8")).hexdigest()[:16]
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def needs_summary(
+    item: Dict, version: str, digest: str, now: Optional[datetime] = None
+) -> bool:
+    """
+    True if ``item`` should be (re)summarised.
+
+    Rows written before this bookkeeping existed have no version; callers
+    check their stored summary the old way and stamp them with
+    :func:`record_attempt`.
+    """
+    if item.get("summary_version") != version or item.get("content_hash") != digest:
+        return True
+    if item.get("summary_status") != STATUS_FAILED:
+        return False
+    retry_at = _parse_time(item.get("next_attempt_at"))
+    now = now or datetime.now(timezone.utc)
+    return retry_at is None or now >= retry_at
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(SUMMARY_RETRY_BASE_S * 2 ** max(attempts - 1, 0), SUMMARY_RETRY_MAX_S)
+
+
+def record_attempt(
+    item: Dict, ok: bool, version: str, digest: str, now: Optional[datetime] = None
+) -> Dict:
+    """Return the state columns after an attempt; failures schedule a retry."""
+    unchanged = (
+        item.get("summary_version") == version and item.get("content_hash") == digest
+    )
+    if ok:
+        return {
+            "summary_version": version,
+            "content_hash": digest,
+            "summary_status": STATUS_OK,
+            "summary_attempts": 0,
+            "next_attempt_at": None,
+        }
+    # New content or a new prompt starts the backoff again.
+    attempts = (item.get("summary_attempts") or 0) + 1 if unchanged else 1
+    now = now or datetime.now(timezone.utc)
+    return {
+        "summary_version": version,
+        "content_hash": digest,
+        "summary_status": STATUS_FAILED,
+        "summary_attempts": attempts,
+        "next_attempt_at": (now + timedelta(seconds=backoff_seconds(attempts))).isoformat(),
+    }
@@ -1,13 +1,89 @@
-import os
-from dotenv import load_dotenv
-from supabase import create_client, Client
-
-# Load environment vars from .env for local development.
-load_dotenv()
-
-def get_client() -> Client:
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    if not url or not key:
-        raise RuntimeError("Missing SUPABASE_URL or SUPABASE_KEY in environment.")
-    return create_client(url, key)
+import threading
+import time
+
+from app.core import tracing
+from app.core.config import get_settings
+from app.core.metrics import SUPABASE_QUERY_SECONDS
+
+_OPERATIONS = {"select", "insert", "upsert", "update", "delete"}
+
+
+class _TimedQuery:
+    """Wraps a postgrest builder chain and times the final ``execute()``."""
+
+    def __init__(self, builder, table: str, operation: str = "unknown"):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def execute(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with tracing.span(
+                "supabase", table=self._table, operation=self._operation
+            ):
+                return self._builder.execute(*args, **kwargs)
+        finally:
+            SUPABASE_QUERY_SECONDS.observe(
+                time.perf_counter() - start,
+                table=self._table,
+                operation=self._operation,
+            )
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+        operation = name if name in _OPERATIONS else self._operation
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, "execute"):
+                return _TimedQuery(result, self._table, operation)
+            return result
+
+        return chained
+
+
+class _TimedClient:
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str) -> _TimedQuery:
+        return _TimedQuery(self._client.table(name), name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> _TimedClient:
+    """
+    The process-wide Supabase client, built on first use.
+
+    The SDK is imported here rather than at module load to keep startup fast.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            settings = get_settings()
+            if not settings.supabase_configured:
+                raise RuntimeError(
+                    "Missing SUPABASE_URL or SUPABASE_KEY in environment."
+                )
+            from supabase import create_client
+
+            _client = _TimedClient(
+                create_client(settings.supabase_url, settings.supabase_key)
+            )
+        return _client
+
+
+def set_client(client) -> None:
+    """Replace the process-wide client (``None`` rebuilds it on next use)."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,265 @@
+"""
+Lightweight request-scoped tracing.
+
+A trace is opened with :func:`start_trace`; :func:`span` calls made
+while it is active nest underneath it and are no-ops otherwise. Spans
+nest through a ``contextvars`` variable, so they follow the request
+into threadpool workers (FastAPI copies the context) and asyncio tasks.
+Plain ``ThreadPoolExecutor`` workers need :func:`wrap` to carry the parent
+span across. Finished traces are exported as one batch when their root
+span closes.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_settings = get_settings()
+TRACING_ENABLED = _settings.tracing_enabled
+TRACE_EXPORT_PATH = _settings.trace_export_path  # JSON-lines file
+TRACE_OTLP_ENDPOINT = _settings.trace_otlp_endpoint  # e.g. http://localhost:4318/v1/traces
+TRACE_SERVICE_NAME = _settings.trace_service_name
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("creatorpulse_span", default=None)
+_file_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self._spans: List["Span"] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span") -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> List["Span"]:
+        with self._lock:
+            return list(self._spans)
+
+    def slowest(self, limit: int = 5) -> List[Dict]:
+        """
+        Finished non-root spans ordered by self time (duration minus
+        children), so a slow parent does not hide which child was slow.
+        """
+        spans = self.spans
+        child_time: Dict[str, float] = {}
+        for s in spans:
+            if s.parent_id:
+                child_time[s.parent_id] = child_time.get(s.parent_id, 0.0) + (s.duration or 0.0)
+        ranked = []
+        for s in spans:
+            if s.parent_id is None:
+                continue
+            duration = s.duration or 0.0
+            # Children running in parallel threads can exceed the parent.
+            self_time = max(duration - child_time.get(s.span_id, 0.0), 0.0)
+            ranked.append((self_time, duration, s))
+        ranked.sort(key=lambda row: row[0], reverse=True)
+        return [
+            {
+                "name": s.name,
+                "self_ms": round(self_time * 1000, 2),
+                "duration_ms": round(duration * 1000, 2),
+                "attributes": s.attributes,
+            }
+            for self_time, duration, s in ranked[:limit]
+        ]
+
+
+class Span:
+    def __init__(self, name: str, trace: Trace, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+        self.trace.add(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    trace = None
+    trace_id = None
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Span]:
+    """Open a root span; the whole trace is exported when it closes."""
+    if not TRACING_ENABLED:
+        yield _NOOP
+        return
+    with _open(name, None, attributes) as root:
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Open a child of the current span; a no-op outside of a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP
+        return
+    with _open(name, parent, attributes) as child:
+        yield child
+
+
+@contextmanager
+def _open(name: str, parent: Optional[Span], attributes: Dict) -> Iterator[Span]:
+    trace = parent.trace if parent else Trace(uuid.uuid4().hex)
+    current = Span(name, trace, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+        if parent is None:
+            _export(trace)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace() -> Optional[Trace]:
+    active = _current_span.get()
+    return active.trace if active else None
+
+
+def wrap(fn: Callable) -> Callable:
+    """Bind ``fn`` to the caller's context so spans nest across threads."""
+    ctx = copy_context()
+
+    def runner(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return runner
+
+
+def trace_summary(limit: int = 5) -> Optional[Dict]:
+    """Summary of the active trace's slowest spans, for API responses."""
+    trace = current_trace()
+    if trace is None:
+        return None
+    return {"trace_id": trace.trace_id, "slowest_spans": trace.slowest(limit)}
+
+
+def _export(trace: Trace) -> None:
+    if not (TRACE_EXPORT_PATH or TRACE_OTLP_ENDPOINT):
+        return
+    spans = trace.spans
+    if TRACE_EXPORT_PATH:
+        try:
+            lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+            with _file_lock, open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as fh:
+                fh.write(lines)
+        except Exception:
+            logger.warning("Failed to write trace %s to %s", trace.trace_id, TRACE_EXPORT_PATH, exc_info=True)
+    if TRACE_OTLP_ENDPOINT:
+        # Ship off-thread so a slow collector never adds request latency.
+        threading.Thread(
+            target=_post_otlp, args=(_to_otlp(spans),), daemon=True
+        ).start()
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp(spans: List[Span]) -> Dict:
+    """Encode spans using the OTLP/HTTP JSON shape."""
+    otlp_spans = []
+    for s in spans:
+        start_ns = int(s.start_time * 1e9)
+        end_ns = start_ns + int((s.duration or 0.0) * 1e9)
+        otlp_spans.append(
+            {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(end_ns),
+                "attributes": [
+                    {"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()
+                ],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+        )
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": "creatorpulse"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+def _post_otlp(payload: Dict) -> None:
+    import requests
+
+    try:
+        requests.post(TRACE_OTLP_ENDPOINT, json=payload, timeout=5)
+    except Exception:
+        logger.warning("Failed to export trace to %s", TRACE_OTLP_ENDPOINT, exc_info=True)
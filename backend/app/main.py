@@ -1,42 +1,53 @@
-from dotenv import load_dotenv
-
-load_dotenv()  # Ensure environment variables from .env are available before other imports
+# Loads .env; must come before other app imports read their settings.
+from app.core.config import get_settings
 
 import logging
-import os
+import threading
+import time
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.routers import feedback, newsletter, sources
+from app.core import backfill, extraction, feedback_store, scheduler
+from app.core.llm_utils import provider_health
+from app.core.metrics import render_latest
+from app.core.storage import STORAGE_BACKEND, get_repository
+from app.routers import feedback, newsletter, search, sources
 
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
-LOG_FORMAT = os.getenv(
-    'LOG_FORMAT', '%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(message)s'
-)
+settings = get_settings()
+LOG_LEVEL = settings.log_level
 
-logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
+logging.basicConfig(level=LOG_LEVEL, format=settings.log_format)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title='CreatorPulse API', version='0.1.0')
 
-allowed_origins_env = os.getenv('ALLOWED_ORIGINS', '')
-allowed_origins = [
-    origin.strip() for origin in allowed_origins_env.split(',') if origin.strip()
-]
-if not allowed_origins:
-    allowed_origins = ['*']
+def _scheduled_send():
+    newsletter.send_newsletter(None, skip_if_sent=True)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    scheduler.start_scheduler(send=_scheduled_send)
+    backfill.resume_unfinished()
+    feedback_store.start_feedback()
+    yield
+    scheduler.stop_scheduler()
+    extraction.shutdown_pool()
+    feedback_store.stop_feedback()
 
-allow_credentials = os.getenv('ALLOW_CREDENTIALS', 'true').lower() == 'true'
-if allowed_origins == ['*']:
-    allow_credentials = False
+
+app = FastAPI(title='CreatorPulse API', version='0.1.0', lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,
-    allow_credentials=allow_credentials,
+    allow_origins=settings.allowed_origins,
+    allow_credentials=settings.allow_credentials,
     allow_methods=['*'],
     allow_headers=['*'],
+    # Lets the dashboard read ETags for conditional requests.
+    expose_headers=['ETag'],
 )
 
 logger.info('CreatorPulse API initialised with log level %s', LOG_LEVEL)
@@ -44,10 +55,62 @@ logger.info('CreatorPulse API initialised with log level %s', LOG_LEVEL)
 app.include_router(sources.router, prefix='/sources', tags=['Sources'])
 app.include_router(newsletter.router, prefix='/newsletter', tags=['Newsletter'])
 app.include_router(feedback.router, prefix='/feedback', tags=['Feedback'])
+app.include_router(search.router, prefix='/search', tags=['Search'])
 
 
 @app.get('/health')
-def health():
-    logger.debug('Health check requested')
+async def health():
+    # Liveness only: no I/O, so it answers as soon as the process is up.
     return {'status': 'ok'}
 
+
+_ready_lock = threading.Lock()
+_ready_cache = {'at': 0.0, 'result': None}
+
+
+def _check_ready():
+    checks = {}
+    try:
+        get_repository().ping()
+        checks['storage'] = 'ok'
+    except Exception as exc:
+        logger.warning('Readiness check failed: %s', exc)
+        checks['storage'] = f'error: {type(exc).__name__}'
+    ready = checks['storage'] == 'ok'
+    return ready, {
+        'status': 'ready' if ready else 'unavailable',
+        'storage_backend': STORAGE_BACKEND,
+        'checks': checks,
+        'llm_providers': provider_health(),
+    }
+
+
+@app.get('/ready')
+def ready():
+    """Readiness: storage reachable. Results are reused for READY_CACHE_S."""
+    with _ready_lock:
+        now = time.monotonic()
+        if (
+            _ready_cache['result'] is None
+            or now - _ready_cache['at'] >= settings.ready_cache_s
+        ):
+            _ready_cache['result'] = _check_ready()
+            _ready_cache['at'] = now
+        is_ready, body = _ready_cache['result']
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    # Rendering is pure in-memory work, so skip the threadpool hop.
+    return PlainTextResponse(
+        render_latest(), media_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@app.get('/scheduler')
+def scheduler_status():
+    active = scheduler.get_scheduler()
+    if active is None:
+        return {'running': False, 'sources': []}
+    return active.snapshot()
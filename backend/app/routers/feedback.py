@@ -1,15 +1,34 @@
-from fastapi import APIRouter
-from app.core.supabase_client import get_client
+from typing import List, Optional
+
+from fastapi import APIRouter, Query
+
+from app.core.feedback_store import get_store, record_vote
 from app.core.schemas import FeedbackIn
 
 router = APIRouter()
 
-@router.post("")
+@router.post("", status_code=202)
 def submit_feedback(fb: FeedbackIn):
-    sb = get_client()
-    res = sb.table("feedback").insert({
-        "item_id": fb.item_id,
-        "thumbs": fb.thumbs,
-        "diff": fb.diff_json or {}
-    }).execute()
-    return res.data
+    # Votes are written in batches; see app/core/feedback_store.py.
+    pending = record_vote(fb.item_id, fb.thumbs, fb.diff_json)
+    return {"status": "queued", "item_id": fb.item_id, "pending": pending}
+
+
+@router.get("/scores")
+def feedback_scores(
+    item_ids: Optional[List[int]] = Query(default=None),
+    source_ids: Optional[List[int]] = Query(default=None),
+):
+    store = get_store()
+    if store is None:
+        return {"items": {}, "sources": {}}
+    return {
+        "items": {
+            str(key): round(value, 4)
+            for key, value in store.item_scores(item_ids or []).items()
+        },
+        "sources": {
+            str(key): round(value, 4)
+            for key, value in store.source_quality(source_ids or []).items()
+        },
+    }
@@ -1,92 +1,221 @@
+import json
 import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, Iterator, List, Optional, Set
 
-from fastapi import APIRouter, Body, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 
+from app.core import coordination, tracing
+from app.core.config import get_settings
 from app.core.content_utils import strip_markup
 from app.core.emailer import send_email
+from app.core.feedback_store import rank_items
 from app.core.ingestion import ingest_feed
 from app.core.llm_utils import (
     fallback_summary,
     normalize_summary,
     render_newsletter,
+    render_shell,
+    render_story,
+    render_trends,
+    story_source,
     summarize_story,
     summary_is_informative,
+    summary_version,
 )
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.core.response_cache import (
+    ResponseCache,
+    SingleFlight,
+    cached_json,
+    invalidate_sources,
+)
+from app.core.retention import load_content
 from app.core.schemas import PipelineRequest, SendRequest
-from app.core.supabase_client import get_client
+from app.core.source_adapters import detect_type
+from app.core.summary_state import (
+    STATE_COLUMNS,
+    content_hash,
+    needs_summary,
+    record_attempt,
+)
+from app.core.storage import get_repository
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 TOP_STORY_LIMIT = 10
+TRACE_SUMMARY_LIMIT = 5
+TREND_COUNT = 3
+# Recent items considered per slot when feedback re-ranks the top stories.
+CANDIDATE_FACTOR = 3
+_settings = get_settings()
+GENERATE_CACHE_TTL_S = _settings.generate_cache_ttl_s
+# Stories summarised concurrently by /generate/stream.
+STREAM_WORKERS = _settings.stream_workers
+INTRO = "Here are the top stories and trends you should know today."
+
+_generate_cache = ResponseCache("newsletter_generate", GENERATE_CACHE_TTL_S)
+_generate_flights = SingleFlight("newsletter_generate")
 
 
 def _fetch_top_items(
-    sb, limit: int = TOP_STORY_LIMIT, source_ids: Optional[List[int]] = None
+    repo, limit: int = TOP_STORY_LIMIT, source_ids: Optional[List[int]] = None
 ) -> List[Dict]:
-    query = sb.table("items").select("*")
-    if source_ids:
-        query = query.in_("source_id", source_ids)
-    res = query.order("published", desc=True).limit(limit).execute()
-    return res.data or []
+    candidates = repo.latest_items(limit * CANDIDATE_FACTOR, source_ids)
+    return rank_items(candidates, limit)
 
 
-def _ensure_story_format(item: Dict) -> Dict:
+def _ensure_story_format(
+    item: Dict, version: str, on_delta: Optional[Callable[[str], None]] = None
+) -> bool:
+    """
+    Give ``item`` a headline and summary, calling the LLM only if needed.
+
+    ``on_delta`` streams the LLM output as it arrives.
+    Returns True when the row changed and should be written back.
+    """
     fallback_title = item.get("title") or "Untitled"
     existing_summary = item.get("summary") or ""
-
-    if existing_summary:
+    if "content" in item:
+        digest = content_hash(item["content"])
+    else:
+        # Body not loaded (or archived): the stored hash still describes it.
+        digest = item.get("content_hash") or content_hash(None)
+
+    if item.get("summary_version") is None and existing_summary:
+        # Stored before summary bookkeeping: keep a good summary, stamp it.
         normalized = normalize_summary(existing_summary)
         if summary_is_informative(normalized):
+            CACHE_HITS.inc(cache="story_summary")
             item["summary"] = normalized
             item["title"] = fallback_title
-            return item
-
-    article_text = item.get("content") or existing_summary or fallback_title
-    story = summarize_story(article_text, fallback_title)
-
-    if not summary_is_informative(story["summary"]):
-        alternate_source = " ".join(
-            filter(
-                None,
-                [
-                    fallback_title,
-                    item.get("content"),
-                    existing_summary,
-                ],
-            )
+            item.update(record_attempt(item, True, version, digest))
+            return True
+
+    if not needs_summary(item, version, digest):
+        CACHE_HITS.inc(cache="story_summary")
+        item["summary"] = normalize_summary(existing_summary) or fallback_summary(
+            fallback_title
         )
-        if alternate_source.strip():
-            alternate_story = summarize_story(alternate_source, fallback_title)
-            if summary_is_informative(alternate_story["summary"]):
-                story = alternate_story
+        item["title"] = fallback_title
+        return False
+
+    CACHE_MISSES.inc(cache="story_summary")
 
-    if not summary_is_informative(story["summary"]):
+    article_text = story_source(fallback_title, item.get("content"), existing_summary)
+    story = summarize_story(article_text, fallback_title, on_delta)
+
+    ok = story["ok"]
+    if not ok:
         story["summary"] = fallback_summary(story["headline"])
 
     item["title"] = story["headline"]
     item["summary"] = normalize_summary(story["summary"])
-    return item
+    item.update(record_attempt(item, ok, version, digest))
+    return True
+
+
+def _save_stories(repo, items: List[Dict]) -> None:
+    """Write regenerated summaries and their bookkeeping back in one batch."""
+    rows = [
+        {
+            key: item.get(key)
+            for key in ("id", "url", "source_id", "title", "summary", *STATE_COLUMNS)
+        }
+        for item in items
+        if item.get("id") is not None
+    ]
+    if not rows:
+        return
+    try:
+        repo.update_items(rows)
+    except Exception:
+        # Next build simply tries again.
+        logger.warning(
+            "Could not store %d regenerated summaries", len(rows), exc_info=True
+        )
+
+
+def _detect_trends(
+    repo, curated: List[Dict], source_ids: Optional[List[int]] = None
+) -> List[str]:
+    """Titles representing the biggest topic clusters among recent items."""
+    # Imported here so NumPy is not loaded at startup.
+    from app.core.semantic_index import get_index, trend_window_start
+
+    fallback = [it["title"] for it in curated[:TREND_COUNT]]
+    index = get_index()
+    if index is None:
+        return fallback
+    try:
+        # Items ingested before the index existed are added on first use.
+        index.add_items(curated, replace=False)
+        clusters = index.clusters(
+            TREND_COUNT, source_ids=source_ids, since=trend_window_start()
+        )
+        representatives = [members[0] for members in clusters]
+        titles = {it.get("id"): it["title"] for it in curated}
+        missing = [item_id for item_id in representatives if item_id not in titles]
+        if missing:
+            rows = repo.get_items(missing, "id,title")
+            titles.update({row["id"]: row["title"] for row in rows})
+        trends = [titles[i] for i in representatives if titles.get(i)]
+    except Exception:
+        logger.warning("Trend clustering failed; using top stories", exc_info=True)
+        return fallback
+    return trends or fallback
+
+
+def _load_stale_content(repo, items: List[Dict], version: str) -> None:
+    # Listings carry no article bodies; load them only where a summary will
+    # be (re)generated.
+    stale = [
+        it
+        for it in items
+        if not it.get("content_hash") or needs_summary(it, version, it["content_hash"])
+    ]
+    if stale:
+        with tracing.span("load_content", items=len(stale)):
+            load_content(repo, stale)
+
+
+def _story_payload(item: Dict) -> Dict:
+    return {"title": item["title"], "summary": item["summary"], "url": item["url"]}
 
 
 def _build_newsletter(
-    sb, source_ids: Optional[List[int]] = None, limit: int = TOP_STORY_LIMIT
+    repo, source_ids: Optional[List[int]] = None, limit: int = TOP_STORY_LIMIT
 ) -> Dict:
-    items = _fetch_top_items(sb, limit, source_ids)
+    items = _fetch_top_items(repo, limit, source_ids)
     if not items:
         raise HTTPException(
             status_code=404,
             detail="No items found. Add sources and ingest content first.",
         )
 
-    curated = [_ensure_story_format(dict(it)) for it in items]
-
-    intro = "Here are the top stories and trends you should know today."
-    trends = [it["title"] for it in curated[:3]]
-    html_body, text_body = render_newsletter(intro, curated, trends)
+    curated, changed = [], []
+    version = summary_version()
+    _load_stale_content(repo, items, version)
+    with tracing.span("curate", items=len(items)):
+        for it in items:
+            with tracing.span("story", item_id=it.get("id")):
+                story = dict(it)
+                if _ensure_story_format(story, version):
+                    changed.append(story)
+                curated.append(story)
+    if changed:
+        with tracing.span("persist", rows=len(changed)):
+            _save_stories(repo, changed)
+
+    intro = INTRO
+    with tracing.span("trends"):
+        trends = _detect_trends(repo, curated, source_ids)
+    with tracing.span("render"):
+        html_body, text_body = render_newsletter(intro, curated, trends)
     return {
         "items": curated,
         "html": html_body,
@@ -96,26 +225,174 @@ def _build_newsletter(
     }
 
 
+def _generate_response(
+    request: Request, source_ids: Optional[List[int]], conditional: bool
+) -> Response:
+    repo = get_repository()
+    sources_key = tuple(sorted(set(source_ids or [])))
+    # The newest item id changes whenever new items land.
+    key = (sources_key, repo.latest_item_marker(source_ids))
+
+    def build() -> Dict:
+        logger.info("Generating newsletter (source_ids=%s)", source_ids)
+        newsletter = _build_newsletter(repo, source_ids)
+        return {
+            "html": newsletter["html"],
+            "text": newsletter["text"],
+            "stories": [_story_payload(item) for item in newsletter["items"]],
+        }
+
+    return cached_json(
+        request, _generate_cache, _generate_flights, key, build, conditional
+    )
+
+
+@router.get("/generate")
+def generate_newsletter_cached(
+    request: Request, source_ids: Optional[List[int]] = Query(default=None)
+):
+    """Same body as ``POST /generate``; honours ``If-None-Match`` with ``304``."""
+    return _generate_response(request, source_ids, conditional=True)
+
+
 @router.post("/generate")
 def generate_newsletter(
-    source_ids: Optional[List[int]] = Body(default=None, embed=True)
+    request: Request,
+    source_ids: Optional[List[int]] = Body(default=None, embed=True),
 ):
-    sb = get_client()
-    logger.info("Generating newsletter (source_ids=%s)", source_ids)
-    newsletter = _build_newsletter(sb, source_ids)
-    return {
-        "html": newsletter["html"],
-        "text": newsletter["text"],
-        "stories": [
-            {"title": item["title"], "summary": item["summary"], "url": item["url"]}
-            for item in newsletter["items"]
-        ],
+    return _generate_response(request, source_ids, conditional=False)
+
+
+def _stream_events(
+    repo, source_ids: Optional[List[int]], items: List[Dict], key
+) -> Iterator[Dict]:
+    """
+    Build the newsletter for ``items`` as a sequence of preview events.
+
+    ``shell`` comes first, then ``delta`` chunks and one ``story`` per item
+    in completion order, then ``trends`` and finally ``done`` with the same
+    body ``/generate`` returns (which is cached for it).
+    """
+    total = len(items)
+    head, tail = render_shell(INTRO)
+    yield {"type": "shell", "head": head, "tail": tail, "intro": INTRO, "count": total}
+
+    cached = _generate_cache.get(key)
+    if cached is not None:
+        payload = json.loads(cached.body)
+        for index, story in enumerate(payload["stories"]):
+            yield {
+                "type": "story",
+                "index": index,
+                **story,
+                "html": render_story(index + 1, story, total),
+            }
+        yield {"type": "done", **payload}
+        return
+
+    version = summary_version()
+    _load_stale_content(repo, items, version)
+    events: "queue.Queue[Dict]" = queue.Queue()
+    curated: List[Optional[Dict]] = [None] * total
+    changed: List[Dict] = []
+
+    def work(index: int, item: Dict) -> None:
+        story = dict(item)
+        try:
+            if _ensure_story_format(
+                story,
+                version,
+                lambda text: events.put({"type": "delta", "index": index, "text": text}),
+            ):
+                changed.append(story)
+        except Exception:
+            logger.warning(
+                "Streaming summary failed for item %s", item.get("id"), exc_info=True
+            )
+            story["title"] = story.get("title") or item.get("url") or "Untitled"
+            story["summary"] = story.get("summary") or fallback_summary(story["title"])
+        finally:
+            curated[index] = story
+            events.put({"type": "story", "index": index, "story": story})
+
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, STREAM_WORKERS), thread_name_prefix="newsletter-stream"
+    )
+    try:
+        for index, item in enumerate(items):
+            pool.submit(tracing.wrap(work), index, item)
+        finished = 0
+        while finished < total:
+            event = events.get()
+            if event["type"] == "story":
+                finished += 1
+                story = event.pop("story")
+                event.update(_story_payload(story))
+                event["html"] = render_story(event["index"] + 1, story, total)
+            yield event
+    finally:
+        # A client that disconnects early stops the stories not yet started.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if changed:
+        _save_stories(repo, changed)
+    trends = _detect_trends(repo, curated, source_ids)
+    yield {"type": "trends", "trends": trends, "html": render_trends(trends)}
+
+    html_body, text_body = render_newsletter(INTRO, curated, trends)
+    payload = {
+        "html": html_body,
+        "text": text_body,
+        "stories": [_story_payload(item) for item in curated],
     }
+    _generate_cache.put(key, payload)
+    yield {"type": "done", **payload}
+
+
+@router.get("/generate/stream")
+def stream_newsletter(source_ids: Optional[List[int]] = Query(default=None)):
+    """
+    Progressive ``/generate``: newline-delimited JSON events, starting with
+    the HTML shell and sending each story as soon as it is summarised.
+    """
+    repo = get_repository()
+    key = (tuple(sorted(set(source_ids or []))), repo.latest_item_marker(source_ids))
+    items = _fetch_top_items(repo, TOP_STORY_LIMIT, source_ids)
+    if not items:
+        raise HTTPException(
+            status_code=404,
+            detail="No items found. Add sources and ingest content first.",
+        )
+    logger.info("Streaming newsletter (source_ids=%s)", source_ids)
+    body = (
+        json.dumps(event) + "\n" for event in _stream_events(repo, source_ids, items, key)
+    )
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/pipeline")
 def run_pipeline(payload: PipelineRequest):
-    sb = get_client()
+    with tracing.start_trace(
+        "pipeline",
+        source_url=str(payload.source_url) if payload.source_url else None,
+        ingest_existing=payload.ingest_existing,
+    ):
+        return _run_pipeline(payload)
+
+
+def _trace_step() -> Dict:
+    summary = tracing.trace_summary(limit=TRACE_SUMMARY_LIMIT)
+    if summary is None:
+        return {"stage": "trace", "status": "skipped"}
+    return {"stage": "trace", "status": "completed", **summary}
+
+
+def _run_pipeline(payload: PipelineRequest):
+    repo = get_repository()
     steps = []
     current_stage = "source"
     selected_ids: Optional[Set[int]] = (
@@ -132,27 +409,14 @@ def run_pipeline(payload: PipelineRequest):
     try:
         # Optional: add a new source supplied by the user.
         if payload.source_url:
-            existing = (
-                sb.table("sources")
-                .select("id")
-                .eq("url", str(payload.source_url))
-                .limit(1)
-                .execute()
-                .data
-            )
+            existing = repo.get_source_by_url(str(payload.source_url))
             if not existing:
-                insert_res = (
-                    sb.table("sources")
-                    .insert(
-                        {
-                            "name": payload.source_name or str(payload.source_url),
-                            "url": str(payload.source_url),
-                            "type": "rss",
-                        }
-                    )
-                    .execute()
-                )
-                new_id = insert_res.data[0]["id"]
+                new_id = repo.add_source(
+                    payload.source_name or str(payload.source_url),
+                    str(payload.source_url),
+                    detect_type(str(payload.source_url)),
+                )["id"]
+                invalidate_sources()
                 if selected_ids is not None:
                     selected_ids.add(new_id)
                 steps.append(
@@ -165,7 +429,7 @@ def run_pipeline(payload: PipelineRequest):
                 )
             else:
                 if selected_ids is not None:
-                    selected_ids.add(existing[0]["id"])
+                    selected_ids.add(existing["id"])
                 steps.append(
                     {"stage": "source", "status": "completed", "action": "existing"}
                 )
@@ -173,10 +437,7 @@ def run_pipeline(payload: PipelineRequest):
             steps.append({"stage": "source", "status": "skipped"})
 
         # Resolve which sources to use for the rest of the pipeline.
-        source_query = sb.table("sources").select("id,url,name")
-        if selected_ids:
-            source_query = source_query.in_("id", list(selected_ids))
-        source_records = source_query.execute().data or []
+        source_records = repo.list_sources(selected_ids or None)
         if not source_records:
             steps.append(
                 {
@@ -185,6 +446,7 @@ def run_pipeline(payload: PipelineRequest):
                     "message": "No sources available. Select or add at least one.",
                 }
             )
+            steps.append(_trace_step())
             return JSONResponse(
                 status_code=400,
                 content={
@@ -201,14 +463,25 @@ def run_pipeline(payload: PipelineRequest):
         current_stage = "fetch"
         total_inserted = 0
         if payload.ingest_existing:
+            deferred = []
             for source in source_records:
-                inserted, _ = ingest_feed(sb, source)
+                lease_name = coordination.source_lease_name(source["id"])
+                with coordination.try_lease(lease_name) as lease:
+                    if lease is None:
+                        # Another worker is ingesting it; don't repeat the work.
+                        deferred.append(lease_name)
+                        continue
+                    inserted, _ = ingest_feed(repo, source)
                 total_inserted += inserted
+            # Wait for the other workers so curation sees their items too.
+            for lease_name in deferred:
+                coordination.wait_released(lease_name)
             steps.append(
                 {
                     "stage": "fetch",
                     "status": "completed",
                     "inserted": total_inserted,
+                    "deferred": len(deferred),
                 }
             )
         else:
@@ -216,7 +489,7 @@ def run_pipeline(payload: PipelineRequest):
 
         # Curate & summarize top 10 stories
         current_stage = "curate"
-        newsletter = _build_newsletter(sb, used_source_ids)
+        newsletter = _build_newsletter(repo, used_source_ids)
         steps.append(
             {
                 "stage": "curate",
@@ -232,6 +505,7 @@ def run_pipeline(payload: PipelineRequest):
             }
         )
 
+        steps.append(_trace_step())
         response = {
             "steps": steps,
             "html": newsletter["html"],
@@ -257,6 +531,7 @@ def run_pipeline(payload: PipelineRequest):
         steps.append(
             {"stage": current_stage, "status": "error", "message": exc.detail}
         )
+        steps.append(_trace_step())
         return JSONResponse(
             status_code=exc.status_code,
             content={"error": exc.detail, "steps": steps},
@@ -266,6 +541,7 @@ def run_pipeline(payload: PipelineRequest):
         steps.append(
             {"stage": current_stage, "status": "error", "message": str(exc)}
         )
+        steps.append(_trace_step())
         return JSONResponse(
             status_code=500,
             content={"error": "Pipeline failed.", "steps": steps},
@@ -273,8 +549,15 @@ def run_pipeline(payload: PipelineRequest):
 
 
 @router.post("/send")
-def send_newsletter(payload: Optional[SendRequest] = Body(default=None)):
-    sb = get_client()
+def send_newsletter(
+    payload: Optional[SendRequest] = Body(default=None),
+    skip_if_sent: bool = Query(default=False),
+):
+    """
+    ``skip_if_sent`` makes the call a no-op when today's issue has already
+    gone out, so a scheduled trigger can run alongside the in-process send.
+    """
+    repo = get_repository()
     source_ids = payload.source_ids if payload else None
     html_override = payload.html if payload and payload.html else None
     text_override = payload.text if payload and payload.text else None
@@ -287,44 +570,55 @@ def send_newsletter(payload: Optional[SendRequest] = Body(default=None)):
         payload.email_to if payload else None,
     )
 
-    newsletter = None
-    if html_override is None or text_override is None or source_ids:
-        newsletter = _build_newsletter(sb, source_ids)
+    issue = datetime.utcnow().date()
+    subject = f"CreatorPulse Daily - {issue}"
+    email_to = payload.email_to if payload and payload.email_to else None
+    # The lock spans the history check, the build and the send, so a skipped
+    # call does no curation work and only one worker sends each issue.
+    with coordination.try_lease(coordination.send_lock_name(str(issue))) as lease:
+        if lease is None:
+            raise HTTPException(
+                status_code=409,
+                detail="This issue is already being sent by another worker.",
+            )
+        if skip_if_sent and repo.sent_since(f"{issue}T00:00:00"):
+            logger.info("Newsletter already sent for %s; skipping", issue)
+            return {"status": "skipped", "subject": subject}
 
-    if not newsletter and not html_override:
-        raise HTTPException(
-            status_code=400,
-            detail="No newsletter content available. Run the pipeline first.",
-        )
+        newsletter = None
+        if html_override is None or text_override is None or source_ids:
+            newsletter = _build_newsletter(repo, source_ids)
 
-    if newsletter is None:
-        newsletter = {"html": "", "text": ""}
+        if not newsletter and not html_override:
+            raise HTTPException(
+                status_code=400,
+                detail="No newsletter content available. Run the pipeline first.",
+            )
 
-    html_body = html_override or newsletter.get("html") or ""
-    if not html_body.strip():
-        raise HTTPException(
-            status_code=400,
-            detail="Newsletter HTML is empty. Provide edited content or rerun the pipeline.",
-        )
+        if newsletter is None:
+            newsletter = {"html": "", "text": ""}
 
-    text_body = text_override or newsletter.get("text") or ""
-    if not text_body.strip():
-        text_body = strip_markup(html_body)
+        html_body = html_override or newsletter.get("html") or ""
+        if not html_body.strip():
+            raise HTTPException(
+                status_code=400,
+                detail="Newsletter HTML is empty. Provide edited content or rerun the pipeline.",
+            )
 
-    subject = f"CreatorPulse Daily - {datetime.utcnow().date()}"
-    email_to = payload.email_to if payload and payload.email_to else None
-    logger.info(
-        "Dispatching newsletter email with subject '%s' (recipient=%s)",
-        subject,
-        email_to or "default",
-    )
-    send_email(subject, html_body, text_body, recipient=email_to)
+        text_body = text_override or newsletter.get("text") or ""
+        if not text_body.strip():
+            text_body = strip_markup(html_body)
 
-    try:
-        sb.table("history").insert(
-            {"run_date": datetime.utcnow().isoformat(), "status": "sent"}
-        ).execute()
-    except Exception:
-        logger.warning("Failed to record send event in history table", exc_info=True)
+        logger.info(
+            "Dispatching newsletter email with subject '%s' (recipient=%s)",
+            subject,
+            email_to or "default",
+        )
+        send_email(subject, html_body, text_body, recipient=email_to)
+
+        try:
+            repo.record_send("sent")
+        except Exception:
+            logger.warning("Failed to record send event in history table", exc_info=True)
 
     return {"status": "sent", "subject": subject}
@@ -0,0 +1,57 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.storage import get_repository
+
+router = APIRouter()
+
+MAX_RESULTS = 50
+
+
+@router.get("")
+def search_items(
+    q: str = Query(..., min_length=2),
+    k: int = Query(default=10, ge=1, le=MAX_RESULTS),
+    source_ids: Optional[List[int]] = Query(default=None),
+    mode: str = Query(default="semantic", pattern="^(semantic|keyword)$"),
+):
+    """
+    ``mode=semantic`` ranks by embedding similarity and falls back to
+    keyword search when the semantic index is disabled; ``mode=keyword``
+    matches words in titles and summaries.
+    """
+    repo = get_repository()
+    if mode == "semantic":
+        # Imported here so NumPy is not loaded at startup.
+        from app.core.semantic_index import get_index
+
+        index = get_index()
+        if index is not None:
+            return _semantic_search(repo, index, q, k, source_ids)
+
+    try:
+        rows = repo.search_items(q, k, source_ids)
+    except Exception:
+        raise HTTPException(status_code=503, detail="Keyword search is unavailable.")
+    results = [{**row, "score": None} for row in rows]
+    for row in results:
+        row.pop("rank", None)
+    return {"query": q, "mode": "keyword", "results": results}
+
+
+def _semantic_search(repo, index, q: str, k: int, source_ids: Optional[List[int]]):
+    hits = index.search(q, k=k, source_ids=source_ids)
+    if not hits:
+        return {"query": q, "mode": "semantic", "results": []}
+
+    rows = repo.get_items(
+        [item_id for item_id, _ in hits], "id,title,summary,url,source_id,published"
+    )
+    by_id = {row["id"]: row for row in rows}
+    results = [
+        {**by_id[item_id], "score": round(score, 4)}
+        for item_id, score in hits
+        if item_id in by_id
+    ]
+    return {"query": q, "mode": "semantic", "results": results}
@@ -1,49 +1,108 @@
-from fastapi import APIRouter, HTTPException
-from app.core.supabase_client import get_client
-from app.core.schemas import SourceIn
+from fastapi import APIRouter, HTTPException, Request
+from app.core.storage import get_repository
+from app.core.schemas import SourceImport, SourceIn
 from app.core.ingestion import ingest_feed
+from app.core import backfill, coordination, tracing
+from app.core.response_cache import (
+    SingleFlight,
+    cached_json,
+    invalidate_sources,
+    sources_cache,
+)
+from app.core.source_adapters import source_types
 
 router = APIRouter()
 
+_sources_flights = SingleFlight("sources")
+
 @router.get("")
-def list_sources():
-    sb = get_client()
-    res = sb.table("sources").select("*").execute()
-    return res.data
+def list_sources(request: Request):
+    def build():
+        return get_repository().list_sources()
+
+    return cached_json(request, sources_cache, _sources_flights, "all", build)
 
 @router.post("")
 def add_source(src: SourceIn):
-    sb = get_client()
+    repo = get_repository()
     # Basic uniqueness by URL
-    existing = sb.table("sources").select("id").eq("url", str(src.url)).execute().data
-    if existing:
+    if repo.get_source_by_url(str(src.url)):
         raise HTTPException(status_code=409, detail="Source already exists")
-    res = sb.table("sources").insert({"name": src.name, "url": str(src.url), "type": src.type}).execute()
-    return res.data
+    if src.type not in source_types():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown source type {src.type!r}; expected one of {', '.join(source_types())}",
+        )
+    created = repo.add_source(src.name, str(src.url), src.type)
+    invalidate_sources()
+    return [created]
 
 @router.delete("")
 def delete_source(url: str):
-    sb = get_client()
-    res = sb.table("sources").delete().eq("url", url).execute()
-    return {"deleted": res.count if hasattr(res, "count") else True}
+    deleted = get_repository().delete_source(url)
+    invalidate_sources()
+    return {"deleted": deleted}
+
+@router.post("/import", status_code=202)
+def import_sources(payload: SourceImport):
+    """Add many sources at once (OPML and/or lists) and backfill them in the background."""
+    feeds = []
+    if payload.opml:
+        try:
+            feeds.extend(backfill.parse_opml(payload.opml))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    feeds.extend(
+        {"name": src.name, "url": str(src.url), "type": src.type} for src in payload.sources or []
+    )
+    feeds.extend({"url": url} for url in payload.urls or [])
+    if not feeds:
+        raise HTTPException(status_code=400, detail="No feeds to import.")
+
+    try:
+        summary = backfill.import_sources(get_repository(), feeds, backfill=payload.backfill)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    if summary["job_id"]:
+        backfill.start_job(summary["job_id"])
+    return summary
+
+def _checkpoints() -> backfill.CheckpointStore:
+    try:
+        return backfill.get_checkpoints()
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+@router.get("/backfill/{job_id}")
+def backfill_status(job_id: str):
+    job = _checkpoints().job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Backfill job not found.")
+    return job
+
+@router.post("/backfill/{job_id}/resume", status_code=202)
+def resume_backfill(job_id: str):
+    if _checkpoints().job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Backfill job not found.")
+    started = backfill.start_job(job_id)
+    return {"job_id": job_id, "status": "started" if started else "already running"}
 
 @router.post("/ingest")
 def ingest_source(url: str):
-    sb = get_client()
+    repo = get_repository()
     # 1. Get source_id from URL
-    source_res = (
-        sb.table("sources")
-        .select("id,url,name")
-        .eq("url", url)
-        .limit(1)
-        .execute()
-        .data
-    )
-    if not source_res:
+    source = repo.get_source_by_url(url)
+    if not source:
         raise HTTPException(status_code=404, detail="Source URL not found.")
-    source = source_res[0]
 
-    inserted_count, processed_items = ingest_feed(sb, source)
+    lease_name = coordination.source_lease_name(source["id"])
+    with coordination.try_lease(lease_name) as lease:
+        if lease is None:
+            raise HTTPException(
+                status_code=409, detail="Source is already being ingested."
+            )
+        with tracing.start_trace("ingest", source_id=source["id"]):
+            inserted_count, processed_items = ingest_feed(repo, source)
 
     if not inserted_count:
         return {
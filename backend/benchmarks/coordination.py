@@ -0,0 +1,140 @@
+"""
+Multi-process check for the lease layer in ``app.core.coordination``.
+
+Starts several worker processes against one SQLite lock file. Every worker
+tries to "ingest" every source (holding the source's lease while it works)
+and then to send the same issue. The check then verifies that:
+
+* no two workers ever held the same source lease at the same time;
+* the sources were shared out between the workers;
+* the issue was sent exactly once.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.coordination --processes 4 --sources 20 --work-ms 20
+
+Exits with status 1 if an invariant is violated.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+
+def _log_db(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS holds ("
+        "source_id INTEGER, worker INTEGER, started REAL, ended REAL)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS sends (issue TEXT, worker INTEGER)")
+    return conn
+
+
+def _worker(index: int, lock_db: str, log_db: str, sources: int, rounds: int, work_s: float) -> None:
+    os.environ["COORDINATION_BACKEND"] = "sqlite"
+    os.environ["COORDINATION_DB"] = lock_db
+    from app.core import coordination
+
+    log = _log_db(log_db)
+    rng = random.Random(index)
+    for _ in range(rounds):
+        order = list(range(sources))
+        rng.shuffle(order)
+        for source_id in order:
+            with coordination.try_lease(coordination.source_lease_name(source_id)) as lease:
+                if lease is None:
+                    continue
+                started = time.time()
+                time.sleep(work_s)
+                log.execute(
+                    "INSERT INTO holds VALUES (?, ?, ?, ?)",
+                    (source_id, index, started, time.time()),
+                )
+
+    issue = "check"
+    with coordination.try_lease(coordination.send_lock_name(issue)) as lease:
+        if lease is None:
+            return
+        already = log.execute("SELECT 1 FROM sends WHERE issue = ?", (issue,)).fetchone()
+        if not already:
+            time.sleep(work_s)
+            log.execute("INSERT INTO sends VALUES (?, ?)", (issue, index))
+
+
+def _overlaps(rows: List[tuple]) -> int:
+    by_source: Dict[int, List[tuple]] = {}
+    for source_id, _, started, ended in rows:
+        by_source.setdefault(source_id, []).append((started, ended))
+    overlaps = 0
+    for spans in by_source.values():
+        spans.sort()
+        for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+            if start < prev_end:
+                overlaps += 1
+    return overlaps
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--work-ms", type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="creatorpulse-coord-")
+    lock_db = os.path.join(workdir, "locks.sqlite3")
+    log_db = os.path.join(workdir, "log.sqlite3")
+    _log_db(log_db).close()
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(
+            target=_worker,
+            args=(i, lock_db, log_db, args.sources, args.rounds, args.work_ms / 1000),
+        )
+        for i in range(args.processes)
+    ]
+    start = time.perf_counter()
+    for proc in workers:
+        proc.start()
+    for proc in workers:
+        proc.join()
+    elapsed = time.perf_counter() - start
+
+    log = _log_db(log_db)
+    holds = log.execute("SELECT source_id, worker, started, ended FROM holds").fetchall()
+    sends = log.execute("SELECT worker FROM sends").fetchall()
+    per_worker = Counter(worker for _, worker, _, _ in holds)
+    report = {
+        "processes": args.processes,
+        "sources": args.sources,
+        "rounds": args.rounds,
+        "wall_s": round(elapsed, 3),
+        "holds": len(holds),
+        "holds_per_worker": {str(k): v for k, v in sorted(per_worker.items())},
+        "overlapping_holds": _overlaps(holds),
+        "sends": len(sends),
+        "worker_exit_codes": [proc.exitcode for proc in workers],
+    }
+    report["ok"] = (
+        report["overlapping_holds"] == 0
+        and report["sends"] == 1
+        and all(code == 0 for code in report["worker_exit_codes"])
+    )
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
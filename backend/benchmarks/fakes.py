@@ -0,0 +1,534 @@
+"""
+Offline stand-ins used by the benchmark and load-test harnesses.
+
+* ``FakeSupabase`` keeps the ``sources``/``items``/``feedback``/``history``
+  tables in memory and supports the postgrest builder calls the app uses.
+* ``FeedReplay`` serves recorded RSS/Atom fixtures (optionally scaled up to
+  any number of entries) and recorded article HTML instead of the network.
+* ``FakeGenAI`` / ``FakeOpenAI`` return deterministic summaries after a
+  configurable latency so LLM cost can be dialled in or out.
+* ``FakeYouTube`` answers the YouTube adapter's metadata and transcript
+  lookups from ``fixtures/youtube/videos.json``.
+
+``install()`` patches these into the app modules in-process.
+"""
+
+import copy
+import hashlib
+import io
+import itertools
+import json
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+ET.register_namespace("", ATOM_NS)
+ET.register_namespace("content", "http://purl.org/rss/1.0/modules/content/")
+ET.register_namespace("media", "http://search.yahoo.com/mrss/")
+ET.register_namespace("yt", "http://www.youtube.com/xml/schemas/2015")
+
+
+# --- Supabase -----------------------------------------------------------------
+
+
+class _Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._payload = None
+        self._on_conflict = None
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._offset = 0
+        self._columns = "*"
+        self._negate = False
+
+    # Operations ---------------------------------------------------------------
+    def select(self, columns: str = "*", **_):
+        self._op, self._columns = "select", columns
+        return self
+
+    def insert(self, rows, **_):
+        self._op, self._payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None, **_):
+        self._op, self._payload, self._on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values, **_):
+        self._op, self._payload = "update", values
+        return self
+
+    def delete(self, **_):
+        self._op = "delete"
+        return self
+
+    # Filters ------------------------------------------------------------------
+    def _filter(self, predicate):
+        if self._negate:
+            self._negate = False
+            self._filters.append(lambda row: not predicate(row))
+        else:
+            self._filters.append(predicate)
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def is_(self, column, value):
+        # Only ``null`` is used by the app.
+        return self._filter(lambda row: row.get(column) is None)
+
+    def in_(self, column, values):
+        allowed = set(values)
+        self._filters.append(lambda row: row.get(column) in allowed)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) < value)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) > value)
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def order(self, column, desc: bool = False, **_):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count: int, **_):
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int, **_):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def _matches(self, row) -> bool:
+        return all(f(row) for f in self._filters)
+
+    def _project(self, row) -> Dict:
+        if self._columns.strip() == "*":
+            return dict(row)
+        cols = [c.strip() for c in self._columns.split(",")]
+        return {c: row.get(c) for c in cols}
+
+    def execute(self):
+        return self._db._execute(self)
+
+
+class FakeSupabase:
+    """Thread-safe in-memory replacement for the Supabase client."""
+
+    def __init__(self, query_latency: float = 0.0):
+        self.query_latency = query_latency
+        self._tables: Dict[str, List[Dict]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rows(self, name: str) -> List[Dict]:
+        with self._lock:
+            return [dict(r) for r in self._tables.get(name, [])]
+
+    def _execute(self, q: _Query) -> _Result:
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        with self._lock:
+            table = self._tables.setdefault(q._table, [])
+            if q._op == "select":
+                rows = [r for r in table if q._matches(r)]
+                if q._order:
+                    col, desc = q._order
+                    rows.sort(key=lambda r: (r.get(col) is None, r.get(col) or ""), reverse=desc)
+                if q._offset:
+                    rows = rows[q._offset :]
+                if q._limit is not None:
+                    rows = rows[: q._limit]
+                return _Result([q._project(r) for r in rows])
+            if q._op in ("insert", "upsert"):
+                payload = q._payload if isinstance(q._payload, list) else [q._payload]
+                written = []
+                for row in payload:
+                    row = dict(row)
+                    existing = None
+                    if q._op == "upsert" and q._on_conflict:
+                        key = q._on_conflict
+                        existing = next((r for r in table if r.get(key) == row.get(key)), None)
+                    if existing is not None:
+                        existing.update(row)
+                        written.append(dict(existing))
+                    else:
+                        row.setdefault("id", next(self._ids))
+                        # Supabase tables default created_at to now().
+                        row.setdefault(
+                            "created_at", datetime.now(timezone.utc).isoformat()
+                        )
+                        table.append(row)
+                        written.append(dict(row))
+                return _Result(written)
+            if q._op == "update":
+                written = []
+                for r in table:
+                    if q._matches(r):
+                        r.update(q._payload)
+                        written.append(dict(r))
+                return _Result(written)
+            if q._op == "delete":
+                kept = [r for r in table if not q._matches(r)]
+                removed = len(table) - len(kept)
+                self._tables[q._table] = kept
+                return _Result([], count=removed)
+        raise ValueError(f"Unsupported operation {q._op}")
+
+
+# --- Feeds and articles -------------------------------------------------------
+
+
+def _vary_link(link: str, variant: str, i: int) -> str:
+    """A unique copy of ``link``; redirect links (``?url=``) vary their target."""
+    parsed = urlparse(link)
+    query = parse_qs(parsed.query)
+    if "url" in query:
+        query["url"] = [_vary_link(query["url"][0], variant, i)]
+        return parsed._replace(query=urlencode(query, doseq=True)).geturl()
+    return f"{link}{'&' if parsed.query else '?'}v={variant}&n={i}"
+
+
+def _scale_rss(root: ET.Element, entries: int, variant: str) -> None:
+    channel = root.find("channel")
+    templates = channel.findall("item")
+    for item in templates:
+        channel.remove(item)
+    for i in range(entries):
+        item = copy.deepcopy(templates[i % len(templates)])
+        link = item.find("link")
+        link.text = _vary_link(link.text, variant, i)
+        guid = item.find("guid")
+        if guid is not None:
+            guid.text = link.text
+        channel.append(item)
+
+
+def _scale_atom(root: ET.Element, entries: int, variant: str) -> None:
+    tag = f"{{{ATOM_NS}}}entry"
+    templates = root.findall(tag)
+    for entry in templates:
+        root.remove(entry)
+    for i in range(entries):
+        entry = copy.deepcopy(templates[i % len(templates)])
+        link = entry.find(f"{{{ATOM_NS}}}link")
+        link.set("href", _vary_link(link.get("href"), variant, i))
+        ident = entry.find(f"{{{ATOM_NS}}}id")
+        if ident is not None:
+            ident.text = link.get("href")
+        root.append(entry)
+
+
+def scaled_feed(fixture: str, entries: Optional[int] = None, variant: str = "0") -> bytes:
+    """Return a recorded feed, replicated up to ``entries`` unique entries."""
+    raw = (FIXTURES / "feeds" / fixture).read_bytes()
+    if entries is None:
+        return raw
+    root = ET.fromstring(raw)
+    if root.tag == f"{{{ATOM_NS}}}feed":
+        _scale_atom(root, entries, variant)
+    else:
+        _scale_rss(root, entries, variant)
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+def article_fixtures() -> List[Path]:
+    return sorted((FIXTURES / "articles").glob("*.html"))
+
+
+class FeedReplay:
+    """Maps feed and article URLs to recorded fixtures on disk."""
+
+    def __init__(self, fetch_latency: float = 0.0):
+        self.fetch_latency = fetch_latency
+        self._feeds: Dict[str, bytes] = {}
+        self._articles = [p.read_text(encoding="utf-8") for p in article_fixtures()]
+
+    def register_feed(self, url: str, fixture: str, entries: Optional[int] = None) -> str:
+        variant = hashlib.sha1(url.encode()).hexdigest()[:8]
+        self._feeds[url] = scaled_feed(fixture, entries, variant)
+        return url
+
+    def feed_bytes(self, url: str) -> bytes:
+        return self._feeds[url]
+
+    def article_html(self, url: str) -> str:
+        # Stable URL -> fixture mapping, so runs are reproducible.
+        return self._articles[zlib.crc32(url.encode()) % len(self._articles)]
+
+    # ``requests``-compatible surface used by article_fetcher / feed_stream.
+    def get(self, url, timeout=None, headers=None, stream=False, **_):
+        if url.endswith("/robots.txt"):
+            return SimpleNamespace(status_code=404, text="", raise_for_status=lambda: None)
+        if self.fetch_latency:
+            time.sleep(self.fetch_latency)
+        if url in self._feeds:
+            content = self._feeds[url]
+            content_type = "application/xml"
+        else:
+            content = self.article_html(url).encode("utf-8")
+            content_type = "text/html; charset=utf-8"
+        return SimpleNamespace(
+            status_code=200,
+            text=content.decode("utf-8"),
+            content=content,
+            raw=io.BytesIO(content),
+            headers={"Content-Type": content_type},
+            raise_for_status=lambda: None,
+            close=lambda: None,
+        )
+
+
+class FakeFeedparser:
+    """``feedparser`` shim that parses replayed bytes instead of fetching."""
+
+    def __init__(self, replay: FeedReplay):
+        import feedparser
+
+        self._feedparser = feedparser
+        self._replay = replay
+
+    def parse(self, url, *args, **kwargs):
+        return self._feedparser.parse(self._replay.feed_bytes(url))
+
+
+# --- LLM providers ------------------------------------------------------------
+
+
+def _fake_story(prompt: str, structured: bool = False) -> str:
+    body = prompt.rsplit("\n\n", 1)[-1]
+    digest = hashlib.sha1(body.encode("utf-8")).hexdigest()
+    words = body.split()
+    why = "This shifts how creators plan their next quarter."
+    if len(words) < 12:
+        # Too little context: mimic the unhelpful replies real models give.
+        if structured:
+            return json.dumps(
+                {"headline": "Update", "summary": "Read more.", "why_it_matters": ""}
+            )
+        return "Headline: Update\nSummary: Read more."
+    headline = " ".join(w.strip(".,;:").title() for w in words[:8])
+    gist = " ".join(words[:30])
+    if not structured:
+        return (
+            f"Headline: {headline}\n"
+            f"Summary: {gist} (ref {digest[:6]}). "
+            f"Why it matters: {why}"
+        )
+    # Some replies carry the small defects real models produce, so the
+    # local repairs are exercised too.
+    story = {
+        "headline": headline,
+        "summary": f"{gist} (ref {digest[:6]}).",
+        "why_it_matters": why,
+    }
+    if digest[0] in "01":
+        story["summary"] += f" Why it matters: {why}"
+        story["why_it_matters"] = ""
+    reply = json.dumps(story)
+    if digest[0] in "23":
+        reply = f"```json\n{reply}\n```"
+    return reply
+
+
+def _structured(kwargs: Dict) -> bool:
+    config = kwargs.get("generation_config") or {}
+    response_format = kwargs.get("response_format") or {}
+    return (
+        config.get("response_mime_type") == "application/json"
+        or response_format.get("type") == "json_object"
+    )
+
+
+def _stream_chunks(text: str, latency: float) -> Iterator[str]:
+    """
+    ``text`` in word-sized chunks over ``latency`` seconds, the first after a
+    quarter of it, roughly how streamed completions arrive.
+    """
+    words = text.split(" ")
+    chunks = [w + " " for w in words[:-1]] + words[-1:]
+    if latency:
+        time.sleep(latency * 0.25)
+    for chunk in chunks:
+        yield chunk
+        if latency:
+            time.sleep(latency * 0.75 / len(chunks))
+
+
+class _FakeGeminiModel:
+    def __init__(self, provider: "FakeGenAI", name: str):
+        self._provider = provider
+        self.model_name = name
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self._provider.calls += 1
+        text = _fake_story(prompt, _structured(kwargs))
+        if stream:
+            return (
+                SimpleNamespace(text=chunk)
+                for chunk in _stream_chunks(text, self._provider.latency)
+            )
+        if self._provider.latency:
+            time.sleep(self._provider.latency)
+        return SimpleNamespace(text=text)
+
+
+class FakeGenAI:
+    """Stands in for the ``google.generativeai`` module."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def configure(self, **_):
+        pass
+
+    def GenerativeModel(self, name: str, **_):
+        return _FakeGeminiModel(self, name)
+
+
+class FakeOpenAI:
+    """Stands in for an ``openai.OpenAI`` client instance."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        self.calls += 1
+        content = _fake_story(messages[-1]["content"], _structured(kwargs))
+        if stream:
+            return (
+                SimpleNamespace(
+                    choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))]
+                )
+                for chunk in _stream_chunks(content, self.latency)
+            )
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+        )
+
+
+# --- YouTube ------------------------------------------------------------------
+
+
+class FakeYouTube:
+    """Metadata and transcript lookups for the YouTube adapter, from fixtures."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.metadata_calls = 0
+        self.transcript_calls = 0
+        self._videos = json.loads(
+            (FIXTURES / "youtube" / "videos.json").read_text(encoding="utf-8")
+        )
+
+    def metadata(self, ids: List[str]) -> Dict[str, Dict]:
+        self.metadata_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {vid: self._videos[vid]["snippet"] for vid in ids if vid in self._videos}
+
+    def transcript(self, vid: str) -> Optional[str]:
+        self.transcript_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        segments = (self._videos.get(vid) or {}).get("transcript")
+        if not segments:
+            return None
+        return " ".join(segment["text"] for segment in segments)
+
+
+# --- Wiring -------------------------------------------------------------------
+
+
+def install(
+    llm_latency: float = 0.0,
+    fetch_latency: float = 0.0,
+    query_latency: float = 0.0,
+) -> SimpleNamespace:
+    """Patch the app modules to use offline fakes; returns the fakes."""
+    from app.core import (
+        article_fetcher,
+        feed_stream,
+        llm_utils,
+        semantic_index,
+        source_adapters,
+        storage,
+    )
+
+    db = FakeSupabase(query_latency=query_latency)
+    storage.set_repository(storage.SupabaseRepository(db))
+    replay = FeedReplay(fetch_latency=fetch_latency)
+    gemini = FakeGenAI(latency=llm_latency)
+    openai_client = FakeOpenAI(latency=llm_latency)
+    youtube = FakeYouTube(latency=fetch_latency)
+
+    article_fetcher.requests = replay
+    # Replayed fixtures are local: no politeness delay and no disk cache, so
+    # every run measures the full fetch + extract path.
+    article_fetcher.CRAWL_DELAY_S = 0.0
+    article_fetcher.set_cache(None)
+    # A fresh semantic index per run, so results do not depend on earlier runs.
+    semantic_index.set_index(
+        semantic_index.SemanticIndex(
+            tempfile.mkdtemp(prefix="creatorpulse-index-"),
+            semantic_index.HashingEmbedder(),
+            "hashing",
+        )
+    )
+    feed_stream.requests = replay
+    feed_stream.feedparser = FakeFeedparser(replay)
+    source_adapters.register_adapter(
+        source_adapters.YouTubeAdapter(metadata=youtube.metadata, transcript=youtube.transcript)
+    )
+    llm_utils.genai = gemini
+    llm_utils.GEMINI_API_KEY = "offline"
+    llm_utils.openai_client = openai_client
+    # Fake providers have no quota; leave LLM cost to ``llm_latency``.
+    for bucket in llm_utils._LIMITERS.values():
+        bucket.rate = 0
+
+    return SimpleNamespace(
+        db=db, replay=replay, gemini=gemini, openai=openai_client, youtube=youtube
+    )
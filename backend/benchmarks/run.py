@@ -0,0 +1,276 @@
+"""
+Offline benchmark suite for ingestion and curation.
+
+Replays recorded feeds and article HTML from ``benchmarks/fixtures``, stubs
+Gemini/OpenAI with deterministic fakes and keeps Supabase in memory, so it
+runs without network access or credentials. ``--storage sqlite`` runs the
+same workloads against the embedded SQLite store instead. Results are
+written as JSON so they can be diffed between commits.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --feeds 1,5,20 --entries 10,100 --llm-latency-ms 50
+    python -m benchmarks.run --only build_newsletter --storage sqlite
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from benchmarks import fakes
+
+# Recorded feeds per source type (see app/core/source_adapters.py).
+FEED_FIXTURES = {
+    "rss": ["creator-economy.xml", "ai-research.atom"],
+    "youtube": ["youtube-channel.xml"],
+    "alert": ["google-alert.atom"],
+}
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def _timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _new_repository(env, storage: str):
+    """An empty store of the requested kind."""
+    from app.core.storage import SQLiteRepository, SupabaseRepository
+
+    if storage == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(prefix="creatorpulse-bench-"), "store.sqlite3")
+        return SQLiteRepository(path)
+    return SupabaseRepository(fakes.FakeSupabase(query_latency=env.db.query_latency))
+
+
+def bench_ingest(
+    env, feed_counts: List[int], entry_counts: List[int], storage: str, source_type: str = "rss"
+) -> List[Dict]:
+    from app.core.ingestion import ingest_feed
+
+    fixtures = FEED_FIXTURES[source_type]
+    results = []
+    for entries in entry_counts:
+        for feeds in feed_counts:
+            repo = _new_repository(env, storage)
+            sources = []
+            for i in range(feeds):
+                url = f"https://bench.local/feeds/{entries}/{feeds}/{i}"
+                env.replay.register_feed(url, fixtures[i % len(fixtures)], entries)
+                sources.append(repo.add_source(f"feed-{i}", url, source_type))
+
+            llm_before = env.gemini.calls + env.openai.calls
+            per_source = []
+            inserted = 0
+            start = time.perf_counter()
+            for source in sources:
+                elapsed, (count, _) = _timed(ingest_feed, repo, source)
+                per_source.append(elapsed)
+                inserted += count
+            wall = time.perf_counter() - start
+
+            results.append(
+                {
+                    "source_type": source_type,
+                    "feeds": feeds,
+                    "entries_per_feed": entries,
+                    "items_inserted": inserted,
+                    "wall_s": round(wall, 4),
+                    "items_per_s": round(inserted / wall, 2) if wall else None,
+                    "llm_calls": env.gemini.calls + env.openai.calls - llm_before,
+                    "per_source": _latency_stats(per_source),
+                }
+            )
+    return results
+
+
+def bench_strip_markup(sizes_kb: List[int], repeat: int) -> List[Dict]:
+    from app.core.content_utils import strip_markup
+
+    template = "".join(p.read_text(encoding="utf-8") for p in fakes.article_fixtures())
+    results = []
+    for size_kb in sizes_kb:
+        target = size_kb * 1024
+        html = (template * (target // len(template) + 1))[:target]
+        samples = [_timed(strip_markup, html)[0] for _ in range(repeat)]
+        mean = statistics.fmean(samples)
+        results.append(
+            {
+                "size_kb": size_kb,
+                "mb_per_s": round((target / (1024 * 1024)) / mean, 3) if mean else None,
+                **_latency_stats(samples),
+            }
+        )
+    return results
+
+
+def _seed_items(repo, count: int, stale_every: int) -> None:
+    source = repo.add_source("seed", "https://bench.local/seed", "rss")
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        informative = stale_every == 0 or i % stale_every
+        rows.append(
+            {
+                "source_id": source["id"],
+                "title": f"Seeded Story {i}",
+                "url": f"https://bench.local/items/{i}",
+                "content": "Creators are adapting to new platform payouts. " * 20,
+                "summary": (
+                    f"Seeded story {i} covers platform payout changes for creators this week in detail. "
+                    "Why it matters: Revenue planning depends on it."
+                    if informative
+                    else "Comments"
+                ),
+                "published": (base + timedelta(minutes=i)).isoformat(),
+            }
+        )
+    repo.upsert_items(rows)
+
+
+def bench_build_newsletter(env, item_counts: List[int], repeat: int, storage: str) -> List[Dict]:
+    from app.routers.newsletter import _build_newsletter
+
+    results = []
+    for count in item_counts:
+        repo = _new_repository(env, storage)
+        # Every third seeded item has an uninformative summary, forcing the
+        # re-summarisation path during curation.
+        _seed_items(repo, count, stale_every=3)
+        llm_before = env.gemini.calls + env.openai.calls
+        samples = [_timed(_build_newsletter, repo)[0] for _ in range(repeat)]
+        results.append(
+            {
+                "items_in_store": count,
+                "llm_calls_per_build": round((env.gemini.calls + env.openai.calls - llm_before) / repeat, 2),
+                **_latency_stats(samples),
+            }
+        )
+    return results
+
+
+def bench_render(item_counts: List[int], repeat: int) -> List[Dict]:
+    from app.core.llm_utils import render_newsletter
+
+    results = []
+    for count in item_counts:
+        items = [
+            {
+                "title": f"Story {i} & <Friends>",
+                "url": f"https://bench.local/items/{i}?a=1&b=2",
+                "summary": "A short summary of the story.\nWhy it matters: it does.",
+            }
+            for i in range(count)
+        ]
+        trends = [it["title"] for it in items[:3]]
+        samples = [_timed(render_newsletter, "Intro text", items, trends)[0] for _ in range(repeat)]
+        results.append({"items": count, **_latency_stats(samples)})
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--feeds", type=_int_list, default=[1, 5, 10], help="Feed counts, comma separated")
+    parser.add_argument("--entries", type=_int_list, default=[10, 50], help="Entries per feed, comma separated")
+    parser.add_argument("--markup-kb", type=_int_list, default=[1, 10, 100, 1000], help="HTML sizes for strip_markup")
+    parser.add_argument("--store-items", type=_int_list, default=[100, 1000, 10000], help="Item counts for _build_newsletter")
+    parser.add_argument("--render-items", type=_int_list, default=[10, 50, 200], help="Item counts for render_newsletter")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions for micro benchmarks")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Added latency per fake LLM call")
+    parser.add_argument("--fetch-latency-ms", type=float, default=0.0, help="Added latency per fake HTTP fetch")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Added latency per fake Supabase query")
+    parser.add_argument("--storage", choices=["supabase", "sqlite"], default="supabase", help="Store behind the repository (supabase = in-memory fake)")
+    parser.add_argument("--source-type", choices=sorted(FEED_FIXTURES), default="rss", help="Source type (and fixtures) for the ingest benchmark")
+    parser.add_argument("--only", choices=["ingest", "strip_markup", "build_newsletter", "render"], action="append")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+    env = fakes.install(
+        llm_latency=args.llm_latency_ms / 1000,
+        fetch_latency=args.fetch_latency_ms / 1000,
+        query_latency=args.db_latency_ms / 1000,
+    )
+
+    selected = set(args.only or ["ingest", "strip_markup", "build_newsletter", "render"])
+    benchmarks: Dict[str, List[Dict]] = {}
+    if "ingest" in selected:
+        benchmarks["ingest_feed"] = bench_ingest(
+            env, args.feeds, args.entries, args.storage, args.source_type
+        )
+    if "strip_markup" in selected:
+        benchmarks["strip_markup"] = bench_strip_markup(args.markup_kb, args.repeat)
+    if "build_newsletter" in selected:
+        benchmarks["build_newsletter"] = bench_build_newsletter(env, args.store_items, args.repeat, args.storage)
+    if "render" in selected:
+        benchmarks["render_newsletter"] = bench_render(args.render_items, args.repeat)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            "llm_latency_ms": args.llm_latency_ms,
+            "fetch_latency_ms": args.fetch_latency_ms,
+            "db_latency_ms": args.db_latency_ms,
+            "storage": args.storage,
+            "repeat": args.repeat,
+        },
+        "benchmarks": benchmarks,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Startup profile: import cost of ``app.main`` and time until ``/health``.
+
+Runs each measurement in a fresh interpreter so nothing is already cached
+in ``sys.modules``:
+
+* ``python -X importtime -c "import app.main"``: the slowest packages and
+  app modules, by cumulative time, and the total;
+* uvicorn boot: wall time from spawning ``uvicorn app.main:app`` until
+  ``/health`` first answers ``200``.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.startup --runs 5 --top 15 --budget-ms 1000
+
+Exits with status 1 if the median boot time exceeds ``--budget-ms``.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> Dict[str, str]:
+    # Keep the scheduler and its first poll out of the measurement.
+    return dict(os.environ, SCHEDULER_ENABLED="false", LOG_LEVEL="WARNING")
+
+
+def import_profile(top: int) -> Dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: List[Dict] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        # "import time:  self_us | cumulative_us | <indent>module"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": depth,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+    total = next(
+        (m["cumulative_ms"] for m in modules if m["module"] == "app.main"), 0.0
+    )
+    # Packages and app modules only; submodules are counted in their parent.
+    slowest = sorted(
+        (
+            m
+            for m in modules
+            if "." not in m["module"] or m["module"].startswith("app.")
+        ),
+        key=lambda m: m["cumulative_ms"],
+        reverse=True,
+    )
+    return {
+        "total_ms": round(total, 1),
+        "modules": len(modules),
+        "slowest": [
+            {k: (round(v, 1) if isinstance(v, float) else v) for k, v in m.items()}
+            for m in slowest[:top]
+        ],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def boot_to_health(timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn to the first ``200`` from ``/health``."""
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=_env(),
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"/health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3, help="Boot measurements")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    boots = [boot_to_health() * 1000 for _ in range(args.runs)]
+    report = {
+        "python": sys.version.split()[0],
+        "imports": import_profile(args.top),
+        "boot_to_health_ms": {
+            "runs": [round(b, 1) for b in boots],
+            "median": round(statistics.median(boots), 1),
+            "budget": args.budget_ms,
+        },
+    }
+    report["ok"] = report["boot_to_health_ms"]["median"] <= args.budget_ms
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(payload + "\n")
+    else:
+        print(payload)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
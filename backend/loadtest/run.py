@@ -0,0 +1,265 @@
+"""
+Open-loop load generator with per-route latency SLO reports.
+
+Starts ``loadtest.stub_app:app`` under uvicorn (offline backends, see
+``loadtest/stub_app.py``) unless ``--target`` points at a running server,
+replays a scenario from ``loadtest/scenarios`` and reports p50/p95/p99,
+error rate and achieved throughput per route. Latency is measured from each
+request's *scheduled* start, so server-side queueing is not hidden when the
+client falls behind.
+
+Usage (from ``backend/``)::
+
+    python -m loadtest.run scenarios/dashboard-mix.json --workers 1
+    python -m loadtest.run scenarios/pipeline-contention.json --workers 4 --rate-scale 2 --output report.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger("loadtest")
+
+HERE = Path(__file__).resolve().parent
+BACKEND_DIR = HERE.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int, port: int) -> subprocess.Popen:
+    cmd = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "loadtest.stub_app:app",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--log-level",
+        "warning",
+    ]
+    env = dict(os.environ, LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"))
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+
+def _wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout}s")
+
+
+def _schedule(scenario: Dict, rate_scale: float) -> List[tuple]:
+    """Precompute (offset_s, route) arrivals for the whole run."""
+    rng = random.Random(scenario.get("seed", 0))
+    total = scenario.get("warmup_s", 0) + scenario["duration_s"]
+    poisson = scenario.get("arrival", "poisson") == "poisson"
+    arrivals = []
+    for route in scenario["routes"]:
+        rate = route["rate"] * rate_scale
+        if rate <= 0:
+            continue
+        t = rng.expovariate(rate) if poisson else 1.0 / rate
+        while t < total:
+            arrivals.append((t, route))
+            t += rng.expovariate(rate) if poisson else 1.0 / rate
+    arrivals.sort(key=lambda pair: pair[0])
+    return arrivals
+
+
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index] * 1000, 2)
+
+
+class _Recorder:
+    def __init__(self, warmup_s: float):
+        self.warmup_s = warmup_s
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[tuple]] = {}
+
+    def record(self, route: str, offset: float, latency: float, ok: bool, status) -> None:
+        if offset < self.warmup_s:
+            return
+        with self._lock:
+            self.samples.setdefault(route, []).append((latency, ok, status))
+
+
+def _fire(session_local, base_url: str, route: Dict, scheduled: float, offset: float, recorder: _Recorder, timeout: float):
+    session = getattr(session_local, "session", None)
+    if session is None:
+        session = session_local.session = requests.Session()
+    status = None
+    try:
+        resp = session.request(
+            route.get("method", "GET"),
+            base_url + route["path"],
+            json=route.get("json"),
+            params=route.get("params"),
+            timeout=timeout,
+        )
+        status = resp.status_code
+        ok = status < 500 and status not in route.get("error_statuses", [])
+    except requests.RequestException as exc:
+        status = type(exc).__name__
+        ok = False
+    recorder.record(route["name"], offset, time.perf_counter() - scheduled, ok, status)
+
+
+def run_scenario(scenario: Dict, base_url: str, rate_scale: float, concurrency: int, timeout: float) -> Dict:
+    arrivals = _schedule(scenario, rate_scale)
+    recorder = _Recorder(scenario.get("warmup_s", 0))
+    session_local = threading.local()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset, route in arrivals:
+            scheduled = start + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_fire, session_local, base_url, route, scheduled, offset, recorder, timeout)
+    elapsed = time.perf_counter() - start
+
+    measured_s = max(elapsed - scenario.get("warmup_s", 0), 1e-9)
+    routes = {}
+    all_pass = True
+    for route in scenario["routes"]:
+        samples = recorder.samples.get(route["name"], [])
+        latencies = [s[0] for s in samples]
+        errors = [s for s in samples if not s[1]]
+        statuses: Dict[str, int] = {}
+        for _, _, status in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        error_rate = len(errors) / len(samples) if samples else 0.0
+        summary = {
+            "requests": len(samples),
+            "target_rps": route["rate"] * rate_scale,
+            "achieved_rps": round(len(samples) / measured_s, 3),
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+            "error_rate": round(error_rate, 4),
+            "statuses": statuses,
+        }
+        slo = route.get("slo")
+        if slo:
+            checks = {
+                "p95_ms": summary["p95_ms"] is not None and summary["p95_ms"] <= slo.get("p95_ms", float("inf")),
+                "p99_ms": summary["p99_ms"] is not None and summary["p99_ms"] <= slo.get("p99_ms", float("inf")),
+                "error_rate": error_rate <= slo.get("max_error_rate", 1.0),
+            }
+            summary["slo"] = {"targets": slo, "checks": checks, "pass": all(checks.values())}
+            all_pass = all_pass and summary["slo"]["pass"]
+        routes[route["name"]] = summary
+
+    return {"elapsed_s": round(elapsed, 2), "slo_pass": all_pass, "routes": routes}
+
+
+def _print_table(report: Dict) -> None:
+    header = f"{'route':<16}{'reqs':>7}{'rps':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'err%':>8}  slo"
+    print(header, file=sys.stderr)
+    print("-" * len(header), file=sys.stderr)
+    for name, r in report["result"]["routes"].items():
+        slo = r.get("slo")
+        verdict = "-" if slo is None else ("PASS" if slo["pass"] else "FAIL")
+        print(
+            f"{name:<16}{r['requests']:>7}{r['achieved_rps']:>8.2f}"
+            f"{r['p50_ms'] or 0:>10.1f}{r['p95_ms'] or 0:>10.1f}{r['p99_ms'] or 0:>10.1f}"
+            f"{r['error_rate'] * 100:>8.2f}  {verdict}",
+            file=sys.stderr,
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scenario", help="Scenario JSON (absolute, or relative to loadtest/)")
+    parser.add_argument("--target", help="Base URL of an already running server; skips starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the stub server")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="Multiply every route's rate")
+    parser.add_argument("--duration", type=float, help="Override the scenario duration (seconds)")
+    parser.add_argument("--concurrency", type=int, default=256, help="Max in-flight client requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+
+    path = Path(args.scenario)
+    if not path.is_absolute() and not path.exists():
+        path = HERE / path
+    scenario = json.loads(path.read_text(encoding="utf-8"))
+    if args.duration:
+        scenario["duration_s"] = args.duration
+
+    server = None
+    base_url = args.target
+    if not base_url:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = _start_server(args.workers, port)
+    try:
+        _wait_ready(base_url)
+        result = run_scenario(scenario, base_url.rstrip("/"), args.rate_scale, args.concurrency, args.timeout)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=15)
+
+    report = {
+        "scenario": scenario.get("name", path.stem),
+        "target": args.target or "loadtest.stub_app",
+        "workers": None if args.target else args.workers,
+        "rate_scale": args.rate_scale,
+        "duration_s": scenario["duration_s"],
+        "upstream_latency_ms": {
+            key: os.getenv(key)
+            for key in (
+                "LOADTEST_LLM_LATENCY_MS",
+                "LOADTEST_FETCH_LATENCY_MS",
+                "LOADTEST_DB_LATENCY_MS",
+                "LOADTEST_EMAIL_LATENCY_MS",
+            )
+            if os.getenv(key)
+        },
+        "result": result,
+    }
+    _print_table(report)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    return 0 if result["slo_pass"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+``app.main:app`` wired to offline backends for load testing.
+
+Run it like the real app (``uvicorn loadtest.stub_app:app --workers 4``);
+every worker process builds its own in-memory Supabase seeded with the same
+sources and items. Upstream latencies are set through environment
+variables so runs are reproducible:
+
+| Variable | Default |
+| --- | --- |
+| ``LOADTEST_LLM_LATENCY_MS`` | 400 |
+| ``LOADTEST_FETCH_LATENCY_MS`` | 150 |
+| ``LOADTEST_DB_LATENCY_MS`` | 20 |
+| ``LOADTEST_EMAIL_LATENCY_MS`` | 300 |
+| ``LOADTEST_FEEDS`` | 5 |
+| ``LOADTEST_ENTRIES`` | 10 |
+"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import fakes
+
+FEED_FIXTURES = ["creator-economy.xml", "ai-research.atom"]
+
+
+def _ms_env(name: str, default: float) -> float:
+    return float(os.getenv(name, default)) / 1000
+
+
+def _seed(env, feeds: int, entries: int) -> None:
+    db = env.db
+    for i in range(feeds):
+        url = env.replay.register_feed(
+            f"https://loadtest.local/feeds/{i}", FEED_FIXTURES[i % len(FEED_FIXTURES)], entries
+        )
+        db.table("sources").insert({"name": f"Load feed {i}", "url": url, "type": "rss"}).execute()
+
+    base = datetime.now(timezone.utc) - timedelta(days=1)
+    rows = [
+        {
+            "source_id": 1 + (i % feeds),
+            "title": f"Seeded Story {i}",
+            "url": f"https://loadtest.local/items/{i}",
+            "content": "Creators are adapting to new platform payouts. " * 20,
+            "summary": (
+                f"Seeded story {i} covers platform payout changes for creators this week. "
+                "Why it matters: Revenue planning depends on it."
+            ),
+            "published": (base + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(50)
+    ]
+    db.table("items").insert(rows).execute()
+
+
+def _install() -> None:
+    from app.core import supabase_client
+    from app.routers import newsletter
+
+    env = fakes.install(
+        llm_latency=_ms_env("LOADTEST_LLM_LATENCY_MS", 400),
+        fetch_latency=_ms_env("LOADTEST_FETCH_LATENCY_MS", 150),
+        query_latency=_ms_env("LOADTEST_DB_LATENCY_MS", 20),
+    )
+    _seed(env, int(os.getenv("LOADTEST_FEEDS", "5")), int(os.getenv("LOADTEST_ENTRIES", "10")))
+
+    email_latency = _ms_env("LOADTEST_EMAIL_LATENCY_MS", 300)
+
+    def fake_send_email(subject, html_body, text_body=None, recipient=None):
+        time.sleep(email_latency)
+
+    supabase_client.set_client(env.db)
+    newsletter.send_email = fake_send_email
+
+
+_install()
+
+from app.main import app  # noqa: E402  (import after the stubs are in place)
+
+__all__ = ["app"]
@@ -0,0 +1,84 @@
+import pytest
+
+from app.core.llm_utils import _StoryDeltas, parse_story
+
+
+@pytest.mark.parametrize(
+    "raw, headline, summary, repairs",
+    [
+        (
+            '{"headline": "Clean Reply", "summary": "All fine.", "why_it_matters": "It is."}',
+            "Clean Reply",
+            "All fine.\nWhy it matters: It is.",
+            [],
+        ),
+        (
+            '```json\n{"headline": "Fenced", "summary": "In a fence."}\n```',
+            "Fenced",
+            "In a fence.",
+            ["code_fence"],
+        ),
+        (
+            '{"headline": "Comma", "summary": "Trailing comma.",}',
+            "Comma",
+            "Trailing comma.",
+            ["trailing_comma"],
+        ),
+        (
+            '{"headline": "Cut Off", "summary": "Stopped mid',
+            "Cut Off",
+            "Stopped mid",
+            ["truncated"],
+        ),
+        (
+            '{"headline": "Cut Off", "summary": "Stopped in an escape\\',
+            "Cut Off",
+            "Stopped in an escape",
+            ["truncated"],
+        ),
+        (
+            '{"headline": "Cut Off", "summary": "Stopped in \\u00',
+            "Cut Off",
+            "Stopped in",
+            ["truncated"],
+        ),
+        (
+            '{"headline": "Inline", "summary": "Body. Why it matters: Inline reason."}',
+            "Inline",
+            "Body.\nWhy it matters: Inline reason.",
+            ["why_in_summary"],
+        ),
+        (
+            "Headline: Old Format\nSummary: Plain lines.",
+            "Old Format",
+            "Plain lines.",
+            ["not_json"],
+        ),
+    ],
+)
+def test_parse_story_repairs(raw, headline, summary, repairs):
+    story, applied = parse_story(raw, "Fallback")
+    assert story == {"headline": headline, "summary": summary}
+    assert applied == repairs
+
+
+def test_parse_story_missing_headline_uses_fallback():
+    story, applied = parse_story('{"summary": "Only a summary."}', "Fallback Title")
+    assert story["headline"] == "Fallback Title"
+    assert applied == ["missing_headline"]
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        '{"headline": "H", "summary": "Sum \\"text\\".", "why_it_matters": "Because X."}',
+        '{"headline": "H", "why_it_matters": "Because X.", "summary": "Sum \\"text\\"."}',
+    ],
+)
+@pytest.mark.parametrize("size", [1, 3, 7])
+def test_story_deltas_stream_plain_text_in_order(raw, size):
+    pieces = []
+    deltas = _StoryDeltas(pieces.append)
+    for start in range(0, len(raw), size):
+        deltas(raw[start : start + size])
+    assert "".join(pieces) == 'Sum "text". Why it matters: Because X.'
@@ -0,0 +1,60 @@
+from app.core.storage import SQLiteRepository
+
+
+def _repo(tmp_path):
+    repo = SQLiteRepository(str(tmp_path / "store.sqlite3"))
+    source = repo.add_source("Example", "https://example.com/feed.xml", "rss")
+    return repo, source["id"]
+
+
+def test_sqlite_repository_round_trip(tmp_path):
+    repo, source_id = _repo(tmp_path)
+    written = repo.upsert_items(
+        [
+            {
+                "source_id": source_id,
+                "url": "https://example.com/a",
+                "title": "Creator payouts rise",
+                "summary": "Platforms raise revenue share for video creators.",
+                "content": "Full body of story A.",
+                "published": "2026-10-01T00:00:00+00:00",
+            },
+            {
+                "source_id": source_id,
+                "url": "https://example.com/b",
+                "title": "Newsletter tools consolidate",
+                "summary": "Two email platforms merge.",
+                "content": "Full body of story B.",
+                "published": "2026-10-02T00:00:00+00:00",
+            },
+        ]
+    )
+    ids = {row["url"]: row["id"] for row in written}
+    assert len(ids) == 2
+
+    # Upserting the same URL updates the row in place.
+    again = repo.upsert_items(
+        [{"source_id": source_id, "url": "https://example.com/a", "title": "Creator payouts jump"}]
+    )
+    assert again[0]["id"] == ids["https://example.com/a"]
+    assert repo.item_urls(source_id) == set(ids)
+
+    repo.update_items([{"id": ids["https://example.com/b"], "summary": "Two email tools merge."}])
+    rows = {row["id"]: row for row in repo.get_items(ids.values())}
+    assert rows[ids["https://example.com/a"]]["title"] == "Creator payouts jump"
+    assert rows[ids["https://example.com/b"]]["summary"] == "Two email tools merge."
+
+    # Every term must match, in any order, across title and summary.
+    assert repo.search_items("payouts podcast", 10) == []
+    assert [r["id"] for r in repo.search_items("video payouts", 10)] == [
+        ids["https://example.com/a"]
+    ]
+    assert [r["id"] for r in repo.search_items("merge email", 10)] == [
+        ids["https://example.com/b"]
+    ]
+    assert repo.search_items("payouts merge", 10) == []
+
+    repo.clear_content([ids["https://example.com/a"]])
+    remaining = repo.items_with_content(0, 10)
+    assert [row["id"] for row in remaining] == [ids["https://example.com/b"]]
+    assert repo.get_items([ids["https://example.com/a"]], "id,content")[0]["content"] is None
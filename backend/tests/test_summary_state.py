@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core import summary_state
+from app.core.summary_state import (
+    STATUS_FAILED,
+    STATUS_OK,
+    backoff_seconds,
+    content_hash,
+    needs_summary,
+    record_attempt,
+)
+from app.routers import newsletter
+
+NOW = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+BODY = "A creator platform raised its revenue share for long videos."
+
+
+def _summarised(version="v1", body=BODY, ok=True):
+    return record_attempt({}, ok, version, content_hash(body), now=NOW)
+
+
+def test_unchanged_ok_item_is_not_resummarised():
+    state = _summarised()
+    assert not needs_summary(state, "v1", content_hash(BODY), now=NOW)
+
+
+def test_whitespace_changes_keep_the_content_hash():
+    assert content_hash(BODY) == content_hash(f"  {BODY.replace(' ', '  ')}\n")
+
+
+@pytest.mark.parametrize(
+    "version, body",
+    [("v2", BODY), ("v1", BODY + " Update: the change ships next week.")],
+)
+def test_new_version_or_content_resummarises(version, body):
+    state = _summarised()
+    assert needs_summary(state, version, content_hash(body), now=NOW)
+
+
+def test_rows_without_bookkeeping_need_a_summary():
+    assert needs_summary({"summary": "Old summary."}, "v1", content_hash(BODY), now=NOW)
+
+
+def test_failed_item_waits_for_its_backoff():
+    state = _summarised(ok=False)
+    digest = content_hash(BODY)
+    retry_at = NOW + timedelta(seconds=backoff_seconds(1))
+    assert state["summary_status"] == STATUS_FAILED
+    assert not needs_summary(state, "v1", digest, now=retry_at - timedelta(seconds=1))
+    assert needs_summary(state, "v1", digest, now=retry_at)
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(summary_state, "SUMMARY_RETRY_BASE_S", 60)
+    monkeypatch.setattr(summary_state, "SUMMARY_RETRY_MAX_S", 600)
+    assert [backoff_seconds(n) for n in range(1, 7)] == [60, 120, 240, 480, 600, 600]
+
+
+def test_repeated_failures_count_up_and_success_resets():
+    digest = content_hash(BODY)
+    state = {}
+    for expected in (1, 2, 3):
+        state = record_attempt(state, False, "v1", digest, now=NOW)
+        assert state["summary_attempts"] == expected
+    retry_at = datetime.fromisoformat(state["next_attempt_at"])
+    assert retry_at == NOW + timedelta(seconds=backoff_seconds(3))
+
+    # A new prompt version starts the backoff again.
+    assert record_attempt(state, False, "v2", digest, now=NOW)["summary_attempts"] == 1
+
+    state = record_attempt(state, True, "v1", digest, now=NOW)
+    assert state["summary_status"] == STATUS_OK
+    assert state["summary_attempts"] == 0
+    assert state["next_attempt_at"] is None
+
+
+def test_llm_is_called_only_when_the_summary_is_stale(monkeypatch):
+    calls = []
+
+    def fake_summarize(text, fallback_title, on_delta=None):
+        calls.append(text)
+        return {
+            "headline": "Platform Raises Revenue Share",
+            "summary": "The platform pays long-video creators more from next month.",
+            "ok": True,
+        }
+
+    monkeypatch.setattr(newsletter, "summarize_story", fake_summarize)
+    item = {"id": 1, "title": "Revenue share", "content": BODY}
+
+    assert newsletter._ensure_story_format(item, "v1")
+    assert len(calls) == 1
+
+    assert not newsletter._ensure_story_format(item, "v1")
+    assert len(calls) == 1
+
+    assert newsletter._ensure_story_format(item, "v2")
+    assert len(calls) == 2
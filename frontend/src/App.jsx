@@ -4,6 +4,7 @@ import {
   listSources,
   runPipeline,
   sendNewsletter,
+  streamNewsletter,
 } from "./api/api";
 
 const FONT_FAMILY = "'Inter', 'Segoe UI', sans-serif";
@@ -316,6 +317,7 @@ function App() {
   const [manualStepKey, setManualStepKey] = useState(null);
   const [pipelineLoading, setPipelineLoading] = useState(false);
   const [sendLoading, setSendLoading] = useState(false);
+  const [streamLoading, setStreamLoading] = useState(false);
   const [stories, setStories] = useState([]);
   const [draftHtml, setDraftHtml] = useState("");
   const [draftText, setDraftText] = useState("");
@@ -494,6 +496,61 @@ function App() {
     }
   };
 
+  // Rebuilds the draft from /newsletter/generate/stream: the email shell
+  // shows at once, summaries fill in as they are written, and each story
+  // is swapped for its final HTML when it is done.
+  const handleStreamPreview = async () => {
+    setError("");
+    setToast("");
+    setStreamLoading(true);
+    setPreviewMode("preview");
+    setDraftText("");
+
+    let shell = { head: "", tail: "" };
+    const blocks = [];
+    const pending = [];
+    let trendsHtml = "";
+    const paint = () => {
+      const body = blocks
+        .map((html, index) => html || plainToHtml(pending[index]))
+        .join("");
+      setDraftHtml(shell.head + body + trendsHtml + shell.tail);
+    };
+
+    try {
+      const done = await streamNewsletter(selectedSourceIds, (event) => {
+        if (event.type === "shell") {
+          shell = event;
+          for (let index = 0; index < event.count; index += 1) {
+            blocks[index] = "";
+            pending[index] = "";
+          }
+        } else if (event.type === "delta") {
+          pending[event.index] = (pending[event.index] || "") + event.text;
+        } else if (event.type === "story") {
+          blocks[event.index] = event.html;
+        } else if (event.type === "trends") {
+          trendsHtml = event.html;
+        } else {
+          return;
+        }
+        paint();
+      });
+      if (done) {
+        const latestHtml = done.html || "";
+        setDraftHtml(latestHtml);
+        setDraftText(done.text || htmlToPlain(latestHtml));
+        setStories(done.stories || []);
+      }
+      setToast("Draft regenerated. Review it before sending.");
+    } catch (err) {
+      console.error(err);
+      setError(err.message || "Failed to generate the draft. Please try again.");
+    } finally {
+      setStreamLoading(false);
+    }
+  };
+
   const handleSend = async () => {
     setError("");
     setToast("");
@@ -951,6 +1008,24 @@ function App() {
               >
                 Reset to generated
               </button>
+              <button
+                type="button"
+                onClick={handleStreamPreview}
+                disabled={streamLoading || !selectedSourceIds.length}
+                style={{
+                  padding: "9px 16px",
+                  borderRadius: "12px",
+                  border: `1px solid ${COLORS.border}`,
+                  background: "rgba(255,255,255,0.04)",
+                  color: COLORS.textMuted,
+                  cursor:
+                    streamLoading || !selectedSourceIds.length
+                      ? "not-allowed"
+                      : "pointer",
+                }}
+              >
+                {streamLoading ? "Regenerating..." : "Regenerate draft"}
+              </button>
             </div>
 
             {previewMode === "preview" && renderPreview(currentHtml)}
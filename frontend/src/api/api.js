@@ -2,13 +2,81 @@ import axios from "axios";
 
 const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
-export const generateNewsletter = (payload) =>
-  axios.post(`${API_BASE}/newsletter/generate`, payload);
+// Last body and ETag per URL, so repeat reads can be answered with a 304.
+const etagCache = new Map();
+
+async function conditionalGet(url) {
+  const cached = etagCache.get(url);
+  const response = await axios.get(url, {
+    headers: cached ? { "If-None-Match": cached.etag } : {},
+    validateStatus: (status) =>
+      (status >= 200 && status < 300) || status === 304,
+  });
+  if (response.status === 304 && cached) {
+    return { ...response, status: 200, data: cached.data };
+  }
+  const etag = response.headers.etag;
+  if (etag) {
+    etagCache.set(url, { etag, data: response.data });
+  }
+  return response;
+}
+
+export const generateNewsletter = (payload = {}) => {
+  const params = new URLSearchParams();
+  (payload.source_ids || []).forEach((id) => params.append("source_ids", id));
+  const query = params.toString();
+  return conditionalGet(
+    `${API_BASE}/newsletter/generate${query ? `?${query}` : ""}`
+  );
+};
+// Reads /newsletter/generate/stream and calls onEvent for every NDJSON event
+// (shell, delta, story, trends, done). Resolves with the final "done" event.
+export async function streamNewsletter(sourceIds = [], onEvent = () => {}) {
+  const params = new URLSearchParams();
+  sourceIds.forEach((id) => params.append("source_ids", id));
+  const query = params.toString();
+  const response = await fetch(
+    `${API_BASE}/newsletter/generate/stream${query ? `?${query}` : ""}`
+  );
+  if (!response.ok) {
+    const body = await response.json().catch(() => ({}));
+    throw new Error(body.detail || `Request failed with ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let done = null;
+  const emit = (line) => {
+    if (!line.trim()) return;
+    const event = JSON.parse(line);
+    if (event.type === "done") done = event;
+    onEvent(event);
+  };
+  for (;;) {
+    const { value, done: finished } = await reader.read();
+    if (finished) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.forEach(emit);
+  }
+  emit(buffer + decoder.decode());
+  return done;
+}
 export const sendNewsletter = (payload = {}) =>
   axios.post(`${API_BASE}/newsletter/send`, payload);
-export const listSources = () => axios.get(`${API_BASE}/sources`);
+export const listSources = () => conditionalGet(`${API_BASE}/sources`);
 export const addSource = (name, url) =>
   axios.post(`${API_BASE}/sources`, { name, url, type: "rss" });
+export const importSources = ({ opml, urls, backfill = true } = {}) =>
+  axios.post(`${API_BASE}/sources/import`, { opml, urls, backfill });
+export const getBackfill = (jobId) =>
+  axios.get(`${API_BASE}/sources/backfill/${encodeURIComponent(jobId)}`);
+export const resumeBackfill = (jobId) =>
+  axios.post(
+    `${API_BASE}/sources/backfill/${encodeURIComponent(jobId)}/resume`
+  );
 export const ingestSource = (url) =>
   axios.post(`${API_BASE}/sources/ingest?url=${encodeURIComponent(url)}`);
 export const runPipeline = (payload) =>